@@ -0,0 +1,167 @@
+"""Retention for the scraped archive: old days move into monthly cold storage.
+
+Day files older than the retention horizon are folded into one gzip
+compressed JSON file per month and removed from the hot directories:
+
+    date/20260101.json            -> archive/date/2026-01.json.gz
+    data/odds/20260101.json       -> archive/data/odds/2026-01.json.gz
+
+A month file maps each original file name to its parsed content, so days
+can be written back out with `restore`. Month files are written
+deterministically (days sorted, gzip mtime 0), so re-archiving the same
+days gives identical bytes and the build can tell an unchanged month by
+its hash alone.
+
+    python archive.py prune [--keep-days 30] [--only date|data] [--dry-run]
+    python archive.py restore archive/date/2026-01.json.gz --out date/
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+import data_index
+
+ARCHIVE_DIR = "archive"
+DATE_DIR = "date"
+DATA_DIR = "data"
+
+# Days kept hot: the listings look 3 days back and channel pages 24 hours,
+# the rest of the window is margin for late corrections from the scrapers
+RETENTION_DAYS = 30
+
+DAY_FILE_RE = re.compile(r"^(\d{4})(\d{2})(\d{2})\.json$")
+
+
+def day_of(path):
+    """date of a YYYYMMDD.json file, or None for anything else"""
+    match = DAY_FILE_RE.match(os.path.basename(path))
+    if not match:
+        return None
+    try:
+        return date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+def month_path(archive_dir, day):
+    return os.path.join(archive_dir, f"{day:%Y-%m}.json.gz")
+
+def read_month(path):
+    """{file name: content} of a month file, empty when it does not exist yet"""
+    try:
+        with gzip.open(path, "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+def write_month(path, days):
+    """Write a month file atomically and deterministically"""
+    # Days in name order; records keep their field order so restore gives them back as scraped
+    raw = json.dumps(dict(sorted(days.items())), separators=(",", ":")).encode("utf-8")
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(raw, 9, mtime=0))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def prune_dir(hot_dir, archive_dir, horizon, dry_run=False):
+    """Move day files of hot_dir dated before horizon into monthly files in archive_dir.
+
+    A day already in the archive is replaced by the hot copy, which is newer.
+    Unreadable files are left in place. Returns {month file: day files archived into it}.
+    """
+    by_month, written = {}, {}
+    for path in sorted(glob.glob(os.path.join(hot_dir, "*.json"))):
+        day = day_of(path)
+        if day is not None and day < horizon:
+            by_month.setdefault(month_path(archive_dir, day), []).append(path)
+
+    for target, paths in by_month.items():
+        print(f"{'Would archive' if dry_run else 'Archiving'} {len(paths)} day(s) of {hot_dir}/ into {target}")
+        if dry_run:
+            continue
+        days = read_month(target)
+        archived = []
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    days[os.path.basename(path)] = json.load(f)
+            except ValueError as e:
+                print(f"Warning: not archiving unreadable {path}: {e}")
+                continue
+            archived.append(path)
+        if not archived:
+            continue
+        write_month(target, days)
+        # Only drop the hot files once the month holding them is safely on disk
+        for path in archived:
+            os.unlink(path)
+        written[target] = len(archived)
+    return written
+
+def prune(keep_days=RETENTION_DAYS, today=None, archive_dir=ARCHIVE_DIR, date_dir=DATE_DIR,
+          data_dir=DATA_DIR, dry_run=False, kinds=("date", "data")):
+    """Archive date/ and every data/<endpoint>/ day older than keep_days.
+
+    kinds limits the prune to date/ or data/, so the workflow that owns each
+    directory archives it.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    horizon = today - timedelta(days=keep_days)
+    archived = 0
+    if "date" in kinds:
+        archived += sum(prune_dir(date_dir, os.path.join(archive_dir, "date"), horizon, dry_run).values())
+    months = {}
+    endpoint_dirs = sorted(glob.glob(os.path.join(data_dir, "*", ""))) if "data" in kinds else []
+    for endpoint_dir in endpoint_dirs:
+        endpoint = os.path.basename(os.path.dirname(endpoint_dir))
+        written = prune_dir(endpoint_dir.rstrip(os.sep), os.path.join(archive_dir, "data", endpoint), horizon, dry_run)
+        months.update((path, endpoint) for path in written)
+        archived += sum(written.values())
+    if months:
+        # Archived records are read from their month files now, so the index points there
+        index = data_index.DataIndex.load(os.path.join(data_dir, "index.json"))
+        index.forget_missing()
+        for path, endpoint in sorted(months.items()):
+            index.update_month(path, endpoint, read_month(path))
+        index.save()
+    return archived
+
+def month_files(archive_dir=ARCHIVE_DIR, kind="date"):
+    """Month files of one archive kind ("date" or "data/<endpoint>"), oldest first"""
+    return sorted(glob.glob(os.path.join(archive_dir, kind, "*.json.gz")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old date/ and data/ days into monthly archive files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_prune = sub.add_parser("prune", help="archive days older than the retention horizon")
+    p_prune.add_argument("--keep-days", type=int, default=RETENTION_DAYS,
+                         help=f"days to keep hot before today (default: {RETENTION_DAYS})")
+    p_prune.add_argument("--only", choices=["date", "data"], help="archive only date/ or only data/ (default: both)")
+    p_prune.add_argument("--dry-run", action="store_true", help="only list what would be archived")
+    p_restore = sub.add_parser("restore", help="write the days of a month file back out as JSON files")
+    p_restore.add_argument("path")
+    p_restore.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        n = prune(args.keep_days, dry_run=args.dry_run, kinds=[args.only] if args.only else ("date", "data"))
+        print(f"{n} day file(s) {'to archive' if args.dry_run else 'archived'}")
+    else:
+        days = read_month(args.path)
+        os.makedirs(args.out, exist_ok=True)
+        for name, content in sorted(days.items()):
+            with open(os.path.join(args.out, name), "w", encoding="utf-8") as f:
+                json.dump(content, f, indent=4 if isinstance(content, list) else 2)
+        print(f"Restored {len(days)} day file(s) to {args.out}")
@@ -0,0 +1,200 @@
+"""End-to-end benchmark for build.py against a synthetic date/ archive.
+
+Generates an archive of the requested size in a scratch directory, copies
+build.py, the sitebuild package and the templates next to it and runs the
+build there, offline.
+Reports wall time per build stage, peak RSS and what ended up in dist/,
+plus the build's own run report (in-process stage times and counters).
+
+    python benchmarks/build_bench.py --days 365 --matches-per-day 150
+    python benchmarks/build_bench.py --days 30 --json bench.json -- --jobs 4
+
+Anything after "--" is passed to build.py unchanged.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_FILES = ["build.py", "archive.py", "match_store.py", "data_index.py", "run_report.py",
+               "home_template.html", "match_template.html", "channel_template.html"]
+BUILD_DIRS = ["sitebuild"]
+
+# build.py prints one of these as each stage starts; "end" closes the last one
+STAGE_MARKERS = [
+    ("match pages", "Building match pages..."),
+    ("daily pages", "Building daily pages..."),
+    ("channel pages", "Building channel pages..."),
+    ("sitemap", "Building sitemap..."),
+    ("search index", "Building search index..."),
+    ("swap", "Swapping directories atomically..."),
+    ("end", "✅ Build complete"),
+]
+TOP_LEAGUE_IDS = [17, 35, 23, 7, 8, 34, 679]
+
+
+def generate_archive(date_dir, days, matches_per_day, countries, channels_per_country,
+                     channel_pool=3000, league_pool=200, seed=1):
+    """Write `days` synthetic date/YYYYMMDD.json files ending a week from today.
+
+    Names are drawn from fixed pools so countries, channels and leagues repeat
+    across fixtures the way real broadcaster data does.
+    """
+    rng = random.Random(seed)
+    os.makedirs(date_dir, exist_ok=True)
+    country_names = [f"Country {i}" for i in range(max(countries, 1) * 3)]
+    channel_names = [f"Sports Channel {i}" for i in range(channel_pool)]
+    leagues = [(TOP_LEAGUE_IDS[i] if i < len(TOP_LEAGUE_IDS) else 1000 + i, f"League {i}") for i in range(league_pool)]
+
+    first_day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 8)
+    match_id = 10_000_000
+    total = 0
+    for d in range(days):
+        day = first_day + timedelta(days=d)
+        records = []
+        for _ in range(matches_per_day):
+            match_id += 1
+            league_id, league = rng.choice(leagues)
+            records.append({
+                "match_id": match_id,
+                "kickoff": int((day + timedelta(minutes=rng.randrange(0, 24 * 60, 15))).timestamp()),
+                "fixture": f"Team {rng.randrange(5000)} vs Team {rng.randrange(5000)}",
+                "league_id": league_id,
+                "league": league,
+                "venue": f"Stadium {rng.randrange(3000)}",
+                "tv_channels": [
+                    {"country": country, "channels": sorted(rng.sample(channel_names, channels_per_country))}
+                    for country in sorted(rng.sample(country_names, countries))
+                ],
+            })
+        with open(os.path.join(date_dir, day.strftime("%Y%m%d") + ".json"), "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        total += len(records)
+    return total
+
+
+def run_build(workdir, build_args):
+    """Run build.py in workdir, timing each stage from its progress lines."""
+    started = time.perf_counter()
+    marks = {}
+    proc = subprocess.Popen([sys.executable, "-u", "build.py", *build_args], cwd=workdir,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = []
+    for line in proc.stdout:
+        output.append(line)
+        for stage, marker in STAGE_MARKERS:
+            if line.startswith(marker) and stage not in marks:
+                marks[stage] = time.perf_counter()
+    proc.wait()
+    finished = time.perf_counter()
+    if proc.returncode != 0:
+        sys.stdout.write("".join(output))
+        raise SystemExit(f"build.py exited with status {proc.returncode}")
+
+    # Everything before the first marker is template/data loading and indexing
+    stages = {}
+    previous_name, previous_at = "load", started
+    for stage, _ in STAGE_MARKERS:
+        if stage in marks:
+            stages[previous_name] = marks[stage] - previous_at
+            previous_name, previous_at = stage, marks[stage]
+    if previous_name != "end":
+        stages[previous_name] = finished - previous_at
+
+    return {
+        "total_s": finished - started,
+        "stages_s": stages,
+        # ru_maxrss is KiB on Linux; the biggest child wins, which is the build or its largest worker
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "output": "".join(output),
+        "run_report": load_run_report(workdir),
+    }
+
+
+def load_run_report(workdir):
+    """The JSON report build.py wrote, or None if it wrote none"""
+    try:
+        with open(os.path.join(workdir, "run_reports", "build.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def dist_summary(dist_dir):
+    files, size = 0, 0
+    for root, _, names in os.walk(dist_dir):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return {"files": files, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--matches-per-day", type=int, default=150)
+    parser.add_argument("--countries", type=int, default=20, help="countries per match")
+    parser.add_argument("--channels-per-country", type=int, default=3)
+    parser.add_argument("--channel-pool", type=int, default=3000, help="distinct channel names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir, removed afterwards)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    parser.add_argument("build_args", nargs="*", help="arguments for build.py (after --)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="build_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        for name in BUILD_FILES:
+            shutil.copy(os.path.join(REPO, name), workdir)
+        for name in BUILD_DIRS:
+            shutil.copytree(os.path.join(REPO, name), os.path.join(workdir, name), dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns("__pycache__"))
+        t = time.perf_counter()
+        matches = generate_archive(os.path.join(workdir, "date"), args.days, args.matches_per_day,
+                                   args.countries, args.channels_per_country, args.channel_pool, args.seed)
+        generate_s = time.perf_counter() - t
+        archive_bytes = sum(e.stat().st_size for e in os.scandir(os.path.join(workdir, "date")))
+
+        result = run_build(workdir, args.build_args)
+        report = {
+            "archive": {"days": args.days, "matches": matches, "bytes": archive_bytes,
+                        "countries_per_match": args.countries,
+                        "channels_per_country": args.channels_per_country,
+                        "generate_s": round(generate_s, 3)},
+            "build_args": args.build_args,
+            "total_s": round(result["total_s"], 3),
+            "stages_s": {k: round(v, 3) for k, v in result["stages_s"].items()},
+            "peak_rss_mb": round(result["peak_rss_mb"], 1),
+            "dist": dist_summary(os.path.join(workdir, "dist")),
+            "run_report": result["run_report"],
+        }
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Archive: {matches} matches over {args.days} days, {archive_bytes / 1e6:.1f} MB of JSON")
+    for stage, seconds in report["stages_s"].items():
+        print(f"  {stage:<14} {seconds:8.3f} s")
+    print(f"  {'total':<14} {report['total_s']:8.3f} s")
+    print(f"Peak RSS: {report['peak_rss_mb']} MB")
+    if report["run_report"]:
+        counters = report["run_report"]["counters"]
+        print(f"Pages: {counters.get('pages_rendered', 0)} rendered, {counters.get('pages_reused', 0)} reused")
+    print(f"dist/: {report['dist']['files']} files, {report['dist']['bytes'] / 1e6:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
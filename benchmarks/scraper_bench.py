@@ -0,0 +1,148 @@
+"""Throughput benchmark for the SofaScore scrapers against the replay server.
+
+Starts the sofa_replay.py server in-process on a recorded cassette, copies
+the scrapers into a scratch directory and runs each one there with
+SOFASCORE_API_BASE pointing at the server, offline. Reports per run the
+total runtime, requests per second, the status codes served, the server's
+service time percentiles and the client latency percentiles from the
+scraper's own run report (histogram bucket bounds).
+
+    python benchmarks/scraper_bench.py sofa.json.gz
+    python benchmarks/scraper_bench.py sofa.json.gz --scrapers fetch_data ingest --runs 2 \\
+        --latency 200 --jitter 150 --throttle-rate 0.02 --json bench.json
+
+Every scraper starts from an empty directory; with --runs 2 the second run
+shows the incremental (warm) cost.
+"""
+import argparse
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from sofa_replay import add_fault_arguments, replay_server
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPER_FILES = ["future_scraper.py", "fetch_data.py", "ingest.py", "sofa_scheduler.py",
+                 "run_report.py", "data_index.py"]
+# Scraper -> (command, name of the run report it writes)
+SCRAPERS = {
+    "future_scraper": (["future_scraper.py"], "future_scraper"),
+    "fetch_data": (["fetch_data.py"], "fetch_data"),
+    "ingest": (["ingest.py"], "ingest"),
+}
+
+
+def client_latency(run_report):
+    """p50/p95/p99 request latency (ms, bucket upper bounds) over every endpoint of a run report"""
+    if not run_report or not run_report.get("latency"):
+        return None
+    buckets = {}
+    for histogram in run_report["latency"].values():
+        for label, n in histogram["buckets_ms"].items():
+            buckets[label] = buckets.get(label, 0) + n
+    total = sum(buckets.values())
+    result = {}
+    for p in (50, 95, 99):
+        seen = 0
+        for label, n in buckets.items():
+            seen += n
+            if seen >= p / 100 * total:
+                result[f"p{p}"] = label.replace("le_", "<=")
+                break
+    return result
+
+
+def run_scraper(workdir, name, base_url, timeout):
+    command, report_name = SCRAPERS[name]
+    env = dict(os.environ, SOFASCORE_API_BASE=base_url, RUN_REPORT_DIR=os.path.join(workdir, "run_reports"))
+    started = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, *command], cwd=workdir, env=env, timeout=timeout,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except subprocess.TimeoutExpired:
+        raise SystemExit(f"{name} did not finish within {timeout:.0f} s (the scrapers' own rate limit "
+                         f"bounds a run; use a smaller cassette or --timeout)")
+    runtime = time.perf_counter() - started
+    if proc.returncode != 0:
+        sys.stdout.write(proc.stdout)
+        raise SystemExit(f"{name} exited with status {proc.returncode}")
+    run_report = None
+    if report_name:
+        try:
+            with open(os.path.join(workdir, "run_reports", f"{report_name}.json"), encoding="utf-8") as f:
+                run_report = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+    return runtime, run_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("cassette", help="recorded with `sofa_replay.py record`")
+    parser.add_argument("--scrapers", nargs="+", choices=sorted(SCRAPERS), default=list(SCRAPERS))
+    parser.add_argument("--runs", type=int, default=1, help="runs per scraper in the same directory (default 1)")
+    parser.add_argument("--timeout", type=float, default=900, metavar="S", help="per run (default 900)")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir, removed afterwards)")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    with gzip.open(args.cassette, "rt", encoding="utf-8") as f:
+        cassette = json.load(f)
+    server = replay_server(args, cassette)
+    base_url = server.start_in_thread()
+
+    root = args.workdir or tempfile.mkdtemp(prefix="scraper_bench_")
+    results = []
+    try:
+        for name in args.scrapers:
+            workdir = os.path.join(root, name)
+            os.makedirs(workdir, exist_ok=True)
+            for file_name in SCRAPER_FILES:
+                shutil.copy(os.path.join(REPO, file_name), workdir)
+            for run in range(1, args.runs + 1):
+                server.reset()
+                runtime, run_report = run_scraper(workdir, name, base_url, args.timeout)
+                served = server.summary()
+                results.append({
+                    "scraper": name,
+                    "run": run,
+                    "runtime_s": round(runtime, 3),
+                    "requests": served["requests"],
+                    "requests_per_s": round(served["requests"] / runtime, 1) if runtime else 0,
+                    "status_codes": served["status_codes"],
+                    "server_service_ms": served["service_ms"],
+                    "client_latency_ms": client_latency(run_report),
+                    "retries": (run_report or {}).get("counters", {}).get("retries"),
+                    "throttled": (run_report or {}).get("counters", {}).get("throttled"),
+                })
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"Cassette: {len(cassette['responses'])} responses recorded {cassette['recorded']}; "
+          f"latency {args.latency}±{args.jitter} ms, {args.error_rate:.1%} 503, {args.throttle_rate:.1%} 429")
+    for r in results:
+        client = r["client_latency_ms"]
+        print(f"  {r['scraper']:<15} run {r['run']}  {r['runtime_s']:8.2f} s  {r['requests']:6} req  "
+              f"{r['requests_per_s']:7.1f} req/s  server p95 {r['server_service_ms']['p95']} ms"
+              + (f"  client p50 {client['p50']} p95 {client['p95']} p99 {client['p99']} ms" if client else "")
+              + f"  {r['status_codes']}")
+
+    if args.json:
+        report = {"cassette": {"path": args.cassette, "recorded": cassette["recorded"],
+                               "responses": len(cassette["responses"])},
+                  "faults": {"latency_ms": args.latency, "jitter_ms": args.jitter, "error_rate": args.error_rate,
+                             "throttle_rate": args.throttle_rate, "retry_after_s": args.retry_after},
+                  "results": results}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
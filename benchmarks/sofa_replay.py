@@ -0,0 +1,277 @@
+"""Record/replay stand-in for the SofaScore API, for offline scraper benchmarks.
+
+Record: proxy the scrapers to SofaScore once and keep every response in a
+cassette (needs curl_cffi, like the scrapers; upstream requests go through
+the same RequestScheduler limits):
+
+    python benchmarks/sofa_replay.py record sofa.json.gz
+    SOFASCORE_API_BASE=http://127.0.0.1:8765/api/v1 python ingest.py
+
+Replay: serve the cassette from a stdlib asyncio HTTP/1.1 server with
+injected latency, server errors and 429s, never touching SofaScore:
+
+    python benchmarks/sofa_replay.py serve sofa.json.gz --latency 120 --jitter 80 \\
+        --error-rate 0.01 --throttle-rate 0.02
+
+A cassette is gzipped JSON, {"recorded": "YYYY-MM-DD", "upstream": url,
+"responses": {path: [status, body]}}, with paths relative to /api/v1. The
+scrapers ask for dates relative to today, so on replay every date in a path
+is moved back by the days since the recording. Paths missing from the
+cassette answer 404, as SofaScore does for an event without lineups.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run_report import endpoint_of  # noqa: E402
+
+API_PREFIX = "/api/v1"
+UPSTREAM = "https://api.sofascore.com/api/v1"
+PORT = 8765
+
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 502: "Bad Gateway", 503: "Service Unavailable"}
+NOT_FOUND = json.dumps({"error": {"code": 404, "message": "Not Found"}})
+THROTTLED = json.dumps({"error": {"code": 429, "message": "Too Many Requests"}})
+UNAVAILABLE = json.dumps({"error": {"code": 503, "message": "Service Unavailable"}})
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def load_cassette(path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"recorded": date.today().isoformat(), "upstream": UPSTREAM, "responses": {}}
+
+def save_cassette(path, cassette):
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+        json.dump(cassette, f, separators=(",", ":"), sort_keys=True)
+    os.replace(temp_path, path)
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+
+class ReplayServer:
+    """Answers SofaScore API requests from a cassette, with injected faults.
+
+    Every request waits latency_ms +/- jitter_ms, then fails with a 429
+    (throttle_rate, with Retry-After) or a 503 (error_rate), else gets its
+    recorded response. Each answer is logged for summary().
+    """
+
+    def __init__(self, cassette, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=1, seed=1, today=None):
+        self.responses = cassette["responses"]
+        recorded = date.fromisoformat(cassette["recorded"])
+        self.shift = timedelta(days=((today or date.today()) - recorded).days)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.log = []
+
+    def recorded_path(self, path):
+        """Cassette key of a request path: /api/v1 dropped and dates moved back to the recording"""
+        if path.startswith(API_PREFIX):
+            path = path[len(API_PREFIX):]
+        if not self.shift:
+            return path
+        return _DATE.sub(lambda m: (date.fromisoformat(m.group()) - self.shift).isoformat(), path)
+
+    async def respond(self, path):
+        """(status, headers, body) of one request"""
+        delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, THROTTLED
+        if roll < self.throttle_rate + self.error_rate:
+            return 503, {}, UNAVAILABLE
+        status, body = self.responses.get(self.recorded_path(path), (404, NOT_FOUND))
+        return status, {}, body
+
+    async def handle(self, reader, writer):
+        """One keep-alive connection: GET requests answered in order until the client closes"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                method, target, version = (request_line.decode("latin-1").split() + ["", "", ""])[:3]
+                started = time.perf_counter()
+                if method != "GET":
+                    status, extra, body = 405, {}, ""
+                else:
+                    status, extra, body = await self.respond(target.split("?", 1)[0])
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                writer.write(render_response(status, extra, body, close))
+                await writer.drain()
+                self.log.append((endpoint_of(target), status, (time.perf_counter() - started) * 1000, time.monotonic()))
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def reset(self):
+        self.log = []
+
+    def summary(self):
+        """Requests, status counts and service-time percentiles (ms) of the log so far"""
+        times = sorted(ms for _, _, ms, _ in self.log)
+        return {
+            "requests": len(self.log),
+            "status_codes": dict(Counter(str(status) for _, status, _, _ in self.log)),
+            "endpoints": dict(Counter(endpoint for endpoint, _, _, _ in self.log)),
+            "service_ms": {f"p{p}": round(percentile(times, p), 1) for p in (50, 95, 99)},
+        }
+
+    def start_in_thread(self, host="127.0.0.1", port=0):
+        """Serve from a daemon thread; returns the API base URL (port 0 picks a free port)"""
+        bound = []
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            server = loop.run_until_complete(asyncio.start_server(self.handle, host, port))
+            bound.append(server.sockets[0].getsockname()[1])
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return f"http://{host}:{bound[0]}{API_PREFIX}"
+
+
+def render_response(status, extra_headers, body, close):
+    data = body.encode("utf-8")
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+             "Content-Type: application/json",
+             f"Content-Length: {len(data)}",
+             f"Connection: {'close' if close else 'keep-alive'}"]
+    lines += [f"{name}: {value}" for name, value in extra_headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data
+
+
+class Recorder(ReplayServer):
+    """Proxy to SofaScore that stores every 200 or 404 answer in the cassette.
+
+    A path already recorded is answered from the cassette, so re-running a
+    scraper through the recorder does not hit SofaScore again.
+    """
+
+    def __init__(self, cassette, client, upstream=UPSTREAM):
+        super().__init__(cassette)
+        self.cassette = cassette
+        self.client = client
+        self.upstream = upstream.rstrip("/")
+
+    async def respond(self, path):
+        key = self.recorded_path(path)
+        if key in self.responses:
+            status, body = self.responses[key]
+            return status, {}, body
+        res = await self.client.request(self.upstream + key)
+        if res is None:
+            return 502, {}, UNAVAILABLE
+        if res.status_code in (200, 404):
+            self.responses[key] = [res.status_code, res.text]
+        return res.status_code, {}, res.text
+
+
+async def record(path, host, port, upstream):
+    # Only recording needs the impersonating client; serving is stdlib-only
+    from curl_cffi.requests import AsyncSession
+
+    from sofa_scheduler import RequestScheduler
+
+    cassette = load_cassette(path)
+    cassette.update(recorded=date.today().isoformat(), upstream=upstream)
+    async with AsyncSession() as session:
+        recorder = Recorder(cassette, RequestScheduler(session, concurrency=4, rate=3), upstream)
+        server = await asyncio.start_server(recorder.handle, host, port)
+        print(f"Recording {upstream} into {path}; point SOFASCORE_API_BASE at http://{host}:{port}{API_PREFIX}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            save_cassette(path, cassette)
+            print(f"Saved {len(cassette['responses'])} responses to {path}")
+
+async def serve(server, host, port):
+    async with await asyncio.start_server(server.handle, host, port) as listener:
+        print(f"Replaying {len(server.responses)} responses on http://{host}:{port}{API_PREFIX}"
+              f" (dates shifted by {server.shift.days} days)")
+        await listener.serve_forever()
+
+
+def add_fault_arguments(parser):
+    """Latency and fault injection options, shared with scraper_bench.py"""
+    parser.add_argument("--latency", type=float, default=50.0, metavar="MS", help="mean response delay (default 50)")
+    parser.add_argument("--jitter", type=float, default=25.0, metavar="MS",
+                        help="uniform +/- spread around --latency (default 25)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, metavar="S", help="Retry-After of injected 429s")
+    parser.add_argument("--seed", type=int, default=1)
+
+def replay_server(args, cassette):
+    return ReplayServer(cassette, args.latency, args.jitter, args.error_rate, args.throttle_rate,
+                        args.retry_after, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="proxy to SofaScore and record every response")
+    rec.add_argument("cassette")
+    rec.add_argument("--upstream", default=UPSTREAM, help=f"API base to record from (default {UPSTREAM})")
+    srv = sub.add_parser("serve", help="replay a cassette with injected latency and faults")
+    srv.add_argument("cassette")
+    add_fault_arguments(srv)
+    for p in (rec, srv):
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "record":
+            asyncio.run(record(args.cassette, args.host, args.port, args.upstream))
+        else:
+            with gzip.open(args.cassette, "rt", encoding="utf-8") as f:
+                cassette = json.load(f)
+            asyncio.run(serve(replay_server(args, cassette), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Byte-range index over the per-match endpoint files in data/.
+
+fetch_data.py keeps data/<endpoint>/<YYYYMMDD>.json as {match_id: record}
+objects. The index maps every match id to where each of its records sits:
+
+    {"files": ["data/odds/20260201.json", ...],
+     "matches": {"15410643": {"odds": [file_no, offset, length, crc32], ...}}}
+
+so a reader seeks to one record and parses a few hundred bytes instead of
+the whole file. Day files are encoded by encode_day(), which produces exactly
+json.dumps(entries, indent=2) while recording each record's byte span, and
+the writer updates the index as it goes. The crc32 of every span is kept too:
+a record whose bytes no longer match (the file was rewritten by something
+else) reads as missing rather than as garbage.
+
+Days moved into archive/data/<endpoint>/YYYY-MM.json.gz by archive.py stay
+indexed. A gzip month cannot be sliced, so its entries hold the day file
+name in place of the offset, [file_no, "20260101.json", 0, crc32], and the
+month is decompressed once and kept for the records that follow. The crc32
+is that of the record as encode_day() would write it, so archiving a day
+leaves the crc of each of its records unchanged.
+
+    python data_index.py rebuild      # re-index every file under data/ and archive/data/
+"""
+import argparse
+import glob
+import gzip
+import json
+import mmap
+import os
+import zlib
+
+DATA_DIR = "data"
+INDEX_PATH = os.path.join(DATA_DIR, "index.json")
+ARCHIVE_DATA_DIR = os.path.join("archive", "data")
+
+# Data files a reader keeps mapped; match pages are rendered day by day, so
+# consecutive reads mostly hit the same few files
+OPEN_FILES = 16
+# Parsed archive months a reader keeps; a match page reads one month per endpoint
+OPEN_MONTHS = 4
+
+
+def encode_day(entries):
+    """(text, {key: (offset, length)}) of a day file; text == json.dumps(entries, indent=2).
+
+    json.dumps escapes non-ASCII by default, so character offsets are byte offsets.
+    """
+    if not entries:
+        return "{}", {}
+    parts, spans = ["{\n"], {}
+    pos = 2
+    for i, (key, value) in enumerate(entries.items()):
+        head = ("" if i == 0 else ",\n") + "  " + json.dumps(key) + ": "
+        # A nested value is indented one level deeper than it would be on its own
+        body = encode_record(value).decode("utf-8")
+        pos += len(head)
+        spans[key] = (pos, len(body))
+        pos += len(body)
+        parts += [head, body]
+    parts.append("\n}")
+    return "".join(parts), spans
+
+def encode_record(value):
+    """Bytes of one record as encode_day() writes it inside a day file"""
+    return json.dumps(value, indent=2).replace("\n", "\n  ").encode("utf-8")
+
+def is_month(path):
+    return path.endswith(".json.gz")
+
+
+class DataIndex:
+    """match id -> {endpoint: (file, offset, length, crc32)} over data/ and its archive, loaded whole."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.files = []
+        self.file_numbers = {}
+        self.matches = {}
+        self.changed = False
+        self._mapped_files = {}
+        self._months = {}
+        # Bytes of data files read by read() so far, for the caller's run report
+        self.bytes_read = 0
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """The index at path, or an empty one when it is missing or unreadable"""
+        index = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            index.files = data["files"]
+            index.matches = data["matches"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        index.file_numbers = {p: i for i, p in enumerate(index.files)}
+        return index
+
+    def save(self):
+        """Write the index atomically if anything changed"""
+        if not self.changed:
+            return False
+        # Only files something still points into are kept, renumbered in path order
+        used = sorted({self.files[entry[0]] for endpoints in self.matches.values() for entry in endpoints.values()})
+        numbers = {p: i for i, p in enumerate(used)}
+        matches = {mid: {ep: [numbers[self.files[e[0]]], e[1], e[2], e[3]] for ep, e in sorted(endpoints.items())}
+                   for mid, endpoints in sorted(self.matches.items())}
+        text = json.dumps({"files": used, "matches": matches}, separators=(",", ":"))
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, self.path)
+        self.files, self.file_numbers, self.matches = used, numbers, matches
+        self.changed = False
+        return True
+
+    def update(self, path, endpoint, text, spans):
+        """Point every record of a just written day file at its new span"""
+        path = path.replace(os.sep, "/")
+        file_no = self.file_numbers.get(path)
+        if file_no is None:
+            file_no = self.file_numbers[path] = len(self.files)
+            self.files.append(path)
+        else:
+            # A mapping of the replaced file would still show its old bytes
+            mapped = self._mapped_files.pop(file_no, None)
+            if mapped is not None:
+                mapped.close()
+            # Records that left a rewritten file must not keep their old span
+            for mid, endpoints in self.matches.items():
+                entry = endpoints.get(endpoint)
+                if entry and entry[0] == file_no and mid not in spans:
+                    del endpoints[endpoint]
+        data = text.encode("utf-8")
+        for mid, (offset, length) in spans.items():
+            crc = zlib.crc32(data[offset:offset + length])
+            self.matches.setdefault(str(mid), {})[endpoint] = [file_no, offset, length, crc]
+        self.changed = True
+
+    def update_month(self, path, endpoint, days):
+        """Index the records of an archive month file, {day file name: {match_id: record}}.
+
+        Records still indexed in a data/ day file keep that entry: an archived
+        day is always older than the days left in data/.
+        """
+        path = path.replace(os.sep, "/")
+        file_no = self.file_numbers.get(path)
+        if file_no is None:
+            file_no = self.file_numbers[path] = len(self.files)
+            self.files.append(path)
+        else:
+            self._months.pop(file_no, None)
+            # Records that left a rewritten month must not keep their old entry
+            archived = {mid for records in days.values() for mid in records}
+            for mid, endpoints in self.matches.items():
+                entry = endpoints.get(endpoint)
+                if entry and entry[0] == file_no and mid not in archived:
+                    del endpoints[endpoint]
+        for day in sorted(days):
+            for mid, record in days[day].items():
+                entry = self.entries(mid).get(endpoint)
+                if entry and entry[0] != file_no and not is_month(self.files[entry[0]]):
+                    continue
+                self.matches.setdefault(str(mid), {})[endpoint] = [file_no, day, 0, zlib.crc32(encode_record(record))]
+        self.changed = True
+
+    def forget_missing(self):
+        """Drop entries whose file no longer exists (e.g. moved to archive/ by archive.py)"""
+        gone = {i for i, p in enumerate(self.files) if not os.path.exists(p)}
+        if not gone:
+            return 0
+        dropped = 0
+        for endpoints in self.matches.values():
+            for endpoint in [ep for ep, entry in endpoints.items() if entry[0] in gone]:
+                del endpoints[endpoint]
+                dropped += 1
+        self.matches = {mid: endpoints for mid, endpoints in self.matches.items() if endpoints}
+        self.changed = True
+        return dropped
+
+    def entries(self, match_id):
+        """{endpoint: [file_no, offset, length, crc32]} of one match"""
+        return self.matches.get(str(match_id), {})
+
+    def read(self, match_id, endpoint):
+        """One record, read from its byte range; None when missing or no longer matching"""
+        entry = self.entries(match_id).get(endpoint)
+        if entry is None:
+            return None
+        file_no, offset, length, crc = entry
+        if is_month(self.files[file_no]):
+            return self._read_archived(file_no, offset, match_id, crc)
+        try:
+            data = self._mapped(file_no)[offset:offset + length]
+        except (OSError, ValueError):
+            return None
+        self.bytes_read += len(data)
+        if len(data) != length or zlib.crc32(data) != crc:
+            return None
+        return json.loads(data)
+
+    def _mapped(self, file_no):
+        """Read-only mmap of a data file: a record is a slice, not a seek and a read"""
+        mapped = self._mapped_files.pop(file_no, None)
+        if mapped is None:
+            with open(self.files[file_no], "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mapped_files) >= OPEN_FILES:
+                self._mapped_files.pop(next(iter(self._mapped_files))).close()
+        # Re-inserted last, so the dict's first key is the least recently used
+        self._mapped_files[file_no] = mapped
+        return mapped
+
+    def _read_archived(self, file_no, day, match_id, crc):
+        """One record of an archive month, from its parsed copy"""
+        month = self._months.pop(file_no, None)
+        if month is None:
+            try:
+                with open(self.files[file_no], "rb") as f:
+                    raw = f.read()
+                self.bytes_read += len(raw)
+                month = json.loads(gzip.decompress(raw))
+            except (OSError, ValueError):
+                return None
+            if len(self._months) >= OPEN_MONTHS:
+                self._months.pop(next(iter(self._months)))
+        self._months[file_no] = month
+        record = month.get(day, {}).get(str(match_id))
+        if record is None or zlib.crc32(encode_record(record)) != crc:
+            return None
+        return record
+
+    def close(self):
+        """Unmap every data file read so far"""
+        for mapped in self._mapped_files.values():
+            mapped.close()
+        self._mapped_files.clear()
+        self._months.clear()
+
+    def rebuild(self, data_dir=DATA_DIR, archive_dir=ARCHIVE_DATA_DIR):
+        """Re-index every archive month and data/<endpoint>/*.json from scratch; returns the files indexed.
+
+        Files are indexed in date order, so a match stored on several days
+        points at its latest one, as it would after fetch_data.py runs.
+        """
+        self.files, self.file_numbers, self.matches = [], {}, {}
+        self.changed = True
+        indexed = 0
+        for path in sorted(glob.glob(os.path.join(archive_dir, "*", "*.json.gz")), key=os.path.basename):
+            with gzip.open(path, "rb") as f:
+                self.update_month(path, os.path.basename(os.path.dirname(path)), json.loads(f.read()))
+            indexed += 1
+        for path in sorted(glob.glob(os.path.join(data_dir, "*", "*.json")), key=os.path.basename):
+            endpoint = os.path.basename(os.path.dirname(path))
+            with open(path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            try:
+                text, spans = encode_day(json.loads(raw))
+            except ValueError:
+                print(f"Warning: not indexing unreadable {path}")
+                continue
+            if text != raw:
+                print(f"Warning: not indexing {path}, it was not written by encode_day()")
+                continue
+            self.update(path, endpoint, text, spans)
+            indexed += 1
+        return indexed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the match id -> byte range index over data/")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="re-index every file under data/ and archive/data/")
+    args = parser.parse_args()
+
+    index = DataIndex(INDEX_PATH)
+    n = index.rebuild(DATA_DIR, ARCHIVE_DATA_DIR)
+    index.save()
+    print(f"Indexed {n} file(s), {len(index.matches)} match(es) → {INDEX_PATH}")
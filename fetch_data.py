@@ -1,8 +1,13 @@
 import asyncio
 import json
 import os
-from datetime import datetime, timedelta
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
 from curl_cffi.requests import AsyncSession
+from sofa_scheduler import RequestScheduler, api_url
+from run_report import RunReport
+from data_index import INDEX_PATH, DataIndex, encode_day
 
 # ================= CONFIG =================
 
@@ -17,17 +22,181 @@ ENDPOINTS = {
     "form": "pregame-form",
 }
 
+ALL_ENDPOINTS = (*ENDPOINTS, "incidents")
+
 DAYS_RANGE = range(-3, 4)  # last 3 days + today + next 3 days
-BATCH_SIZE = 5
-SLEEP = 1
+CONCURRENCY = 8            # requests in flight at once, across all matches
+REQUESTS_PER_SECOND = 5    # token-bucket rate; halved automatically on 403/429
+
+# ---------- MATCH LIFECYCLE ----------
+
+LIFECYCLE_PATH = os.path.join(DATA_DIR, "lifecycle.json")
+
+# status.type of a scheduled-events entry -> phase; unknown types count as scheduled
+PHASES = {
+    "notstarted": "scheduled", "postponed": "scheduled", "delayed": "scheduled",
+    "inprogress": "live", "interrupted": "live", "suspended": "live", "willcontinue": "live",
+    "finished": "finished", "canceled": "finished", "abandoned": "finished",
+}
+PRE_MATCH_ENDPOINTS = ("h2h", "odds", "form")               # settled before kickoff
+IN_PLAY_ENDPOINTS = ("lineups", "statistics", "incidents")  # change until the final whistle
+
+LINEUPS_LEAD = 2 * 3600        # lineups are published shortly before kickoff
+PRE_MATCH_REFRESH = 6 * 3600   # a scheduled match is re-fetched at most this often
+FINAL_ATTEMPTS = 3             # finished fetches before a match missing in-play records is frozen anyway
+LIFECYCLE_TTL = 7 * 86400      # entries of matches that kicked off longer ago are dropped
 
 # =========================================
 
+REPORT = RunReport("fetch_data")
+
 
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
 
+def atomic_write(path, content):
+    """Write via a temp file + rename so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    ensure_dir(directory)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class DayStore:
+    """In-memory results for one day, flushed once per endpoint file.
+
+    Matches are only ever added in memory while the day is processed, so the
+    concurrent tasks of a batch never touch the files; flush() merges into
+    what is already on disk, only rewrites files whose content changed and
+    points the data index at every record's byte range. A file that does not
+    parse is left in place, and its endpoint is noted in skipped.
+    """
+
+    def __init__(self, date_key, index):
+        self.date_key = date_key
+        self.index = index
+        self.results = {}
+        self.skipped = set()
+
+    def add(self, key, match_id, data):
+        self.results.setdefault(key, {})[str(match_id)] = data
+
+    def flush(self):
+        written = 0
+        for key, entries in self.results.items():
+            file = os.path.join(DATA_DIR, key, f"{self.date_key}.json")
+
+            old_text = None
+            store = {}
+            if os.path.exists(file):
+                with open(file, "r", encoding="utf-8") as f:
+                    old_text = f.read()
+                REPORT.read_bytes(len(old_text))
+                try:
+                    store = json.loads(old_text)
+                except ValueError as e:
+                    # Rewriting it would drop every other match's records of the day
+                    REPORT.error("unreadable_data_file", f"{file}: {e} (left unchanged)")
+                    self.skipped.add(key)
+                    continue
+
+            store.update(entries)
+            new_text, spans = encode_day(store)
+            if new_text != old_text:
+                atomic_write(file, new_text)
+                REPORT.wrote_bytes(len(new_text))
+                written += 1
+            self.index.update(file, key, new_text, spans)
+            REPORT.count(f"stored_{key}", len(entries))
+        REPORT.count("files_written", written)
+        return written
+
+
+def match_phase(event):
+    """scheduled, live or finished, from a scheduled-events entry"""
+    return PHASES.get(event.get("status", {}).get("type"), "scheduled")
+
+
+class MatchLifecycle:
+    """Phase of every match in the window, kept across runs in data/lifecycle.json.
+
+    Each entry holds the phase seen when the match was last fetched, its
+    kickoff, when it was fetched, when its pre-match records were last
+    requested ("refreshed") and, once finished, how many final fetches were
+    made and which in-play records answered them ("final_keys"). A finished
+    match is frozen once every in-play record (final lineups, statistics and
+    incidents) has been fetched after the final whistle: its records no
+    longer change, so it is never requested again. Records stored while it
+    was live do not count, as they hold the mid-game state.
+    """
+
+    def __init__(self, path=LIFECYCLE_PATH):
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self, now=None):
+        horizon = (now or time.time()) - LIFECYCLE_TTL
+        entries = {mid: e for mid, e in self.entries.items() if e.get("kickoff", 0) >= horizon}
+        atomic_write(self.path, json.dumps(entries, separators=(",", ":"), sort_keys=True))
+
+    def plan(self, event, stored, now):
+        """Endpoint keys worth requesting for a match; stored are the keys it already has records for"""
+        entry = self.entries.get(str(event["id"]), {})
+        if entry.get("frozen"):
+            return ()
+        phase = match_phase(event)
+        if phase != "scheduled":
+            final_keys = entry.get("final_keys", ()) if phase == "finished" else ()
+            # Pre-match records missed before kickoff are still fetched once
+            return (tuple(k for k in IN_PLAY_ENDPOINTS if k not in final_keys)
+                    + tuple(k for k in PRE_MATCH_ENDPOINTS if k not in stored))
+        keys = ()
+        if entry.get("phase") != "scheduled" or now - entry.get("refreshed", 0) >= PRE_MATCH_REFRESH:
+            keys = PRE_MATCH_ENDPOINTS
+        if event.get("startTimestamp", 0) - now <= LINEUPS_LEAD and "lineups" not in stored:
+            keys += ("lineups",)
+        return keys
+
+    def record(self, event, keys, found, now):
+        """Note a fetch of the match once its records are flushed.
+
+        keys are the endpoint keys plan() asked for, found those that answered and were stored.
+        """
+        mid = str(event["id"])
+        entry = self.entries.setdefault(mid, {})
+        if entry.get("fetched") == now:
+            # Already recorded this run (the match is listed on two days)
+            return
+        phase = match_phase(event)
+        entry.update(phase=phase, kickoff=event.get("startTimestamp", 0), fetched=now)
+        if phase == "scheduled" and any(key in keys for key in PRE_MATCH_ENDPOINTS):
+            # A lineups-only fetch close to kickoff leaves the pre-match refresh clock alone
+            entry["refreshed"] = now
+        if phase == "finished":
+            entry["final"] = entry.get("final", 0) + 1
+            entry["final_keys"] = sorted(set(entry.get("final_keys", ())) | (set(found) & set(IN_PLAY_ENDPOINTS)))
+            complete = all(key in entry["final_keys"] for key in IN_PLAY_ENDPOINTS)
+            if complete or entry["final"] >= FINAL_ATTEMPTS:
+                entry["frozen"] = True
+                REPORT.count("matches_frozen")
+
+
 def extract_goals(incidents_json, match_id):
     home_goals, away_goals = [], []
 
@@ -55,99 +224,103 @@ def extract_goals(incidents_json, match_id):
     }
 
 
-async def fetch_json(session, url):
-    try:
-        r = await session.get(url, impersonate="chrome120", timeout=15)
-        if r.status_code == 200:
-            return r.json()
-    except Exception as e:
-        print("[ERROR]", url, e)
-    return None
-
-
-async def fetch_match_ids(session, target_date):
+async def fetch_events(client, target_date):
     date_str = target_date.strftime("%Y-%m-%d")
-    url = f"https://www.sofascore.com/api/v1/sport/{SPORT}/scheduled-events/{date_str}"
+    url = api_url(f"sport/{SPORT}/scheduled-events/{date_str}", "www.sofascore.com")
 
-    data = await fetch_json(session, url)
+    data = await client.get_json(url)
     if not data:
         return []
 
-    return [e["id"] for e in data.get("events", [])]
-
+    return data.get("events", [])
 
-async def process_match(session, match_id, date_key):
-    # ---------- NORMAL ENDPOINTS ----------
-    for key, path in ENDPOINTS.items():
-        url = f"https://api.sofascore.com/api/v1/event/{match_id}/{path}"
-        data = await fetch_json(session, url)
-        if not data:
-            continue
 
-        folder = os.path.join(DATA_DIR, key)
-        ensure_dir(folder)
-        file = os.path.join(folder, f"{date_key}.json")
+def plan_day(lifecycle, index, events, now):
+    """{match id: endpoint keys} of a day's events, counting phases and the requests saved"""
+    plans = {}
+    for event in events:
+        keys = lifecycle.plan(event, index.entries(event["id"]), now)
+        REPORT.count(f"phase_{match_phase(event)}")
+        REPORT.count("endpoint_requests_skipped", len(ALL_ENDPOINTS) - len(keys))
+        if keys:
+            plans[event["id"]] = keys
+    return plans
 
-        store = {}
-        if os.path.exists(file):
-            with open(file, "r", encoding="utf-8") as f:
-                store = json.load(f)
 
-        store[str(match_id)] = data
+async def fetch_endpoints(client, match_id, keys=ALL_ENDPOINTS):
+    """{endpoint key: data} of one match, for the endpoints of keys that answered."""
+    base = api_url(f"event/{match_id}")
+    normal = [key for key in keys if key in ENDPOINTS]
+    # The scheduler bounds concurrency, so all endpoints can be requested at once
+    results = await asyncio.gather(
+        *[client.get_json(f"{base}/{ENDPOINTS[key]}") for key in normal],
+        *([client.get_json(f"{base}/incidents")] if "incidents" in keys else []),
+    )
 
-        with open(file, "w", encoding="utf-8") as f:
-            json.dump(store, f, indent=2)
+    # ---------- NORMAL ENDPOINTS ----------
+    found = {key: data for key, data in zip(normal, results) if data}
 
     # ---------- INCIDENTS (GOALS ONLY) ----------
-    inc_url = f"https://api.sofascore.com/api/v1/event/{match_id}/incidents"
-    inc_data = await fetch_json(session, inc_url)
-    if not inc_data:
-        return
+    if "incidents" in keys and results[-1]:
+        found["incidents"] = extract_goals(results[-1], match_id)
+    return found
 
-    goals_data = extract_goals(inc_data, match_id)
 
-    folder = os.path.join(DATA_DIR, "incidents")
-    ensure_dir(folder)
-    file = os.path.join(folder, f"{date_key}.json")
+async def process_match(client, match_id, keys, store):
+    found = await fetch_endpoints(client, match_id, keys)
+    for key, data in found.items():
+        store.add(key, match_id, data)
+    return found
 
-    store = {}
-    if os.path.exists(file):
-        with open(file, "r", encoding="utf-8") as f:
-            store = json.load(f)
 
-    store[str(match_id)] = goals_data
-
-    with open(file, "w", encoding="utf-8") as f:
-        json.dump(store, f, indent=2)
-
-
-async def process_day(session, offset):
-    day = datetime.utcnow() + timedelta(days=offset)
+async def process_day(client, index, lifecycle, offset, now):
+    day = datetime.now(timezone.utc) + timedelta(days=offset)
     date_key = day.strftime("%Y%m%d")
 
     print(f"[INFO] Processing {date_key}")
 
-    match_ids = await fetch_match_ids(session, day)
+    with REPORT.stage("schedule"):
+        events = await fetch_events(client, day)
 
-    if not match_ids:
+    if not events:
         print(f"[INFO] {date_key} → No matches found")
         return
+    REPORT.count("matches", len(events))
 
-    for i in range(0, len(match_ids), BATCH_SIZE):
-        batch = match_ids[i:i + BATCH_SIZE]
-        await asyncio.gather(*[
-            process_match(session, mid, date_key)
-            for mid in batch
+    store = DayStore(date_key, index)
+    plans = plan_day(lifecycle, index, events, now)
+
+    with REPORT.stage("match endpoints"):
+        found = await asyncio.gather(*[
+            process_match(client, mid, keys, store)
+            for mid, keys in plans.items()
         ])
-        await asyncio.sleep(SLEEP)
+
+    with REPORT.stage("write"):
+        written = store.flush()
+    # Only once their records are on disk may finished matches be frozen
+    events_by_id = {e["id"]: e for e in events}
+    for mid, answered in zip(plans, found):
+        kept = {key: data for key, data in answered.items() if key not in store.skipped}
+        lifecycle.record(events_by_id[mid], plans[mid], kept, now)
+    print(f"[INFO] {date_key} → {len(plans)} of {len(events)} matches fetched, {written} file(s) changed")
 
 
 async def main():
     async with AsyncSession() as session:
+        client = RequestScheduler(session, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, report=REPORT)
         ensure_dir(DATA_DIR)
-
-        for offset in DAYS_RANGE:
-            await process_day(session, offset)
+        index = DataIndex.load(INDEX_PATH)
+        lifecycle = MatchLifecycle(LIFECYCLE_PATH).load()
+        now = int(time.time())
+
+        try:
+            for offset in DAYS_RANGE:
+                await process_day(client, index, lifecycle, offset, now)
+        finally:
+            index.save()
+            lifecycle.save(now)
+            print("[INFO] Run report:", REPORT.write())
 
 
 if __name__ == "__main__":
@@ -1,33 +1,138 @@
+import argparse
 import asyncio
 import json
 import os
+import tempfile
+import time
 import pycountry  # <--- New Import
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from curl_cffi.requests import AsyncSession
+from sofa_scheduler import RequestScheduler, api_url
+from run_report import RunReport
 
 SOURCE_NAME = "YoSinTV_Ultra_Engine"
+CONCURRENCY = 8            # requests in flight at once, across events and channels
+REQUESTS_PER_SECOND = 5    # token-bucket rate; halved automatically on 403/429
+CHANNEL_CACHE_PATH = os.path.join("cache", "channel_names.json")
+CHANNEL_CACHE_TTL = 30 * 86400  # channel names almost never change
+TV_MAX_AGE_HOURS = 24           # re-fetch TV listings of unchanged fixtures after this long
+REFRESH_TIMES_PATH = os.path.join("cache", "refreshed.json")
+REFRESH_TIMES_TTL = 8 * 86400   # a fixture leaves the +7 day window after this
 
-async def get_channel_name(session, channel_id):
-    """Fetches the actual name of a channel (e.g., 'Sky Sports') from its ID."""
-    url = f"https://api.sofascore.com/api/v1/tv/channel/{channel_id}/schedule"
+REPORT = RunReport("future_scraper")
+
+def atomic_write(path, content):
+    """Write via a temp file + rename so the build never reads a partial file."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
     try:
-        res = await session.get(url, impersonate="chrome120", timeout=5)
-        if res.status_code == 200:
-            data = res.json()
-            return data.get('channel', {}).get('name', 'Unknown Channel')
-    except:
-        pass
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+class ChannelNameCache:
+    """On-disk channel id -> name cache shared by every lookup in a run.
+
+    Entries older than the TTL are re-fetched, failed lookups are not cached,
+    and concurrent lookups of the same id wait on a single in-flight fetch.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.inflight = {}
+        self.hits = 0
+        self.fetches = 0
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        atomic_write(self.path, json.dumps(self.entries, separators=(",", ":"), sort_keys=True))
+
+    async def lookup(self, client, channel_id):
+        key = str(channel_id)
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["fetched"] < self.ttl:
+            self.hits += 1
+            return entry["name"]
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(self._fetch(client, key))
+        return await task
+
+    async def _fetch(self, client, key):
+        try:
+            self.fetches += 1
+            name = await get_channel_name(client, key)
+            if name != "Unknown Channel":
+                self.entries[key] = {"name": name, "fetched": int(time.time())}
+            return name
+        finally:
+            del self.inflight[key]
+
+class RefreshTimes:
+    """When each listed fixture was last re-fetched, kept in cache/ rather than in date/.
+
+    A refetch that finds nothing new leaves the committed record, fetched_at
+    included, untouched; this is how refresh_reason() still knows it is current.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self, now=None):
+        horizon = (now or time.time()) - self.ttl
+        entries = {mid: t for mid, t in self.entries.items() if t >= horizon}
+        atomic_write(self.path, json.dumps(entries, separators=(",", ":"), sort_keys=True))
+
+    def get(self, match_id):
+        return self.entries.get(str(match_id), 0)
+
+    def mark(self, match_ids, now):
+        for mid in match_ids:
+            self.entries[str(mid)] = int(now)
+
+async def get_channel_name(client, channel_id):
+    """Fetches the actual name of a channel (e.g., 'Sky Sports') from its ID."""
+    url = api_url(f"tv/channel/{channel_id}/schedule")
+    data = await client.get_json(url, timeout=5)
+    if data:
+        return data.get('channel', {}).get('name', 'Unknown Channel')
+    REPORT.error("channel_name_unresolved")
     return "Unknown Channel"
 
-async def get_tv_data(session, match_id):
+async def get_tv_data(client, channel_names, match_id):
     """Fetches country-specific TV channels and resolves their names."""
-    tv_url = f"https://api.sofascore.com/api/v1/tv/event/{match_id}/country-channels"
+    tv_url = api_url(f"tv/event/{match_id}/country-channels")
     broadcasters = []
     try:
-        res = await session.get(tv_url, impersonate="chrome120", timeout=10)
-        if res.status_code != 200: return []
+        data = await client.get_json(tv_url, timeout=10)
+        if not data: return []
         
-        country_channels = res.json().get('countryChannels', {})
+        country_channels = data.get('countryChannels', {})
         
         for country_code, channel_ids in country_channels.items():
             # Convert "AD" to "Andorra"
@@ -36,10 +141,11 @@ async def get_tv_data(session, match_id):
             except (AttributeError, LookupError):
                 full_country = country_code # Fallback if not found
 
-            channel_tasks = [get_channel_name(session, cid) for cid in channel_ids]
+            channel_tasks = [channel_names.lookup(client, cid) for cid in channel_ids]
             names = await asyncio.gather(*channel_tasks)
             
-            clean_names = list(set([n for n in names if n != "Unknown Channel"]))
+            # Sorted so an unchanged listing serialises identically between runs
+            clean_names = sorted(set([n for n in names if n != "Unknown Channel"]))
             
             broadcasters.append({
                 "country": full_country, # Now using full name
@@ -47,72 +153,181 @@ async def get_tv_data(session, match_id):
             })
             
         return sorted(broadcasters, key=lambda x: x['country'])
-    except:
+    except Exception as e:
+        REPORT.error(f"tv_data:{type(e).__name__}", f"match {match_id}: {e!r}")
         return []
 
-async def fetch_match_details(session, match_id):
+def match_record(ev, tv_info):
+    """The date/ record of an /event/{id} payload and its TV listings."""
+    return {
+        "match_id": ev.get('id'),
+        "kickoff": ev.get('startTimestamp'),
+        "fixture": f"{ev['homeTeam']['name']} vs {ev['awayTeam']['name']}",
+        "league_id": ev.get('tournament', {}).get('uniqueTournament', {}).get('id', 0),
+        "league": ev.get('tournament', {}).get('name', 'Unknown'),
+        "venue": ev.get('venue', {}).get('name', 'TBA'),
+        "tv_channels": tv_info,
+        "fetched_at": int(time.time())
+    }
+
+async def fetch_match_details(client, channel_names, match_id):
     """Fetches full fixture meta-data and TV listings."""
-    event_url = f"https://api.sofascore.com/api/v1/event/{match_id}"
+    event_url = api_url(f"event/{match_id}")
     try:
-        res = await session.get(event_url, impersonate="chrome120", timeout=10)
-        if res.status_code != 200: return None
+        data = await client.get_json(event_url, timeout=10)
+        if not data: return None
         
-        ev = res.json().get('event', {})
-        tv_info = await get_tv_data(session, match_id)
+        ev = data.get('event', {})
+        tv_info = await get_tv_data(client, channel_names, match_id)
         
-        return {
-            "match_id": ev.get('id'),
-            "kickoff": ev.get('startTimestamp'),
-            "fixture": f"{ev['homeTeam']['name']} vs {ev['awayTeam']['name']}",
-            "league_id": ev.get('tournament', {}).get('uniqueTournament', {}).get('id', 0),
-            "league": ev.get('tournament', {}).get('name', 'Unknown'),
-            "venue": ev.get('venue', {}).get('name', 'TBA'),
-            "tv_channels": tv_info
-        }
-    except:
+        return match_record(ev, tv_info)
+    except Exception as e:
+        REPORT.error(f"match_details:{type(e).__name__}", f"match {match_id}: {e!r}")
         return None
 
-async def process_day(session, days_offset):
-    """Handles the scraping for a single future day."""
-    target_date = datetime.now() + timedelta(days=days_offset)
+def load_day_file(path):
+    """Existing records of a date file keyed by match id, plus the raw text."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        return {m.get('match_id'): m for m in json.loads(text)}, text
+    except (FileNotFoundError, ValueError):
+        return {}, None
+
+def refresh_reason(record, event, max_age, now, refreshed=0):
+    """Why a fixture's details must be re-fetched, or None to keep the stored record.
+
+    refreshed is when the fixture was last re-fetched (RefreshTimes), which
+    is later than its fetched_at when that refetch changed nothing.
+    """
+    if record is None:
+        return "new"
+    if record.get('kickoff') != event.get('startTimestamp'):
+        return "changed"
+    try:
+        fixture = f"{event['homeTeam']['name']} vs {event['awayTeam']['name']}"
+    except KeyError:
+        fixture = None
+    if fixture and record.get('fixture') != fixture:
+        return "changed"
+    if now - max(record.get('fetched_at', 0), refreshed) > max_age:
+        return "stale"
+    return None
+
+def same_listing(record, old):
+    """True when two records of a fixture differ at most in fetched_at"""
+    return ({k: v for k, v in record.items() if k != 'fetched_at'}
+            == {k: v for k, v in old.items() if k != 'fetched_at'})
+
+def save_day(save_path, events, fetched, existing, old_text):
+    """Write a day's fixtures in schedule order; returns False when the file is unchanged.
+
+    A failed fetch keeps the previous record rather than dropping the fixture,
+    and so does a refetch that only differs from it in fetched_at, so an
+    unchanged fixture leaves the file's bytes alone.
+    """
+    final_data = []
+    for event in events:
+        record = fetched.get(event['id'])
+        old = existing.get(event['id'])
+        if record is None or (old is not None and same_listing(record, old)):
+            record = old
+        if record is not None:
+            final_data.append(record)
+
+    new_text = json.dumps(final_data, indent=4)
+    if new_text == old_text:
+        return False
+    with REPORT.stage("write"):
+        atomic_write(save_path, new_text)
+    REPORT.wrote_bytes(len(new_text))
+    REPORT.count("files_written")
+    return True
+
+async def refresh_listing(save_path, events, fetch, full, max_age, refresh_times):
+    """Re-fetch a day's fixtures that need it and write the day file.
+
+    Only fixtures that are new, changed kickoff/teams, or whose TV data is
+    older than max_age seconds are passed to fetch (an async match id ->
+    record or None; all of them with full=True); the rest are carried over
+    from the existing file, which is only rewritten when its content changes.
+    Returns ({refresh reason or None: fixtures}, fixtures fetched, written).
+    """
+    existing, old_text = load_day_file(save_path)
+    now = time.time()
+    reasons = [
+        "full" if full else refresh_reason(existing.get(event['id']), event, max_age, now,
+                                           refresh_times.get(event['id']))
+        for event in events
+    ]
+    to_fetch = [event['id'] for event, reason in zip(events, reasons) if reason]
+    counts = {r: reasons.count(r) for r in set(reasons)}
+    for reason, n in counts.items():
+        REPORT.count(f"fixtures_{reason or 'unchanged'}", n)
+
+    with REPORT.stage("match details"):
+        fetched = dict(zip(to_fetch, await asyncio.gather(*(fetch(mid) for mid in to_fetch))))
+    REPORT.count("fixtures_lost", sum(1 for mid in to_fetch if fetched[mid] is None and mid not in existing))
+    refresh_times.mark([mid for mid in to_fetch if fetched[mid] is not None], now)
+    return counts, len(to_fetch), save_day(save_path, events, fetched, existing, old_text)
+
+async def process_day(client, channel_names, refresh_times, days_offset, full=False, max_age_hours=TV_MAX_AGE_HOURS):
+    """Handles the scraping for a single future day, see refresh_listing."""
+    target_date = datetime.now(timezone.utc) + timedelta(days=days_offset)
     date_query = target_date.strftime('%Y-%m-%d')
     file_name = target_date.strftime('%Y%m%d') + ".json"
+    save_path = os.path.join("date", file_name)
     
-    schedule_url = f"https://www.sofascore.com/api/v1/sport/football/scheduled-events/{date_query}"
+    schedule_url = api_url(f"sport/football/scheduled-events/{date_query}", "www.sofascore.com")
     
     print(f"--- Processing Day +{days_offset} ({date_query}) ---")
-    resp = await session.get(schedule_url, impersonate="chrome120", timeout=30)
+    with REPORT.stage("schedule"):
+        schedule = await client.get_json(schedule_url, timeout=30)
     
-    if resp.status_code != 200:
+    if schedule is None:
         print(f"Failed to fetch schedule for {date_query}")
         return
 
-    events = resp.json().get('events', [])
+    events = schedule.get('events', [])
     if not events:
         print(f"No events found for {date_query}")
         return
 
-    print(f"Found {len(events)} fixtures. Resolving TV data...")
-    tasks = [fetch_match_details(session, event['id']) for event in events]
-    results = await asyncio.gather(*tasks)
-    
-    final_data = [r for r in results if r is not None]
+    def fetch(match_id):
+        return fetch_match_details(client, channel_names, match_id)
 
-    if not os.path.exists('date'): os.makedirs('date')
-    save_path = os.path.join("date", file_name)
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump(final_data, f, indent=4)
-    
+    counts, _, written = await refresh_listing(save_path, events, fetch, full, max_age_hours * 3600, refresh_times)
+    print(f"Found {len(events)} fixtures: {counts.get('new', 0)} new, {counts.get('changed', 0)} changed, "
+          f"{counts.get('stale', 0) + counts.get('full', 0)} to refresh, {counts.get(None, 0)} unchanged")
+    if not written:
+        print(f"DONE: {save_path} unchanged")
+        return
     print(f"DONE: Generated {save_path}")
 
-async def main():
+async def main(full=False, max_age_hours=TV_MAX_AGE_HOURS):
     async with AsyncSession() as session:
-        # range(1, 8) generates numbers: 1, 2, 3, 4, 5, 6, 7
-        # This covers exactly one week of upcoming fixtures
-        for offset in range(1, 8):
-            await process_day(session, offset)
-            # Short sleep to prevent hitting SofaScore rate limits
-            await asyncio.sleep(2)
+        # Rate limits are enforced per request by the shared scheduler
+        client = RequestScheduler(session, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, report=REPORT)
+        channel_names = ChannelNameCache(CHANNEL_CACHE_PATH, CHANNEL_CACHE_TTL).load()
+        refresh_times = RefreshTimes(REFRESH_TIMES_PATH, REFRESH_TIMES_TTL).load()
+        try:
+            # range(1, 8) generates numbers: 1, 2, 3, 4, 5, 6, 7
+            # This covers exactly one week of upcoming fixtures
+            for offset in range(1, 8):
+                await process_day(client, channel_names, refresh_times, offset, full, max_age_hours)
+        finally:
+            channel_names.save()
+            refresh_times.save()
+            REPORT.count("channel_cache_hits", channel_names.hits)
+            REPORT.count("channel_cache_fetches", channel_names.fetches)
+            print("Run report:", REPORT.write())
+        print(f"Channel names: {channel_names.hits} cached, {channel_names.fetches} fetched")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Scrape the next 7 days of fixtures and TV listings into date/")
+    parser.add_argument("--full", action="store_true",
+                        help="re-fetch every fixture instead of only new, changed or stale ones")
+    parser.add_argument("--max-age", type=float, default=TV_MAX_AGE_HOURS, metavar="HOURS",
+                        help=f"re-fetch TV data older than this (default {TV_MAX_AGE_HOURS})")
+    args = parser.parse_args()
+    asyncio.run(main(args.full, args.max_age))
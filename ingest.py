@@ -0,0 +1,219 @@
+"""One SofaScore ingestion run: schedule -> event details -> TV channels -> match endpoints.
+
+future_scraper.py (date/ listings, +1..+7 days) and fetch_data.py (data/
+endpoints, -3..+3 days) each fetched the schedule of their own days and
+every fixture on them. This pipeline runs both over one session and one
+RequestScheduler:
+
+  schedule   each day's scheduled-events is fetched once, however many
+             outputs need it
+  details    /event/{id} of fixtures whose listing must be refreshed
+  tv         country channels (names from the shared channel cache)
+  endpoints  h2h, lineups, statistics, odds, form and incidents, only those
+             the match's lifecycle phase still needs (fetch_data.MatchLifecycle)
+
+Each stage is a queue with its own workers. Work is keyed by match id, so a
+fixture listed on two days (or needed by two outputs) is fetched once and
+both days await the same result. A day's file is written as soon as the
+fixtures on it are complete, not at the end of the run.
+
+    python ingest.py [--full] [--max-age HOURS] [--no-listings] [--no-endpoints]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from curl_cffi.requests import AsyncSession
+
+import fetch_data
+import future_scraper
+from data_index import INDEX_PATH, DataIndex
+from fetch_data import LIFECYCLE_PATH, DayStore, MatchLifecycle, fetch_endpoints, plan_day
+from future_scraper import (CHANNEL_CACHE_PATH, CHANNEL_CACHE_TTL, REFRESH_TIMES_PATH, REFRESH_TIMES_TTL,
+                            TV_MAX_AGE_HOURS, ChannelNameCache, RefreshTimes, get_tv_data, match_record,
+                            refresh_listing)
+from run_report import RunReport
+from sofa_scheduler import RequestScheduler, api_url
+
+LISTING_DAYS = range(1, 8)     # date/ files written, as future_scraper.py
+ENDPOINT_DAYS = range(-3, 4)   # data/<endpoint>/ files written, as fetch_data.py
+CONCURRENCY = 8                # requests in flight at once, across all stages
+REQUESTS_PER_SECOND = 5        # token-bucket rate; halved automatically on 403/429
+STAGE_WORKERS = 8              # consumers per queue; the scheduler is the real limit
+
+SCHEDULE_URL = api_url("sport/football/scheduled-events/{date}", "www.sofascore.com")
+EVENT_URL = api_url("event/{match_id}")
+
+REPORT = RunReport("ingest")
+
+
+class Pipeline:
+    """The stage queues of one run and the per-match results they produce.
+
+    details/tv/endpoints map a match id to a future shared by every day that
+    needs it; queue() only enqueues an id the first time it is asked for.
+    """
+
+    def __init__(self, client, channel_names, refresh_times, index, lifecycle, full=False,
+                 max_age_hours=TV_MAX_AGE_HOURS):
+        self.client = client
+        self.channel_names = channel_names
+        self.refresh_times = refresh_times
+        self.index = index
+        self.lifecycle = lifecycle
+        self.now = int(time.time())
+        # match id -> endpoint keys its lifecycle phase needs, see fetch_data.plan_day
+        self.plans = {}
+        self.full = full
+        self.max_age = max_age_hours * 3600
+        self.queues = {stage: asyncio.Queue() for stage in ("details", "tv", "endpoints")}
+        self.results = {stage: {} for stage in self.queues}
+
+    def queue(self, stage, match_id):
+        """Future of a stage's result for one match, enqueueing the work only once"""
+        future = self.results[stage].get(match_id)
+        if future is None:
+            future = self.results[stage][match_id] = asyncio.get_running_loop().create_future()
+            self.queues[stage].put_nowait(match_id)
+        else:
+            REPORT.count(f"{stage}_deduplicated")
+        return future
+
+    async def worker(self, stage, handle):
+        queue = self.queues[stage]
+        while True:
+            match_id = await queue.get()
+            try:
+                result = await handle(match_id)
+            except Exception as e:
+                REPORT.error(f"{stage}:{type(e).__name__}", f"match {match_id}: {e!r}")
+                result = None
+            self.results[stage][match_id].set_result(result)
+            queue.task_done()
+
+    # ---------- STAGES ----------
+
+    async def fetch_details(self, match_id):
+        data = await self.client.get_json(EVENT_URL.format(match_id=match_id), timeout=10)
+        return data.get("event", {}) if data else None
+
+    async def fetch_tv(self, match_id):
+        return await get_tv_data(self.client, self.channel_names, match_id)
+
+    async def fetch_match_endpoints(self, match_id):
+        return await fetch_endpoints(self.client, match_id, self.plans[match_id])
+
+    async def record(self, match_id):
+        """Listing record of a fixture once its details and TV stages are done, or None"""
+        ev = await self.queue("details", match_id)
+        if ev is None:
+            return None
+        # TV channels are only fetched for fixtures whose details arrived
+        tv_info = await self.queue("tv", match_id)
+        try:
+            return match_record(ev, tv_info)
+        except Exception as e:
+            REPORT.error(f"match_details:{type(e).__name__}", f"match {match_id}: {e!r}")
+            return None
+
+    # ---------- WRITERS ----------
+
+    async def write_listing(self, day, events):
+        """Refresh and write date/YYYYMMDD.json with future_scraper.refresh_listing"""
+        save_path = os.path.join("date", day.strftime("%Y%m%d") + ".json")
+        _, fetched, changed = await refresh_listing(save_path, events, self.record, self.full, self.max_age,
+                                                    self.refresh_times)
+        print(f"[listing] {save_path}: {fetched} of {len(events)} fixtures fetched, "
+              f"{'written' if changed else 'unchanged'}")
+
+    async def write_endpoints(self, day, events):
+        """Fetch and flush data/<endpoint>/YYYYMMDD.json, as fetch_data.process_day does"""
+        store = DayStore(day.strftime("%Y%m%d"), self.index)
+        plans = plan_day(self.lifecycle, self.index, events, self.now)
+        self.plans.update(plans)
+        results = await asyncio.gather(*(self.queue("endpoints", mid) for mid in plans))
+        for match_id, found in zip(plans, results):
+            for key, data in (found or {}).items():
+                store.add(key, match_id, data)
+        written = store.flush()
+        # Only once their records are on disk may finished matches be frozen
+        events_by_id = {e["id"]: e for e in events}
+        for match_id, found in zip(plans, results):
+            if found is not None:
+                kept = {key: data for key, data in found.items() if key not in store.skipped}
+                self.lifecycle.record(events_by_id[match_id], plans[match_id], kept, self.now)
+        print(f"[endpoints] {store.date_key}: {len(plans)} of {len(events)} matches fetched, "
+              f"{written} file(s) changed")
+
+    async def process_day(self, offset, listing, endpoints):
+        """Fetch one day's schedule and run the writers that need it"""
+        day = datetime.now(timezone.utc) + timedelta(days=offset)
+        schedule = await self.client.get_json(SCHEDULE_URL.format(date=day.strftime("%Y-%m-%d")), timeout=30)
+        REPORT.count("schedules_fetched")
+        events = (schedule or {}).get("events", [])
+        if not events:
+            print(f"[schedule] {day:%Y-%m-%d}: {'failed' if schedule is None else 'no events'}")
+            return
+        REPORT.count("schedule_events", len(events))
+        writers = []
+        if listing:
+            writers.append(self.write_listing(day, events))
+        if endpoints:
+            writers.append(self.write_endpoints(day, events))
+        await asyncio.gather(*writers)
+
+    async def run(self, listing_days, endpoint_days):
+        handlers = {"details": self.fetch_details, "tv": self.fetch_tv, "endpoints": self.fetch_match_endpoints}
+        workers = [asyncio.ensure_future(self.worker(stage, handlers[stage]))
+                   for stage in handlers for _ in range(STAGE_WORKERS)]
+        try:
+            with REPORT.stage("ingest"):
+                await asyncio.gather(*(
+                    self.process_day(offset, offset in listing_days, offset in endpoint_days)
+                    for offset in sorted(set(listing_days) | set(endpoint_days))
+                ))
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        for stage, results in self.results.items():
+            REPORT.count(f"{stage}_fetched", len(results))
+
+
+async def main(listing_days=LISTING_DAYS, endpoint_days=ENDPOINT_DAYS, full=False, max_age_hours=TV_MAX_AGE_HOURS):
+    async with AsyncSession() as session:
+        client = RequestScheduler(session, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, report=REPORT)
+        channel_names = ChannelNameCache(CHANNEL_CACHE_PATH, CHANNEL_CACHE_TTL).load()
+        refresh_times = RefreshTimes(REFRESH_TIMES_PATH, REFRESH_TIMES_TTL).load()
+        index = DataIndex.load(INDEX_PATH)
+        lifecycle = MatchLifecycle(LIFECYCLE_PATH).load()
+        pipeline = Pipeline(client, channel_names, refresh_times, index, lifecycle, full, max_age_hours)
+        try:
+            await pipeline.run(listing_days, endpoint_days)
+        finally:
+            index.save()
+            lifecycle.save(pipeline.now)
+            channel_names.save()
+            refresh_times.save(pipeline.now)
+            REPORT.count("channel_cache_hits", channel_names.hits)
+            REPORT.count("channel_cache_fetches", channel_names.fetches)
+            # The reused writers and lookups count into their own modules' reports
+            REPORT.merge(future_scraper.REPORT.to_dict())
+            REPORT.merge(fetch_data.REPORT.to_dict())
+            print("Run report:", REPORT.write())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch fixtures, TV listings and match data in one pass")
+    parser.add_argument("--full", action="store_true",
+                        help="re-fetch every listed fixture instead of only new, changed or stale ones")
+    parser.add_argument("--max-age", type=float, default=TV_MAX_AGE_HOURS, metavar="HOURS",
+                        help=f"re-fetch TV data older than this (default {TV_MAX_AGE_HOURS})")
+    parser.add_argument("--no-listings", action="store_true", help="skip the date/ listings (+1..+7 days)")
+    parser.add_argument("--no-endpoints", action="store_true", help="skip the data/ endpoints (-3..+3 days)")
+    args = parser.parse_args()
+    asyncio.run(main(range(0) if args.no_listings else LISTING_DAYS,
+                     range(0) if args.no_endpoints else ENDPOINT_DAYS,
+                     args.full, args.max_age))
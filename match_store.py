@@ -0,0 +1,288 @@
+"""Compact binary store for the date/*.json fixture archive.
+
+Layout (little endian), sections back to back after the header:
+
+    header      magic, version and the count of each section below
+    offsets     (n_strings + 1) x u32 byte offsets into the string blob
+    blob        UTF-8 bytes of every distinct string, padded to 8 bytes
+    sources     one SOURCE row per converted JSON file (name, size, mtime, hash)
+    matches     one fixed-width MATCH row per fixture, in file order
+    broadcasts  one BROADCAST row per (match, country)
+    channels    u32 string ids, the channel list of each broadcast row
+
+Every fixture, country, channel, league and venue name is stored once in
+the string table and referenced by id, so a store is a fraction of the
+indented JSON and can be memory-mapped and read without parsing. Each
+match row carries the same record hash build.py computes from JSON, so
+incremental builds do not care which format the data came from.
+
+    python match_store.py convert [--out store/matches.bin] [date/*.json ...]
+    python match_store.py export [--store store/matches.bin] --out DIR
+"""
+import argparse
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b"LSTV"
+VERSION = 3
+DEFAULT_PATH = os.path.join("store", "matches.bin")
+
+HEADER = struct.Struct("<4sI6I")  # magic, version, strings, sources, matches, broadcasts, channels, reserved
+SOURCE = struct.Struct("<IQq16s")  # name, byte size, mtime (ns), content hash
+# match_id, kickoff, fetched_at, league_id, fixture, league, venue, source,
+# first broadcast row, broadcast rows, field flags, record hash
+MATCH = struct.Struct("<qqqiIIIIIIH16s")
+BROADCAST = struct.Struct("<III")  # country, first channel ref, channel refs
+
+# Which optional JSON keys a record had, so export reproduces them. A record
+# without a venue keeps its "stadium" in the venue column (HAS_STADIUM), the
+# venue the builder shows; a stadium next to a venue is not kept.
+HAS_LEAGUE_ID, HAS_LEAGUE, HAS_VENUE, HAS_TV, HAS_FETCHED_AT, HAS_STADIUM = 1, 2, 4, 8, 16, 32
+
+
+def record_hash(m):
+    """Same digest build.py uses for a match record loaded from JSON."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps(m, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    h.update(b'\0')
+    return h.digest()
+
+
+def _pad8(n):
+    return (8 - n % 8) % 8
+
+
+def file_digest(raw):
+    """Content hash of a converted file, the same as build.py's content_hash() of it"""
+    digest = hashlib.blake2b(raw, digest_size=16)
+    digest.update(b'\0')
+    return digest.digest()
+
+
+def convert(paths, out_path=DEFAULT_PATH):
+    """Convert JSON day files into a store at out_path (written atomically).
+
+    Records without a match_id or kickoff cannot be rendered and are skipped;
+    keys other than the ones the scrapers write are not kept.
+    """
+    strings, string_ids = [], {}
+
+    def sid(value):
+        value = "" if value is None else str(value)
+        i = string_ids.get(value)
+        if i is None:
+            i = string_ids[value] = len(strings)
+            strings.append(value)
+        return i
+
+    sources, matches, broadcasts, channels = [], [], [], []
+    skipped = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        source = len(sources)
+        sources.append(SOURCE.pack(sid(os.path.basename(path)), len(raw), mtime_ns, file_digest(raw)))
+        for m in json.loads(raw):
+            if m.get("match_id") is None or m.get("kickoff") is None:
+                skipped += 1
+                continue
+            flags = 0
+            for bit, key in ((HAS_LEAGUE_ID, "league_id"), (HAS_LEAGUE, "league"), (HAS_VENUE, "venue"),
+                             (HAS_TV, "tv_channels"), (HAS_FETCHED_AT, "fetched_at")):
+                if m.get(key) is not None:
+                    flags |= bit
+            venue = m.get("venue")
+            if not venue and m.get("stadium"):
+                venue = m["stadium"]
+                flags |= HAS_STADIUM
+            first_broadcast = len(broadcasts)
+            for c in m.get("tv_channels") or []:
+                broadcasts.append(BROADCAST.pack(sid(c["country"]), len(channels), len(c["channels"])))
+                channels.extend(sid(ch) for ch in c["channels"])
+            matches.append(MATCH.pack(
+                int(m["match_id"]), int(m["kickoff"]), int(m.get("fetched_at") or 0), int(m.get("league_id") or 0),
+                sid(m.get("fixture")), sid(m.get("league")), sid(venue), source,
+                first_broadcast, len(broadcasts) - first_broadcast, flags, record_hash(m),
+            ))
+
+    blob, offsets = bytearray(), [0]
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+    blob += b"\0" * _pad8(len(blob))
+
+    parts = [
+        HEADER.pack(MAGIC, VERSION, len(strings), len(sources), len(matches), len(broadcasts), len(channels), 0),
+        struct.pack(f"<{len(offsets)}I", *offsets),
+    ]
+    parts.append(b"\0" * _pad8(len(parts[1])))
+    parts += [bytes(blob), b"".join(sources), b"".join(matches), b"".join(broadcasts),
+              struct.pack(f"<{len(channels)}I", *channels)]
+
+    directory = os.path.dirname(out_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for part in parts:
+                f.write(part)
+        os.replace(temp_path, out_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return {"matches": len(matches), "strings": len(strings), "skipped": skipped}
+
+
+class MatchStore:
+    """Read-only view of a store file, memory-mapped by default.
+
+    Rows are unpacked on access and strings decoded on first use, so opening
+    a store costs a header read regardless of how many fixtures it holds.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, use_mmap=True):
+        self.path = path
+        with open(path, "rb") as f:
+            if use_mmap:
+                self.buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                self.buf = memoryview(f.read())
+
+        magic, version, n_strings, n_sources, n_matches, n_broadcasts, n_channels, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} match store")
+
+        pos = HEADER.size
+        self.offsets = self.buf[pos:pos + 4 * (n_strings + 1)].cast("I")
+        pos += 4 * (n_strings + 1)
+        pos += _pad8(pos - HEADER.size)
+        self.blob_start = pos
+        pos += self.offsets[n_strings] if n_strings else 0
+        pos += _pad8(pos - self.blob_start)
+        self.sources_start = pos
+        pos += SOURCE.size * n_sources
+        self.matches_start = pos
+        pos += MATCH.size * n_matches
+        self.broadcasts_start = pos
+        pos += BROADCAST.size * n_broadcasts
+        self.channel_refs = self.buf[pos:pos + 4 * n_channels].cast("I")
+
+        self.n_sources = n_sources
+        self.n_matches = n_matches
+        self._strings = {}
+
+    def __len__(self):
+        return self.n_matches
+
+    def string(self, i):
+        s = self._strings.get(i)
+        if s is None:
+            start = self.blob_start + self.offsets[i]
+            s = self._strings[i] = str(self.buf[start:self.blob_start + self.offsets[i + 1]], "utf-8")
+        return s
+
+    def sources(self):
+        """(file name, byte size, mtime in ns, content hash) of every JSON file converted, in order."""
+        return [(self.string(name), size, mtime_ns, digest) for name, size, mtime_ns, digest in
+                SOURCE.iter_unpack(self.buf[self.sources_start:self.matches_start])]
+
+    def rows(self):
+        """Raw MATCH tuples in file order, without decoding any strings."""
+        return MATCH.iter_unpack(self.buf[self.matches_start:self.broadcasts_start])
+
+    def row(self, i):
+        return MATCH.unpack_from(self.buf, self.matches_start + i * MATCH.size)
+
+    def broadcasters(self, i):
+        """[(country, [channels])] of match row i."""
+        first, count = self.row(i)[8:10]
+        out = []
+        for j in range(first, first + count):
+            country, ref, n = BROADCAST.unpack_from(self.buf, self.broadcasts_start + j * BROADCAST.size)
+            out.append((self.string(country), [self.string(c) for c in self.channel_refs[ref:ref + n]]))
+        return out
+
+    def record(self, i):
+        """Match row i as the dict the scrapers write to date/*.json."""
+        match_id, kickoff, fetched_at, league_id, fixture, league, venue, _, _, _, flags, _ = self.row(i)
+        m = {"match_id": match_id, "kickoff": kickoff, "fixture": self.string(fixture)}
+        if flags & HAS_LEAGUE_ID:
+            m["league_id"] = league_id
+        if flags & HAS_LEAGUE:
+            m["league"] = self.string(league)
+        if flags & HAS_STADIUM:
+            m["stadium"] = self.string(venue)
+            if flags & HAS_VENUE:
+                m["venue"] = ""
+        elif flags & HAS_VENUE:
+            m["venue"] = self.string(venue)
+        if flags & HAS_TV:
+            m["tv_channels"] = [{"country": c, "channels": chs} for c, chs in self.broadcasters(i)]
+        if flags & HAS_FETCHED_AT:
+            m["fetched_at"] = fetched_at
+        return m
+
+    def is_stale(self, paths):
+        """True when paths are not the exact files (by name, size and content hash) the store was built from.
+
+        Only stat() is needed for a file whose size and mtime are those it was
+        converted with; one with a new mtime (a rewrite, or a fresh checkout)
+        is read and compared by hash, and a new size is a change outright.
+        """
+        sources = {name: (size, mtime_ns, digest) for name, size, mtime_ns, digest in self.sources()}
+        current = {os.path.basename(p): p for p in paths}
+        if current.keys() != sources.keys():
+            return True
+        touched = []
+        for name, path in current.items():
+            st = os.stat(path)
+            size, mtime_ns, _ = sources[name]
+            if st.st_size != size:
+                return True
+            if st.st_mtime_ns != mtime_ns:
+                touched.append(name)
+        for name in touched:
+            with open(current[name], "rb") as f:
+                if file_digest(f.read()) != sources[name][2]:
+                    return True
+        return False
+
+    def export_json(self, out_dir):
+        """Write the store back out as one JSON day file per converted source."""
+        names = [name for name, _, _, _ in self.sources()]
+        days = {}
+        for i, row in enumerate(self.rows()):
+            days.setdefault(row[7], []).append(self.record(i))
+        os.makedirs(out_dir, exist_ok=True)
+        for source, records in days.items():
+            with open(os.path.join(out_dir, names[source]), "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=4)
+        return len(days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert date/*.json to a compact match store and back")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_convert = sub.add_parser("convert", help="build a store from JSON day files")
+    p_convert.add_argument("paths", nargs="*", help="JSON files (default: date/*.json)")
+    p_convert.add_argument("--out", default=DEFAULT_PATH)
+    p_export = sub.add_parser("export", help="write a store back out as JSON day files")
+    p_export.add_argument("--store", default=DEFAULT_PATH)
+    p_export.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        paths = args.paths or sorted(glob.glob("date/*.json"))
+        stats = convert(paths, args.out)
+        print(f"Wrote {args.out}: {stats['matches']} matches, {stats['strings']} strings, "
+              f"{stats['skipped']} skipped, {os.path.getsize(args.out)} bytes")
+    else:
+        files = MatchStore(args.store).export_json(args.out)
+        print(f"Exported {files} day files to {args.out}")
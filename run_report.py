@@ -0,0 +1,156 @@
+"""Per-run instrumentation shared by build.py and the scrapers.
+
+A RunReport collects stage wall times, counters, per-endpoint request
+latency histograms, status and error counts and bytes read/written, and
+writes them as one JSON document at the end of the run:
+
+    REPORT = RunReport("fetch_data")
+    with REPORT.stage("day 20260201"):
+        ...
+    REPORT.write()   # run_reports/fetch_data.json, or $RUN_REPORT_DIR
+
+Reports are plain dicts of numbers so CI can archive them and trends can
+be charted across runs.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+REPORT_DIR = os.environ.get("RUN_REPORT_DIR", "run_reports")
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests land in "inf"
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+_DATE_SEGMENT = re.compile(r"/\d{4}-\d{2}-\d{2}(?=/|$)")
+
+
+def endpoint_of(url):
+    """Group URLs by route: ids and dates become {id} and {date}, host and query dropped."""
+    path = re.sub(r"^https?://[^/]+", "", url).split("?", 1)[0]
+    return _ID_SEGMENT.sub("/{id}", _DATE_SEGMENT.sub("/{date}", path))
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else 0,
+            "max_ms": round(self.max_ms, 1),
+            "buckets_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+class RunReport:
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.stages = {}
+        self.counters = Counter()
+        self.bytes = Counter()
+        self.status_codes = Counter()
+        self.errors = Counter()
+        self.latency = defaultdict(LatencyHistogram)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; repeated stages with the same name add up."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def read_bytes(self, n):
+        self.bytes["read"] += n
+
+    def wrote_bytes(self, n):
+        self.bytes["written"] += n
+
+    def error(self, kind, detail=None):
+        """Count a failure that was handled rather than raised; detail is printed, not stored."""
+        self.errors[kind] += 1
+        if detail is not None:
+            print(f"[ERROR] {kind}: {detail}")
+
+    def request(self, url, status, latency_s, nbytes=0, error=None):
+        """Record one HTTP attempt; status is None when no response came back."""
+        endpoint = endpoint_of(url)
+        self.counters["requests"] += 1
+        self.latency[endpoint].add(latency_s * 1000)
+        self.status_codes[str(status) if status is not None else "no_response"] += 1
+        self.bytes["read"] += nbytes
+        if error is not None:
+            self.errors[f"request:{type(error).__name__}"] += 1
+
+    def merge(self, other):
+        """Fold a report dict from a worker process or a reused module into this one.
+
+        Stage times add up like repeated stages, so stages that ran
+        concurrently can sum to more than the wall time. Status codes and
+        latency are not merged: requests are recorded on the report the
+        scheduler was given, so another report holds none of them.
+        """
+        for key, value in other.get("stages_s", {}).items():
+            self.stages[key] = self.stages.get(key, 0.0) + value
+        for key, value in other.get("counters", {}).items():
+            self.counters[key] += value
+        for key, value in other.get("bytes", {}).items():
+            self.bytes[key] += value
+        for key, value in other.get("errors", {}).items():
+            self.errors[key] += value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._t0, 3),
+            "stages_s": {k: round(v, 3) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            "bytes": dict(self.bytes),
+            "status_codes": dict(self.status_codes),
+            "errors": dict(self.errors),
+            "latency": {k: h.to_dict() for k, h in sorted(self.latency.items())},
+        }
+
+    def write(self, path=None):
+        """Write the report as JSON (atomically) and return the path."""
+        path = path or os.path.join(REPORT_DIR, f"{self.name}.json")
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return path
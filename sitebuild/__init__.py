@@ -0,0 +1,20 @@
+"""Static TV listing site generator.
+
+    python -m sitebuild build [--only match|day|channel|sitemap|search] [--since DATE] [--out DIR] [--jobs N]
+
+or, in process:
+
+    from sitebuild import BuildConfig, build
+    report = build(BuildConfig(only={"match"}, since="2026-02-01"))
+
+build.py in the repository root is kept as a shortcut for `python -m sitebuild build`.
+
+    python -m sitebuild watch [--interval 2] [--out DIR]
+
+keeps the site in memory and updates the live output as date/ changes (see watch.py).
+"""
+from .builder import Builder, build
+from .config import BuildConfig
+from .watch import Watcher, watch
+
+__all__ = ["BuildConfig", "Builder", "Watcher", "build", "watch"]
@@ -0,0 +1,422 @@
+"""The build pipeline: load, index, render every page family, swap into place.
+
+    from sitebuild import BuildConfig, build
+    build(BuildConfig(out_dir="dist", only={"day"}, jobs=4))
+
+Pages are described as rel_path -> (source_key, kind, key, day) and rendered
+by RENDERERS[kind](site, key). The manifest in .build_cache records the
+source and output hash of every page so --incremental builds can reuse the
+previous output, and partial builds (only / since) carry over the pages they
+were not asked to rebuild. It also records when each page's output last
+changed ('mod', the build's clock), which the sitemap gives as <lastmod>.
+Listing shards a build no longer links to are kept for LISTING_SHARD_GRACE
+('retired' marks when they were dropped), for pages still cached with the old links.
+"""
+import glob
+import gzip
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from run_report import RunReport
+
+from .config import (BROTLI_QUALITY, CACHE_DIR, GZIP_LEVEL, IO_THREADS, LISTING_SHARD_DIR,
+                     LISTING_SHARD_GRACE, MANIFEST_VERSION, RENDER_BATCH_SIZE)
+from .data import Site, channel_upcoming, load_data
+from .listings import channel_shard, day_shard, render_channel_listing, render_day_listing
+from .render import RENDERERS as PAGE_RENDERERS
+from .search import render_search_shard, search_documents, search_shards
+from .sitemap import latest, render_sitemap, render_sitemap_index, sitemap_groups, sitemap_shards
+from .templates import load_templates
+from .util import atomic_write, content_hash
+
+try:
+    import brotli
+except ImportError:  # optional: without it --compress writes .gz only
+    brotli = None
+
+RENDERERS = dict(PAGE_RENDERERS, sitemap=render_sitemap, sitemap_index=render_sitemap_index,
+                 search=render_search_shard, day_listing=render_day_listing,
+                 channel_listing=render_channel_listing)
+
+COMPRESSORS = {'gz': lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+
+# The build whose pages worker processes render; set before the pool is forked
+_ACTIVE = None
+
+
+def package_sources():
+    """Source of every module in this package, so code changes invalidate all pages"""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, 'rb') as f:
+            sources.append(f.read())
+    return sources
+
+def build_key(config, templates):
+    """Anything that changes every page at once: the build code, templates, domain and timezone"""
+    return content_hash(*package_sources(), config.domain, config.tz,
+                        *[templates[n].source for n in sorted(templates)])
+
+def read_manifest(path):
+    """The manifest of the build that last wrote an output directory, or an empty one"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (FileNotFoundError, ValueError):
+        pass
+    return {'version': MANIFEST_VERSION, 'inputs': {}, 'pages': {}}
+
+def page_entry(prev, source_key, out_hash, now):
+    """Manifest entry of a rendered page; its 'mod' only moves to now when the output changed"""
+    entry = {'src': source_key, 'out': out_hash}
+    # A page unchanged since a manifest without 'mod' has no known change time
+    mod = prev.get('mod') if prev and prev.get('out') == out_hash else int(now.timestamp())
+    if mod:
+        entry['mod'] = mod
+    return entry
+
+def retired_shards(prev_pages, new_pages, now):
+    """Manifest entries of listing shards dropped from this build but still inside their grace period"""
+    now = int(now.timestamp())
+    retired = {}
+    for rel_path, entry in prev_pages.items():
+        if not rel_path.startswith(f"{LISTING_SHARD_DIR}/") or rel_path in new_pages:
+            continue
+        since = entry.get('retired', now)
+        if now - since < LISTING_SHARD_GRACE:
+            retired[rel_path] = dict(entry, retired=since)
+    return retired
+
+def match_pages(site, key, days=None):
+    pages = {}
+    for i, m in enumerate(site.matches):
+        if days is not None and m.dt.date() not in days:
+            continue
+        pages[f"match/{m.slug}/{m.folder}/index.html"] = (
+            content_hash(key, m.key, *site.match_data_key(m)), 'match', i, m.dt.date())
+    return pages
+
+def day_pages(site, key, days=None):
+    pages = {}
+    for day, day_data in site.day_index.items():
+        if days is not None and day not in days:
+            continue
+        # The menu window moves with today (except on archived days), so it is part of the source
+        pages[site.day_filename(day)] = (
+            content_hash(key, *site.menu_for(day), day, *[m.key for m in day_data['matches']]),
+            'day', day, day)
+        # The rest of the listing, under a content-hashed name the page links to
+        shard = day_shard(site, day)
+        if shard:
+            pages[shard[0]] = (content_hash(key, shard[1]), 'day_listing', day, day)
+    return pages
+
+def channel_pages(site, key, channels=None):
+    pages = {}
+    for c_slug, channel in site.channel_index.items():
+        if channels is not None and c_slug not in channels:
+            continue
+        upcoming = channel_upcoming(channel, site.channel_since_ts)
+        pages[f"channel/{c_slug}/index.html"] = (
+            content_hash(key, channel['name'], *[m.key for m in upcoming]), 'channel', c_slug, None)
+        shard = channel_shard(site, c_slug)
+        if shard:
+            pages[shard[0]] = (content_hash(key, shard[1]), 'channel_listing', c_slug, None)
+    return pages
+
+def sitemap_pages(site, key):
+    # Shards are keyed on their own entries only, so an unchanged month is reused as is
+    shards = sitemap_shards(sitemap_groups(site))
+    pages = {name: (content_hash(key, *chain.from_iterable(entries)), 'sitemap', entries, None)
+             for name, entries in shards.items()}
+    index = [(name, latest(ts for _, ts in entries)) for name, entries in shards.items()]
+    index_key = content_hash(key, *chain.from_iterable(index))
+    # sitemap.xml stays as a copy of the index for crawlers that were given the old URL
+    pages["sitemap_index.xml"] = (index_key, 'sitemap_index', index, None)
+    pages["sitemap.xml"] = (index_key, 'sitemap_index', index, None)
+    return pages
+
+def search_pages(site, key):
+    # Like sitemap shards, each search shard is keyed on its own docs and postings (sorted,
+    # as terms come from sets), so planning does not render every shard a second time
+    return {name: (content_hash(key, *(f"{field}{term}{ids}" for field, entries in sorted(shard.items())
+                                       for term, ids in sorted(entries.items()))),
+                   'search', shard, None)
+            for name, shard in search_shards(search_documents(site)).items()}
+
+# Every page family of the site as (stage name, planner); a planner maps a Site
+# and build key to {rel_path: (source_key, kind, key, day)}. The match, day and
+# channel planners also take the days or channel slugs to plan (default: all),
+# for the watcher's updates of a few dates
+PAGE_FAMILIES = [
+    ('match pages', match_pages),
+    ('daily pages', day_pages),
+    ('channel pages', channel_pages),
+    ('sitemap', sitemap_pages),
+    ('search index', search_pages),
+]
+
+def render_batch(batch):
+    """Render a list of (rel_path, source_key, kind, key) pages and write them.
+
+    Runs inside a worker process (or inline for serial builds); rendering is
+    CPU bound so it happens here, while the file writes go to a small thread pool.
+    Returns the manifest entries, bytes written, input bytes read (which a
+    worker cannot add to the parent's report itself) and any template problems seen.
+    """
+    builder = _ACTIVE
+    with ThreadPoolExecutor(max_workers=IO_THREADS) as io:
+        futures = [io.submit(builder.write_page, rel_path, source_key, RENDERERS[kind](builder.site, key))
+                   for rel_path, source_key, kind, key in batch]
+        results = [f.result() for f in futures]
+    written = [(rel_path, entry) for rel_path, entry, _ in results]
+    problems = set().union(*(t.problems for t in builder.site.templates.values()))
+    return written, sum(n for _, _, n in results), builder.site.take_bytes_read(), problems
+
+def compress_batch(rel_paths):
+    """Write a .gz/.br sibling next to each page in the temp build; returns bytes written"""
+    written = 0
+    for rel_path in rel_paths:
+        path = os.path.join(_ACTIVE.config.temp_dir, rel_path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for ext, compress in COMPRESSORS.items():
+            packed = compress(data)
+            # The temp build is not served yet, so a plain write is safe here
+            with open(f"{path}.{ext}", 'wb') as f:
+                f.write(packed)
+            written += len(packed)
+    return written
+
+def start_render_pool(jobs):
+    """Fork worker processes that share the already-built match indexes.
+
+    Workers are forked so they inherit the parsed data instead of loading it
+    again; where fork is unavailable the build falls back to serial rendering.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1:
+        return None
+    try:
+        return multiprocessing.get_context('fork').Pool(jobs)
+    except ValueError:
+        print("Warning: fork is not available here, rendering serially")
+        return None
+
+
+class Builder:
+    """One build of the site from a BuildConfig; run() does the whole pipeline."""
+
+    def __init__(self, config):
+        self.config = config
+        self.report = RunReport("build")
+        self.prev_manifest = read_manifest(config.manifest_path)
+        self.new_manifest = {'version': MANIFEST_VERSION, 'inputs': {}, 'pages': {}}
+        self.template_problems = set()
+        self.site = None
+        self.pool = None
+
+    def selected(self, kind, day):
+        """Whether a page is rebuilt, rather than carried over, in this (possibly partial) build"""
+        config = self.config
+        # sitemap_index, day_listing and channel_listing belong to the sitemap, day and channel kinds
+        if kind.split('_')[0] not in config.only:
+            return False
+        return config.since is None or day is None or day >= config.since
+
+    def reuse_previous(self, rel_path):
+        """Hard-link (or copy) an unchanged page from the live output into the temp build"""
+        src = os.path.join(self.config.out_dir, rel_path)
+        dst = os.path.join(self.config.temp_dir, rel_path)
+        if not os.path.isfile(src):
+            return False
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        return True
+
+    def write_page(self, rel_path, source_key, content):
+        """Write one rendered page into the temp build.
+
+        Returns its manifest entry and the bytes written (0 when the previous file was kept).
+        """
+        prev = self.prev_manifest['pages'].get(rel_path)
+        data = content.encode('utf-8')
+        out_hash = content_hash(data)
+        entry = page_entry(prev, source_key, out_hash, self.config.now)
+        # Identical output to last build: keep the old file so it is not churned
+        if self.config.incremental and prev and prev.get('out') == out_hash and self.reuse_previous(rel_path):
+            return rel_path, entry, 0
+        atomic_write(os.path.join(self.config.temp_dir, rel_path), content)
+        return rel_path, entry, len(data)
+
+    def render_pages(self, pages):
+        """Render and write pages, skipping the ones whose sources are unchanged.
+
+        pages maps rel_path (relative to the output root) to (source_key, kind, key, day):
+        source_key hashes everything the page is built from, RENDERERS[kind](site, key)
+        returns its content and day (or None) is the date the page belongs to for
+        --since. When two pages claim the same path the last one wins, as it would
+        for sequential writes. Pages outside the selection are carried over as they are.
+        """
+        todo = []
+        for rel_path, (source_key, kind, key, day) in pages.items():
+            prev = self.prev_manifest['pages'].get(rel_path)
+            if not self.selected(kind, day):
+                if prev and self.reuse_previous(rel_path):
+                    self.new_manifest['pages'][rel_path] = prev
+                    self.report.count('pages_carried_over')
+                else:
+                    self.report.count('pages_missing')
+            elif self.config.incremental and prev and prev.get('src') == source_key and self.reuse_previous(rel_path):
+                self.new_manifest['pages'][rel_path] = prev
+                self.report.count('pages_reused')
+            else:
+                todo.append((rel_path, source_key, kind, key))
+
+        batches = [todo[i:i + RENDER_BATCH_SIZE] for i in range(0, len(todo), RENDER_BATCH_SIZE)]
+        results = self.pool.imap(render_batch, batches) if self.pool else map(render_batch, batches)
+        for written, nbytes, nread, problems in results:
+            self.new_manifest['pages'].update(written)
+            self.report.count('pages_rendered', len(written))
+            self.report.wrote_bytes(nbytes)
+            self.report.read_bytes(nread)
+            self.template_problems.update(problems)
+
+    def compress_pages(self):
+        """Precompress every page in the new manifest, reusing siblings of unchanged output.
+
+        A page's siblings are reused when its output hash matches the previous
+        build and that build wrote every encoding we write now; the encodings
+        are recorded per page in the manifest under 'z'.
+        """
+        reuse = self.config.incremental or self.config.partial
+        todo = []
+        for rel_path, entry in self.new_manifest['pages'].items():
+            prev = self.prev_manifest['pages'].get(rel_path)
+            if (reuse and prev and prev.get('out') == entry['out']
+                    and set(COMPRESSORS) <= set(prev.get('z', ()))
+                    and all(self.reuse_previous(f"{rel_path}.{ext}") for ext in COMPRESSORS)):
+                self.report.count('compressed_reused')
+            else:
+                todo.append(rel_path)
+            self.new_manifest['pages'][rel_path] = dict(entry, z=sorted(COMPRESSORS))
+
+        batches = [todo[i:i + RENDER_BATCH_SIZE] for i in range(0, len(todo), RENDER_BATCH_SIZE)]
+        for nbytes in (self.pool.imap(compress_batch, batches) if self.pool else map(compress_batch, batches)):
+            self.report.wrote_bytes(nbytes)
+        self.report.count('compressed_pages', len(todo))
+
+    def swap(self):
+        """Replace the output directory with the temp build in two renames"""
+        out_dir, temp_dir = self.config.out_dir, self.config.temp_dir
+        if os.path.exists(out_dir):
+            backup_dir = f"{out_dir}_old_{int(time.time())}"
+            os.rename(out_dir, backup_dir)
+            os.rename(temp_dir, out_dir)
+            shutil.rmtree(backup_dir)
+        else:
+            os.rename(temp_dir, out_dir)
+
+    def run(self):
+        global _ACTIVE
+        config, report = self.config, self.report
+
+        # Clean and create temp directory
+        if os.path.exists(config.temp_dir):
+            shutil.rmtree(config.temp_dir)
+        os.makedirs(config.temp_dir, exist_ok=True)
+
+        # --- 1. LOAD TEMPLATES ---
+        templates = load_templates(config.template_dir)
+        key = build_key(config, templates)
+
+        # --- 2. LOAD DATA ---
+        with report.stage('load'):
+            matches, store = load_data(config, self.new_manifest['inputs'], report)
+        report.count('matches', len(matches))
+
+        changed_inputs = [f for f, h in self.new_manifest['inputs'].items()
+                          if self.prev_manifest['inputs'].get(f) != h]
+        if config.incremental:
+            print(f"Incremental build: {len(changed_inputs)} of {len(self.new_manifest['inputs'])} data files changed")
+        if config.partial:
+            print(f"Partial build: {', '.join(sorted(config.only))} pages"
+                  + (f" dated {config.since} or later" if config.since else ""))
+
+        # --- 3. PRE-PROCESS: LOCAL TIME, URLS AND DAY INDEX (ONE PASS) ---
+        with report.stage('index'):
+            site = self.site = Site(config, templates, matches, store)
+        # Filled as each family renders, so the sitemap (planned after the pages it lists) sees this build's changes
+        site.page_entries = self.new_manifest['pages']
+
+        _ACTIVE = self
+        self.pool = start_render_pool(config.jobs)
+        try:
+            # --- 4-7. MATCH, DAILY LISTING AND CHANNEL PAGES, THEN THE SHARDED SITEMAP AND SEARCH INDEX ---
+            for stage, planner in PAGE_FAMILIES:
+                print(f"Building {stage}...")
+                with report.stage(stage):
+                    pages = planner(site, key)
+                    self.render_pages(pages)
+                if stage == 'sitemap':
+                    report.count('sitemap_shards', sum(1 for rel_path in pages if rel_path.startswith('sitemaps/')))
+                elif stage == 'search index':
+                    report.count('search_shards', len(pages))
+
+            # Pages cached with last build's shard links can still fetch them for a while
+            for rel_path, entry in retired_shards(self.prev_manifest['pages'], self.new_manifest['pages'],
+                                                  config.now).items():
+                if self.reuse_previous(rel_path):
+                    self.new_manifest['pages'][rel_path] = entry
+                    report.count('shards_retained')
+
+            # --- 7b. PRECOMPRESSED SIBLINGS (OPTIONAL) ---
+            if config.compress:
+                print(f"Compressing pages ({', '.join(sorted(COMPRESSORS))})...")
+                with report.stage('compress'):
+                    self.compress_pages()
+        finally:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+            _ACTIVE = None
+
+        # --- 8. ATOMIC SWAP: Replace the output directory with new content ---
+        print("Swapping directories atomically...")
+        with report.stage('swap'):
+            self.swap()
+
+        # Manifest is only written once the output holds exactly the pages it describes
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        atomic_write(config.manifest_path, json.dumps(self.new_manifest, separators=(',', ':')))
+
+        for problem in sorted(self.template_problems):
+            print(f"Template warning: {problem}")
+        report.count('template_problems', len(self.template_problems))
+        if report.counters['pages_missing']:
+            print(f"Warning: {report.counters['pages_missing']} pages outside this partial build "
+                  f"had no previous output to carry over")
+
+        print(f"Pages rendered: {report.counters['pages_rendered']}, "
+              f"reused from previous build: {report.counters['pages_reused']}")
+        print(f"Run report: {report.write(config.report_path)}")
+        print(f"✅ Build complete → {config.out_dir}/ (zero downtime)")
+        return report
+
+
+def build(config):
+    """Run one build; returns its RunReport"""
+    return Builder(config).run()
@@ -0,0 +1,79 @@
+import argparse
+import sys
+from datetime import date
+
+from .builder import build
+from .config import PAGE_KINDS, BuildConfig, parse_clock, parse_offset
+from .watch import POLL_INTERVAL, REFRESH_INTERVAL, watch
+
+
+def add_site_arguments(parser):
+    """Options shared by build and watch: where the site comes from, where it goes, how it is written"""
+    parser.add_argument("--compress", action="store_true",
+                        help="also write precompressed .gz (and .br, when brotli is installed) siblings of every page")
+    parser.add_argument("--report", metavar="PATH",
+                        help=f"where to write the JSON run report (default: run_reports/{parser.prog.split()[-1]}.json)")
+    parser.add_argument("--out", metavar="DIR", default="dist", help="output directory (default: dist)")
+    parser.add_argument("--date-dir", metavar="DIR", default="date", help="fixture JSON files (default: date)")
+    parser.add_argument("--archive-dir", metavar="DIR", default="archive",
+                        help="monthly archive written by archive.py prune (default: archive)")
+    parser.add_argument("--data-index", metavar="PATH", default="data/index.json",
+                        help="data_index.py index used to add scores, odds and form to match pages "
+                             "(default: data/index.json; pages go without when it is missing)")
+    parser.add_argument("--tz", default="local", metavar="OFFSET",
+                        help="UTC offset pages are rendered in: local, UTC or e.g. +05:45 (default: local)")
+
+def add_build_arguments(parser):
+    add_site_arguments(parser)
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse pages from the previous build whose source data has not changed")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="render pages in N worker processes (0 = one per CPU core, 1 = serial)")
+    parser.add_argument("--store", metavar="PATH",
+                        help="load fixtures from a match_store.py file instead of parsing date/*.json "
+                             "(ignored, with a warning, when it is out of date with date/)")
+    parser.add_argument("--only", action="append", choices=PAGE_KINDS,
+                        help="rebuild only this page type (repeatable); the rest is carried over from --out")
+    parser.add_argument("--since", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="rebuild only match and day pages dated on or after this day")
+    parser.add_argument("--now", metavar="ISO",
+                        help="build as if it were this time (default: the current time)")
+
+def add_watch_arguments(parser):
+    add_site_arguments(parser)
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, metavar="SECONDS",
+                        help=f"how often to check date/ and archive/ for changes (default: {POLL_INTERVAL:g})")
+    parser.add_argument("--refresh", type=float, default=REFRESH_INTERVAL, metavar="SECONDS",
+                        help="update channel windows and the sitemap at least this often "
+                             f"without new data (default: {REFRESH_INTERVAL})")
+
+def config_from_args(args):
+    tz = parse_offset(args.tz)
+    if args.command == "watch":
+        return BuildConfig(out_dir=args.out, date_dir=args.date_dir, archive_dir=args.archive_dir,
+                           data_index=args.data_index, compress=args.compress, report_path=args.report, tz=tz)
+    return BuildConfig(
+        out_dir=args.out, date_dir=args.date_dir, archive_dir=args.archive_dir,
+        data_index=args.data_index, store=args.store,
+        incremental=args.incremental, jobs=args.jobs, compress=args.compress, report_path=args.report,
+        only=args.only, since=args.since, now=parse_clock(args.now, tz) if args.now else None, tz=tz,
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m sitebuild",
+                                     description="Build the static TV listing site")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add_build_arguments(sub.add_parser("build", help="render the site into --out (default: dist/)"))
+    add_watch_arguments(sub.add_parser("watch", help="keep --out up to date as date/ changes, until interrupted"))
+    args = parser.parse_args(argv)
+    try:
+        config = config_from_args(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "watch":
+        watch(config, args.interval, args.refresh)
+    else:
+        build(config)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
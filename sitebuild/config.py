@@ -0,0 +1,110 @@
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+
+DOMAIN = "https://tvlist.cricfoot.net"
+TOP_LEAGUE_IDS = [17, 35, 23, 7, 8, 34, 679]
+
+CACHE_DIR = ".build_cache"
+# Compact records of unchanged archive months, see data.load_archive_matches
+ARCHIVE_CACHE_DIR = os.path.join(CACHE_DIR, "archive")
+MANIFEST_VERSION = 1
+
+# The sitemap protocol allows at most 50,000 URLs per file
+SITEMAP_MAX_URLS = 50000
+
+# Precompressed siblings are written once per changed page, so spend the CPU on the best ratio
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Parallel rendering: pages per task sent to a worker, and writer threads per process
+RENDER_BATCH_SIZE = 200
+IO_THREADS = 8
+
+# data/ endpoints (see data_index.py) whose records are shown on match pages
+MATCH_DATA_ENDPOINTS = ('incidents', 'odds', 'form')
+
+# Matches a day or channel page renders itself; the rest of its listing is loaded
+# from a JSON shard under LISTING_SHARD_DIR (see listings.py)
+LISTING_FIRST_SCREEN = 25
+LISTING_SHARD_DIR = "shards"
+# Seconds a shard dropped from the build stays deployed, so cached pages that still link to it can load it
+LISTING_SHARD_GRACE = 3600
+
+# Doc ids kept per two-letter word prefix, the best ranked; trigrams keep every id,
+# since the browser intersects their postings across query words
+SEARCH_POSTINGS_MAX = 50
+# Doc ids are hashes of kind and slug in this many bits, stable across builds
+SEARCH_ID_BITS = 24
+# search/docs/<id % SEARCH_DOC_SHARDS>.json files the documents are spread over
+SEARCH_DOC_SHARDS = 16
+
+# Page kinds a build can be limited to with --only
+PAGE_KINDS = ('match', 'day', 'channel', 'sitemap', 'search')
+
+_OFFSET_RE = re.compile(r'^(?:UTC)?([+-])(\d{1,2}):?(\d{2})?$')
+
+
+def system_offset():
+    """The machine's current UTC offset, as build.py has always used"""
+    return timezone(timedelta(seconds=-time.timezone if time.daylight == 0 else -time.altzone))
+
+def parse_offset(value):
+    """'local', 'UTC', '+05:45', '-3' or 'UTC+1' -> a fixed-offset timezone"""
+    if value in (None, '', 'local'):
+        return system_offset()
+    if value.upper() in ('UTC', 'Z'):
+        return timezone.utc
+    match = _OFFSET_RE.match(value)
+    if not match:
+        raise ValueError(f"not a UTC offset: {value!r}")
+    sign, hours, minutes = match.groups()
+    delta = timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return timezone(-delta if sign == '-' else delta)
+
+def parse_clock(value, tz):
+    """ISO date/time -> aware datetime in tz; naive values are read as tz local time"""
+    now = datetime.fromisoformat(value)
+    return now.replace(tzinfo=tz) if now.tzinfo is None else now.astimezone(tz)
+
+
+class BuildConfig:
+    """Everything one build depends on besides the data and templates on disk.
+
+    now and tz make the build reproducible: the listing day, weekly menu and
+    channel windows all follow now, and every page shows times in tz. only
+    and since limit which pages are rebuilt; pages outside the selection are
+    carried over from the previous out_dir.
+    """
+
+    def __init__(self, out_dir="dist", date_dir="date", archive_dir="archive", template_dir=".",
+                 data_index="data/index.json", store=None, incremental=False, jobs=1, compress=False,
+                 report_path=None, only=None, since=None, now=None, tz=None, domain=DOMAIN):
+        self.out_dir = out_dir.rstrip("/") or "."
+        self.temp_dir = f"{self.out_dir}_temp"
+        self.date_dir = date_dir
+        self.archive_dir = archive_dir
+        self.template_dir = template_dir
+        self.data_index = data_index
+        self.store = store
+        self.incremental = incremental
+        self.jobs = jobs
+        self.compress = compress
+        self.report_path = report_path
+        self.only = frozenset(only) if only else frozenset(PAGE_KINDS)
+        unknown = self.only - set(PAGE_KINDS)
+        if unknown:
+            raise ValueError(f"unknown page kind(s): {', '.join(sorted(unknown))}")
+        self.since = since if since is None or isinstance(since, date) else date.fromisoformat(since)
+        self.tz = tz if tz is not None else system_offset()
+        self.now = now.astimezone(self.tz) if now is not None else datetime.now(self.tz)
+        self.domain = domain
+        # dist keeps the manifest path earlier builds (and the CI cache) used
+        name = "manifest.json" if self.out_dir == "dist" else f"manifest-{re.sub(r'[^A-Za-z0-9]+', '-', self.out_dir).strip('-')}.json"
+        self.manifest_path = os.path.join(CACHE_DIR, name)
+
+    @property
+    def partial(self):
+        """True when some pages are carried over rather than rebuilt"""
+        return self.since is not None or self.only != frozenset(PAGE_KINDS)
@@ -0,0 +1,454 @@
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from itertools import chain, groupby
+
+import archive
+import match_store
+from data_index import DataIndex
+
+from .config import ARCHIVE_CACHE_DIR, MATCH_DATA_ENDPOINTS, TOP_LEAGUE_IDS
+from .util import atomic_write, content_hash, record_hash, slugify
+
+
+class Match:
+    """Compact in-memory fixture record.
+
+    Only what listings, indexes and URLs need is kept; the per-country
+    broadcaster lists stay on disk and are read by Site.broadcasters_for() when
+    the match page itself is rendered. source is the date file, archive month
+    file or store row the record came from. dt/slug/folder/url are filled in by
+    index_matches().
+    """
+    __slots__ = ('match_id', 'kickoff', 'fixture', 'league_id', 'league', 'venue',
+                 'channels', 'source', 'key', 'dt', 'slug', 'folder', 'url')
+
+    def __init__(self, m, source):
+        self.match_id = m['match_id']
+        self.kickoff = int(m['kickoff'])
+        self.fixture = m['fixture']
+        self.league_id = m.get('league_id')
+        self.league = sys.intern(m.get('league', 'Other Football'))
+        self.venue = m.get('venue') or m.get('stadium') or "To Be Announced"
+        # Every channel carrying the match, first appearance order, for the channel index
+        self.channels = tuple(dict.fromkeys(
+            sys.intern(ch) for c in m.get('tv_channels', []) for ch in c['channels']))
+        self.source = source
+        self.key = record_hash(m)
+
+    @classmethod
+    def from_store(cls, store, i, row):
+        """Build a record from match row i of a MatchStore; source is the row index"""
+        match_id, kickoff, _, league_id, fixture, league, venue, _, _, _, flags, digest = row
+        m = cls.__new__(cls)
+        m.match_id = match_id
+        m.kickoff = kickoff
+        m.fixture = store.string(fixture)
+        m.league_id = league_id if flags & match_store.HAS_LEAGUE_ID else None
+        m.league = sys.intern(store.string(league)) if flags & match_store.HAS_LEAGUE else 'Other Football'
+        # The venue column holds the "stadium" of a record without a venue, as __init__ falls back to it
+        has_venue = flags & (match_store.HAS_VENUE | match_store.HAS_STADIUM)
+        m.venue = (store.string(venue) if has_venue else "") or "To Be Announced"
+        m.channels = tuple(dict.fromkeys(
+            sys.intern(ch) for _, channels in store.broadcasters(i) for ch in channels))
+        m.source = i
+        m.key = digest.hex()
+        return m
+
+    def compact(self):
+        """The fields __init__ keeps, as a JSON row for from_compact()"""
+        return [self.match_id, self.kickoff, self.fixture, self.league_id, self.league, self.venue,
+                list(self.channels), self.key]
+
+    @classmethod
+    def from_compact(cls, row, source):
+        """Rebuild a record from compact(), e.g. of an archive month cached by an earlier build"""
+        match_id, kickoff, fixture, league_id, league, venue, channels, key = row
+        m = cls.__new__(cls)
+        m.match_id = match_id
+        m.kickoff = kickoff
+        m.fixture = fixture
+        m.league_id = league_id
+        m.league = sys.intern(league)
+        m.venue = venue
+        m.channels = tuple(sys.intern(ch) for ch in channels)
+        m.source = source
+        m.key = key
+        return m
+
+def load_date_file(path, inputs, report):
+    """Compact records of one date file, the last record of a match winning.
+
+    Its content hash is recorded in inputs; raises when the file cannot be
+    read or parsed.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    report.read_bytes(len(raw))
+    inputs[path] = content_hash(raw)
+    data = json.loads(raw)
+    del raw
+    records = {}
+    for m in data:
+        mid = m.get('match_id')
+        if mid:
+            records[mid] = Match(m, path)
+    return list(records.values())
+
+def load_matches(paths, inputs, report):
+    """Read date files one at a time into compact Match records.
+
+    Each file's parsed JSON is dropped as soon as its records are built, so
+    peak memory is one day file plus the compact records, not the archive.
+    The content hash of every file read is recorded in inputs. paths are in
+    date order and a match listed more than once keeps its last (newest) record.
+    """
+    matches = {}
+    for f in paths:
+        try:
+            for m in load_date_file(f, inputs, report):
+                matches[m.match_id] = m
+        except Exception as e:
+            report.error('unreadable_date_file', f"{f}: {e}")
+    return list(matches.values())
+
+def load_store_matches(store, inputs):
+    """Compact records straight from a memory-mapped match store, no JSON parsing; the last row of an id wins"""
+    for name, _, _, digest in store.sources():
+        inputs[f"date/{name}"] = digest.hex()
+    matches = {}
+    for i, row in enumerate(store.rows()):
+        matches[row[0]] = Match.from_store(store, i, row)
+    return list(matches.values())
+
+def month_cache_path(cache_dir, path):
+    return os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9.]+', '-', path).strip('-') + ".json")
+
+def read_month_cache(cache_dir, path):
+    """{'stamp', 'hash', 'matches'} an earlier build cached for an archive month, or None"""
+    try:
+        with open(month_cache_path(cache_dir, path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def load_archive_matches(paths, inputs, report, cache_dir=None):
+    """Compact records of archive month files (archive.py), in day file order.
+
+    Only the fields Match keeps are held in memory; an archived match page
+    reads its broadcasters back from the month file when it is rendered.
+    With a cache_dir, each month's compact records are kept there under its
+    hash: a month whose size and mtime are unchanged is not opened at all,
+    and one whose bytes hash the same is not decompressed or parsed, so the
+    cost of an unchanged archive stays small however much of it there is.
+    Their pages are then reused by source key like those of unchanged date files.
+    """
+    matches = []
+    for path in paths:
+        cached = read_month_cache(cache_dir, path) if cache_dir else None
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        if cached and cached['stamp'] == stamp:
+            inputs[path] = cached['hash']
+            matches.extend(Match.from_compact(row, path) for row in cached['matches'])
+            report.count('archive_months_cached')
+            continue
+        with open(path, 'rb') as f:
+            raw = f.read()
+        report.read_bytes(len(raw))
+        inputs[path] = digest = content_hash(raw)
+        if cached and cached['hash'] == digest:
+            month = [Match.from_compact(row, path) for row in cached['matches']]
+            report.count('archive_months_cached')
+        else:
+            days = json.loads(gzip.decompress(raw))
+            month = [Match(m, path) for name in sorted(days) for m in days[name] if m.get('match_id')]
+        del raw
+        matches.extend(month)
+        if cache_dir:
+            atomic_write(month_cache_path(cache_dir, path), json.dumps(
+                {'stamp': stamp, 'hash': digest, 'matches': [m.compact() for m in month]},
+                ensure_ascii=False, separators=(',', ':')))
+    return matches
+
+def last_seen(matches):
+    """matches without repeated ids; the last record of an id wins, in the place of its first"""
+    unique = {}
+    for m in matches:
+        unique[m.match_id] = m
+    return list(unique.values())
+
+def is_archived(m):
+    """True for a match loaded from an archive month file rather than date/ or the store"""
+    return isinstance(m.source, str) and m.source.endswith('.json.gz')
+
+def load_data(config, inputs, report):
+    """(matches, store) from the archive and config.store when it is current, else the date files.
+
+    Archived days are older than every hot file, so archive records go first
+    and, as among the date files, the newest record of a match wins: a
+    fixture rescraped on a later day's listing keeps its later broadcasters.
+    """
+    cold = load_archive_matches(archive.month_files(config.archive_dir), inputs, report,
+                                ARCHIVE_CACHE_DIR if config.incremental else None)
+    matches, store = load_hot_data(config, inputs, report)
+    return (last_seen(cold + matches) if cold else matches), store
+
+def load_hot_data(config, inputs, report):
+    """(matches, store) from config.store when it is current, else from the date files"""
+    date_files = sorted(glob.glob(os.path.join(config.date_dir, "*.json")))
+    store = None
+    if config.store and not os.path.exists(config.store):
+        print(f"Warning: {config.store} not found, loading {config.date_dir}/*.json instead")
+    elif config.store:
+        try:
+            store = match_store.MatchStore(config.store)
+        except ValueError as e:
+            # e.g. a store written by an older match_store.py; convert it again to use it
+            print(f"Warning: {e}, loading {config.date_dir}/*.json instead")
+        if store is not None and store.is_stale(date_files):
+            print(f"Warning: {config.store} does not match {config.date_dir}/*.json, loading the JSON files instead")
+            store = None
+        elif store is not None:
+            report.read_bytes(os.path.getsize(config.store))
+    if store is not None:
+        return load_store_matches(store, inputs), store
+    return load_matches(date_files, inputs, report), None
+
+def day_sort_key(m):
+    """Listing order within a day: top leagues first, then league name, then kickoff"""
+    return (m.league_id not in TOP_LEAGUE_IDS, m.league, m.kickoff)
+
+def localize(m, tz, domain):
+    """Set dt/slug/folder/url: the match's local kickoff time and its page URL"""
+    m.dt = datetime.fromtimestamp(m.kickoff, tz=timezone.utc).astimezone(tz)
+    m.slug = slugify(m.fixture)
+    m.folder = m.dt.strftime('%Y%m%d')
+    m.url = f"{domain}/match/{m.slug}/{m.folder}/"
+
+def match_groups(m):
+    """(index, slug, name) of every channel ('c'), team ('t') and league ('l') a match is listed under"""
+    for ch in m.channels:
+        yield 'c', slugify(ch), ch
+    for team in m.fixture.split(" vs "):
+        team = team.strip()
+        yield 't', slugify(team), team
+    # Leagues of the same name in different countries stay apart
+    yield 'l', f"{slugify(m.league)}-{m.league_id}", m.league
+
+def day_entry(matches):
+    """day_index entry of a day's matches, given in load order"""
+    day_matches = sorted(matches, key=day_sort_key)
+    return {
+        'matches': day_matches,
+        'leagues': [(league, list(group)) for league, group in groupby(day_matches, key=lambda m: m.league)],
+    }
+
+def index_matches(matches, tz, domain):
+    """Convert every match to local time once and index it by day, channel and name in that one pass.
+
+    Sets dt/slug/folder/url on each match and returns (day_index, channel_index,
+    name_index). day_index maps day -> {'matches', 'leagues'} (sorted by date)
+    where 'matches' is in listing order and 'leagues' groups consecutive
+    matches of the same league as (league, matches) pairs. channel_index maps
+    channel slug -> {'name', 'ids', 'matches'}: 'ids' is the set of match ids
+    carried by the channel (O(1) dedup when a match lists the same channel for
+    several countries). name_index maps 't' (teams) and 'l' (leagues) to
+    entries of the same shape. Every 'matches' list of the channel and name
+    indexes is in kickoff order, and the first spelling seen for a slug is its name.
+    """
+    by_day = {}
+    groups = {'c': {}, 't': {}, 'l': {}}
+    for m in matches:
+        localize(m, tz, domain)
+        by_day.setdefault(m.dt.date(), []).append(m)
+        for kind, slug, name in match_groups(m):
+            group = groups[kind].get(slug)
+            if group is None:
+                group = groups[kind][slug] = {'name': name, 'ids': set(), 'matches': []}
+            if m.match_id not in group['ids']:
+                group['ids'].add(m.match_id)
+                group['matches'].append(m)
+
+    day_index = {day: day_entry(by_day[day]) for day in sorted(by_day)}
+    for group in chain(*(index.values() for index in groups.values())):
+        group['matches'].sort(key=lambda x: x.kickoff)
+    return day_index, groups['c'], {'t': groups['t'], 'l': groups['l']}
+
+def channel_upcoming(channel, since_ts):
+    """Matches on a channel kicking off after since_ts, in kickoff order"""
+    return [m for m in channel['matches'] if m.kickoff > since_ts]
+
+
+class Site:
+    """The loaded data, indexes and clock that every page of one build is rendered from.
+
+    Worker processes are forked with the Site already built, so they share
+    the parsed data instead of loading it again.
+    """
+
+    def __init__(self, config, templates, matches, store=None):
+        self.config = config
+        self.domain = config.domain
+        self.templates = templates
+        self.matches = matches
+        self.store = store
+        self.now = config.now
+        self.today = self.now.date()
+        # CENTER LOGIC: To make Today the 4th item, we start the menu 3 days ago
+        self.menu_start = self.today - timedelta(days=3)
+        # Channel pages list fixtures from the last 24 hours onward
+        self.channel_since_ts = self.now.timestamp() - 86400
+        self.day_index, self.channel_index, self.name_index = index_matches(matches, config.tz, config.domain)
+        # Days listed from archive months alone; their pages no longer follow today
+        self.archived_days = {day for day, day_data in self.day_index.items()
+                              if all(is_archived(m) for m in day_data['matches'])}
+        # Rendered fragments shared by every page this process renders, see render.fragment()
+        self.fragments = {}
+        self._broadcasters = {}
+        self._bytes_read = 0
+        # Only the index is held in memory; match records are read from data/ page by page
+        self.data_index = DataIndex.load(config.data_index) if config.data_index else None
+        # rel_path -> manifest entry of every page written so far this build, filled by the builder
+        self.page_entries = {}
+
+    def reindex(self, matches, touched):
+        """Bring the indexes up to date with matches after the records in touched were dropped or added.
+
+        Only the days, channels, teams and leagues of those records (and of
+        the records of their match ids now in matches) are re-indexed; every
+        other entry is kept as it is. Entries come out as index_matches()
+        would build them from matches, and the clock is left as it is.
+        Returns the (days, channel slugs) whose pages may have changed.
+        """
+        order = {}
+        current = {}
+        for i, m in enumerate(matches):
+            order[id(m)] = i
+            current[m.match_id] = m
+        winners = {id(m): m for m in (current.get(t.match_id) for t in touched) if m is not None}.values()
+        for m in winners:
+            if getattr(m, 'dt', None) is None:
+                localize(m, self.config.tz, self.domain)
+        # Records never indexed (ones that lost to another record of their match) have no dt
+        affected = [m for m in chain(touched, winners) if getattr(m, 'dt', None) is not None]
+
+        def kept(old, new):
+            """The records of old and new still in matches, once each, in load order"""
+            found = {id(m): m for m in chain(old, new) if current.get(m.match_id) is m}
+            return sorted(found.values(), key=lambda m: order[id(m)])
+
+        for day in {m.dt.date() for m in affected}:
+            old = self.day_index.get(day, {}).get('matches', ())
+            day_matches = kept(old, (m for m in winners if m.dt.date() == day))
+            if day_matches:
+                self.day_index[day] = day_entry(day_matches)
+            else:
+                self.day_index.pop(day, None)
+            if day_matches and all(is_archived(m) for m in day_matches):
+                self.archived_days.add(day)
+            else:
+                self.archived_days.discard(day)
+        self.day_index = dict(sorted(self.day_index.items()))
+
+        members = {}
+        for m in winners:
+            for kind, slug, _ in match_groups(m):
+                members.setdefault((kind, slug), []).append(m)
+        indexes = {'c': self.channel_index, 't': self.name_index['t'], 'l': self.name_index['l']}
+        scope = {(kind, slug) for m in affected for kind, slug, _ in match_groups(m)}
+        for kind, slug in scope:
+            old = indexes[kind].get(slug)
+            group = kept(old['matches'] if old else (), members.get((kind, slug), ()))
+            if not group:
+                indexes[kind].pop(slug, None)
+                continue
+            name = next(name for k, s, name in match_groups(group[0]) if (k, s) == (kind, slug))
+            indexes[kind][slug] = {'name': name, 'ids': {m.match_id for m in group},
+                                   'matches': sorted(group, key=lambda x: x.kickoff)}
+        self.matches = matches
+        # Caches of the last render; a changed file would be read from them stale
+        self.fragments = {}
+        self._broadcasters = {}
+        self.page_entries = {}
+        return {m.dt.date() for m in affected}, {slug for kind, slug in scope if kind == 'c'}
+
+    def day_filename(self, day):
+        return "index.html" if day == self.today else f"{day.strftime('%Y-%m-%d')}.html"
+
+    def menu_for(self, day):
+        """(first day, active day) of the weekly menu on a day page.
+
+        Archived day pages centre the menu on their own day, so they only
+        change when their archive month does.
+        """
+        if day in self.archived_days:
+            return day - timedelta(days=3), day
+        return self.menu_start, self.today
+
+    def _load_broadcasters(self, path):
+        """{match_id: [(country, channels)]} for one date or archive month file, read on demand.
+
+        Match pages are rendered in load order, so consecutive pages hit the same
+        file and keeping the last two files is enough.
+        """
+        broadcasters = self._broadcasters.get(path)
+        if broadcasters is None:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            self._bytes_read += len(raw)
+            if path.endswith('.gz'):
+                days = json.loads(gzip.decompress(raw))
+                data = [m for name in sorted(days) for m in days[name]]
+            else:
+                data = json.loads(raw)
+            del raw
+            # The last record of a match wins, as in load_matches()
+            broadcasters = {}
+            for m in data:
+                if m.get('match_id'):
+                    broadcasters[m.get('match_id')] = [
+                        (sys.intern(c['country']), [sys.intern(ch) for ch in c['channels']])
+                        for c in m.get('tv_channels', [])
+                    ]
+            if len(self._broadcasters) >= 2:
+                self._broadcasters.pop(next(iter(self._broadcasters)))
+            self._broadcasters[path] = broadcasters
+        return broadcasters
+
+    def take_bytes_read(self):
+        """Bytes of input files read while rendering since the last call (broadcasters and data/ records)"""
+        n = self._bytes_read + (self.data_index.bytes_read if self.data_index else 0)
+        self._bytes_read = 0
+        if self.data_index:
+            self.data_index.bytes_read = 0
+        return n
+
+    def match_data_key(self, m):
+        """crc32 of each data/ record a match page shows, for its source key"""
+        if self.data_index is None:
+            return ()
+        entries = self.data_index.entries(m.match_id)
+        return tuple(entries[ep][3] if ep in entries else None for ep in MATCH_DATA_ENDPOINTS)
+
+    def match_data(self, m):
+        """{endpoint: record} of the data/ records a match page shows, read from their byte ranges"""
+        if self.data_index is None:
+            return {}
+        found = {}
+        for endpoint in MATCH_DATA_ENDPOINTS:
+            record = self.data_index.read(m.match_id, endpoint)
+            if record:
+                found[endpoint] = record
+        return found
+
+    def broadcasters_for(self, m):
+        """[(country, channels)] for a match page, from whichever source the match came from"""
+        # Store rows are addressed by index; archived matches still point at their month file
+        if isinstance(m.source, int):
+            return self.store.broadcasters(m.source)
+        return self._load_broadcasters(m.source).get(m.match_id, [])
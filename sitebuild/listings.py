@@ -0,0 +1,62 @@
+"""Day and channel listings split into a server-rendered first screen and a JSON shard.
+
+A page renders the leagues (day pages) or rows (channel pages) that fill
+the first LISTING_FIRST_SCREEN matches and loads the rest from
+shards/<kind>/<name>.<hash>.json. The file name carries the hash of the
+shard's content, so an unchanged shard keeps its URL (and browser and CDN
+caches) across deploys, and a changed one gets a new URL with its page.
+
+    day:     {"start": leagues already on the page,
+              "leagues": [[league, [[slug, folder, kickoff, fixture], ...]], ...]}
+    channel: {"rows": [[slug, folder, kickoff, fixture, league], ...]}
+"""
+import json
+
+from .config import LISTING_FIRST_SCREEN, LISTING_SHARD_DIR
+from .data import channel_upcoming
+from .util import content_hash
+
+
+def split_day(site, day):
+    """(first screen, rest) of a day's (league, matches) groups; leagues are never split"""
+    leagues = site.day_index[day]['leagues']
+    shown = 0
+    for i, (_, matches) in enumerate(leagues):
+        if shown >= LISTING_FIRST_SCREEN:
+            return leagues[:i], leagues[i:]
+        shown += len(matches)
+    return leagues, []
+
+def split_channel(site, c_slug):
+    """(first screen, rest) of a channel's upcoming matches"""
+    upcoming = channel_upcoming(site.channel_index[c_slug], site.channel_since_ts)
+    return upcoming[:LISTING_FIRST_SCREEN], upcoming[LISTING_FIRST_SCREEN:]
+
+def shard_path(kind, name, text):
+    return f"{LISTING_SHARD_DIR}/{kind}/{name}.{content_hash(text)[:12]}.json"
+
+def render_day_listing(site, day):
+    first, rest = split_day(site, day)
+    return json.dumps({
+        'start': len(first),
+        'leagues': [[league, [[m.slug, m.folder, m.kickoff, m.fixture] for m in matches]] for league, matches in rest],
+    }, ensure_ascii=False, separators=(',', ':'))
+
+def render_channel_listing(site, c_slug):
+    _, rest = split_channel(site, c_slug)
+    return json.dumps({'rows': [[m.slug, m.folder, m.kickoff, m.fixture, m.league] for m in rest]},
+                      ensure_ascii=False, separators=(',', ':'))
+
+def day_shard(site, day):
+    """(rel_path, text) of a day's listing shard, or None when the first screen holds it all"""
+    if not split_day(site, day)[1]:
+        return None
+    text = render_day_listing(site, day)
+    return shard_path('day', day.strftime('%Y-%m-%d'), text), text
+
+def channel_shard(site, c_slug):
+    """(rel_path, text) of a channel's listing shard, or None when the first screen holds it all"""
+    if not split_channel(site, c_slug)[1]:
+        return None
+    text = render_channel_listing(site, c_slug)
+    return shard_path('channel', c_slug, text), text
@@ -0,0 +1,254 @@
+"""HTML for the match, day and channel pages.
+
+Every renderer takes the Site being built and a page key, and returns the
+page as a string; RENDERERS maps page kinds to them.
+"""
+from datetime import timedelta
+from html import escape
+
+from .listings import channel_shard, day_shard, split_channel, split_day
+from .util import slugify
+
+# Google Ads loader and code block
+ADS_LOADER = '''<script async src="https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js?client=ca-pub-5525538810839147"
+     crossorigin="anonymous"></script>'''
+ADS_CODE = '''
+<div class="ad-container" style="margin: 20px 0; text-align: center;">
+''' + ADS_LOADER + '''
+<!-- Ressponsive -->
+<ins class="adsbygoogle"
+     style="display:block"
+     data-ad-client="ca-pub-5525538810839147"
+     data-ad-slot="4345862479"
+     data-ad-format="auto"
+     data-full-width-responsive="true"></ins>
+<script>
+     (adsbygoogle = window.adsbygoogle || []).push({});
+</script>
+</div>
+'''
+
+MENU_CSS = '''
+<style>
+    .weekly-menu-container {
+        display: flex;
+        width: 100%;
+        gap: 4px;
+        padding: 10px 5px;
+        box-sizing: border-box;
+        justify-content: space-between;
+    }
+    .date-btn {
+        flex: 1;
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        justify-content: center;
+        padding: 8px 2px;
+        text-decoration: none;
+        border-radius: 6px;
+        background: #fff;
+        border: 1px solid #e2e8f0;
+        min-width: 0; 
+        transition: all 0.2s;
+    }
+    .date-btn div { font-size: 9px; text-transform: uppercase; color: #64748b; font-weight: bold; }
+    .date-btn b { font-size: 10px; color: #1e293b; white-space: nowrap; }
+    .date-btn.active { background: #2563eb; border-color: #2563eb; }
+    .date-btn.active div, .date-btn.active b { color: #fff; }
+    
+    @media (max-width: 480px) {
+        .date-btn b { font-size: 8px; }
+        .date-btn div { font-size: 7px; }
+        .weekly-menu-container { gap: 2px; padding: 5px 2px; }
+    }
+</style>
+'''
+
+# --- RENDERED FRAGMENTS, SHARED BY EVERY PAGE A PROCESS RENDERS ---
+def fragment(site, kind, entity_id, version, render, *args):
+    """render(*args), memoised per (fragment type, entity id, content version).
+
+    The cache lives on the Site, so it lasts one build in each render process and
+    a channel pill or channel listing row is formatted once however many pages
+    include it. render is called as render(site, *args).
+    """
+    key = (kind, entity_id, version)
+    html = site.fragments.get(key)
+    if html is None:
+        html = site.fragments[key] = render(site, *args)
+    return html
+
+def render_weekly_menu(site, start, active):
+    menu = f'{MENU_CSS}<div class="weekly-menu-container">'
+    for j in range(7):
+        m_day = start + timedelta(days=j)
+        m_fname = site.day_filename(m_day)
+        active_class = "active" if m_day == active else ""
+        menu += f'''
+        <a href="{site.domain}/{m_fname}" class="date-btn {active_class}">
+            <div>{m_day.strftime("%a")}</div>
+            <b>{m_day.strftime("%b %d")}</b>
+        </a>'''
+    return menu + '</div>'
+
+def render_channel_pill(site, ch):
+    return f'<a href="{site.domain}/channel/{slugify(ch)}/" style="display: inline-block; background: #f1f5f9; color: #2563eb; padding: 2px 8px; border-radius: 4px; margin: 2px; text-decoration: none; font-weight: 600; border: 1px solid #e2e8f0;">{ch}</a>'
+
+def render_day_row(site, m):
+    return f'''
+        <a href="{m.url}" class="match-row flex items-center p-4 bg-white group border-b border-slate-100">
+            <div class="time-box" style="min-width: 95px; text-align: center; border-right: 1px solid #edf2f7; margin-right: 10px;">
+                <div class="text-[10px] uppercase text-slate-400 font-bold auto-date" data-unix="{m.kickoff}">{m.dt.strftime('%d %b')}</div>
+                <div class="font-bold text-blue-600 text-sm auto-time" data-unix="{m.kickoff}">{m.dt.strftime('%H:%M')}</div>
+            </div>
+            <div class="flex-1">
+                <span class="text-slate-800 font-semibold text-sm md:text-base">{m.fixture}</span>
+            </div>
+        </a>'''
+
+def render_channel_row(site, m):
+    return f'''
+        <a href="{m.url}" class="match-row flex items-center p-4 bg-white border-b border-slate-100 group">
+            <div class="time-box" style="min-width: 95px; text-align: center; border-right: 1px solid #edf2f7; margin-right: 10px;">
+                <div class="text-[10px] uppercase text-slate-400 font-bold auto-date" data-unix="{m.kickoff}">{m.dt.strftime('%d %b')}</div>
+                <div class="font-bold text-blue-600 text-sm auto-time" data-unix="{m.kickoff}">{m.dt.strftime('%H:%M')}</div>
+            </div>
+            <div class="flex-1">
+                <span class="text-slate-800 font-semibold text-sm md:text-base">{m.fixture}</span>
+                <div class="text-[11px] text-blue-500 font-medium uppercase mt-0.5">{m.league}</div>
+            </div>
+        </a>'''
+
+FORM_COLOURS = {'W': '#16a34a', 'D': '#94a3b8', 'L': '#dc2626'}
+
+def render_scorers(scorers):
+    return "".join(f"<div>⚽ {escape(g.get('name', ''), quote=False)} {escape(str(g.get('time', '')), quote=False)}</div>" for g in scorers)
+
+def render_form(team):
+    pills = "".join(
+        f'<span style="display: inline-block; width: 20px; text-align: center; margin: 1px; border-radius: 3px; '
+        f'color: #fff; font-size: 11px; font-weight: 800; background: {FORM_COLOURS.get(r, "#94a3b8")};">{escape(str(r), quote=False)}</span>'
+        for r in team.get('form') or [])
+    position = f' <span style="color: #64748b; font-size: 12px;">#{team["position"]}</span>' if team.get('position') else ""
+    return pills + position
+
+def render_match_data(site, m):
+    """Score, scorers, winning odds and recent form from data/, or "" when none was scraped"""
+    data = site.match_data(m)
+    if not data:
+        return ""
+    home, _, away = m.fixture.partition(" vs ")
+
+    def row(title, home_html, away_html):
+        return f'''
+        <div style="display: flex; align-items: flex-start; padding: 12px; border-bottom: 1px solid #edf2f7; background: #fff;">
+            <div style="flex: 0 0 100px; font-weight: 800; color: #475569; font-size: 13px;">{title}</div>
+            <div style="flex: 1; font-size: 13px;">{home_html}</div>
+            <div style="flex: 1; font-size: 13px;">{away_html}</div>
+        </div>'''
+
+    rows = ""
+    goals = data.get('incidents')
+    if goals:
+        home_score = f"<b>{escape(home, quote=False)} {goals.get('home_score', 0)}</b>"
+        away_score = f"<b>{goals.get('away_score', 0)} {escape(away, quote=False)}</b>"
+        rows += row("Score", home_score + render_scorers(goals.get('home_scorers') or []),
+                    away_score + render_scorers(goals.get('away_scorers') or []))
+    odds = data.get('odds')
+    if odds:
+        rows += row("Win Odds", escape(str((odds.get('home') or {}).get('fractionalValue', '-'))),
+                    escape(str((odds.get('away') or {}).get('fractionalValue', '-'))))
+    form = data.get('form')
+    if form:
+        rows += row("Form", render_form(form.get('homeTeam') or {}), render_form(form.get('awayTeam') or {}))
+    if not rows:
+        return ""
+    return (f'<div class="section-header">Match Centre</div>'
+            f'<div class="bg-white shadow-xl rounded-b-lg overflow-hidden border border-slate-200 mb-8">{rows}</div>')
+
+# --- PAGE RENDERERS (called by render_batch, possibly in a worker process) ---
+def render_match_page(site, i):
+    m = site.matches[i]
+    m_dt_local = m.dt
+    
+    rows = ""
+    country_counter = 0
+    for country, channels in site.broadcasters_for(m):
+        country_counter += 1
+        # A pill depends on nothing but the channel name, which is also its id
+        pills = "".join(fragment(site, 'channel_pill', ch, None, render_channel_pill, ch) for ch in channels)
+        
+        rows += f'''
+        <div style="display: flex; align-items: flex-start; padding: 12px; border-bottom: 1px solid #edf2f7; background: #fff;">
+            <div style="flex: 0 0 100px; font-weight: 800; color: #475569; font-size: 13px; padding-top: 4px;">{country}</div>
+            <div style="flex: 1; display: flex; flex-wrap: wrap; gap: 4px;">{pills}</div>
+        </div>'''
+        if country_counter % 10 == 0:
+            rows += ADS_CODE
+
+    return site.templates['match'].render({
+        "FIXTURE": m.fixture,
+        "DOMAIN": site.domain,
+        "BROADCAST_ROWS": rows,
+        "MATCH_DATA": render_match_data(site, m),
+        "LEAGUE": m.league,
+        "LOCAL_DATE": f'<span class="auto-date" data-unix="{m.kickoff}">{m_dt_local.strftime("%d %b %Y")}</span>',
+        "LOCAL_TIME": f'<span class="auto-time" data-unix="{m.kickoff}">{m_dt_local.strftime("%H:%M")}</span>',
+        "DATE": m_dt_local.strftime("%Y-%m-%d"),
+        "TIME": m_dt_local.strftime("%H:%M"),
+        "UNIX": str(m.kickoff),
+        "VENUE": m.venue,
+    })
+
+def render_day_page(site, day):
+    fname = site.day_filename(day)
+    menu_start, menu_active = site.menu_for(day)
+
+    first, rest = split_day(site, day)
+    listing_html = ""
+    for league_counter, (league, league_matches) in enumerate(first):
+        if league_counter and league_counter % 3 == 0:
+            listing_html += ADS_CODE
+        listing_html += f'<div class="league-header">{league}</div>'
+
+        # Each match is on exactly one day page, so day rows are not worth caching
+        listing_html += "".join(render_day_row(site, m) for m in league_matches)
+
+    # A listing continued from its shard gets its closing ad after the loaded leagues
+    if listing_html != "" and not rest: listing_html += ADS_CODE
+    shard = day_shard(site, day)
+
+    return site.templates['home'].render({
+        "MATCH_LISTING": listing_html,
+        "WEEKLY_MENU": fragment(site, 'weekly_menu', menu_start, menu_active, render_weekly_menu, menu_start, menu_active),
+        "DOMAIN": site.domain,
+        "SELECTED_DATE": day.strftime("%A, %b %d, %Y"),
+        "PAGE_TITLE": f"TV Channels For {day.strftime('%A, %b %d, %Y')}",
+        "CURRENT_PATH": "/" if fname == "index.html" else f"/{fname}",
+        "LISTING_SHARD": f"/{shard[0]}" if shard else "",
+        # The shard's ad slots may be the first on the page, so they cannot rely on ADS_CODE's loader
+        "LISTING_ADS_LOADER": ADS_LOADER if shard else "",
+    })
+
+def render_channel_page(site, c_slug):
+    channel = site.channel_index[c_slug]
+    first, _ = split_channel(site, c_slug)
+    # The same match is listed on every channel carrying it: render its row once
+    c_listing = "".join(fragment(site, 'channel_row', m.match_id, m.key, render_channel_row, m)
+                        for m in first)
+    shard = channel_shard(site, c_slug)
+
+    return site.templates['channel'].render({
+        "CHANNEL_NAME": channel['name'],
+        "MATCH_LISTING": c_listing,
+        "DOMAIN": site.domain,
+        "LISTING_SHARD": f"/{shard[0]}" if shard else "",
+    })
+
+
+RENDERERS = {
+    'match': render_match_page,
+    'day': render_day_page,
+    'channel': render_channel_page,
+}
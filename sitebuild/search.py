@@ -0,0 +1,134 @@
+"""Sharded client-side search index over team, league and channel names.
+
+Every name is split into normalised words, and each word is indexed under
+its first two characters and its trigrams. A term lives in the shard of its
+first two characters, search/<cc>.json:
+
+    {"p": {two-letter prefix: [doc ids]}, "t": {trigram: [doc ids]}}
+
+and the documents themselves in search/docs/<id % SEARCH_DOC_SHARDS>.json:
+
+    {"d": {doc id: [name, kind, path, detail, kickoff, rank]}}
+
+A doc id is a hash of the document's kind and slug, so it stays the same
+from build to build and postings (sorted by id) only change when a name is
+added or dropped. rank (busiest highest) lives in the document alone: a
+team playing one more match rewrites its doc shard, not every shard
+listing a lower ranked name. A query word of three or more letters is
+looked up through its trigrams, so it is found anywhere in a name; the
+browser intersects the postings of every trigram of every such word, so
+they are complete. Two-letter words are looked up as prefixes only when the
+query has no longer word; those postings match hundreds of names and keep
+the SEARCH_POSTINGS_MAX best ranked. The browser then fetches the doc
+shards of the common ids and orders the names by rank. Term shards are a
+few KB. kind is t(eam), l(eague) or c(hannel); path links to the next (else
+latest) match, that match's day page, or the channel page.
+"""
+import json
+import re
+import unicodedata
+
+from .config import SEARCH_DOC_SHARDS, SEARCH_ID_BITS, SEARCH_POSTINGS_MAX, TOP_LEAGUE_IDS
+from .data import channel_upcoming
+from .util import content_hash
+
+# Top leagues outrank any number of lower league fixtures
+TOP_LEAGUE_WEIGHT = 1000
+
+
+def normalize(text):
+    """Lower case without accents, so "Atlético" is found by "atletico" """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def words(text):
+    return re.findall(r'\w+', normalize(text))
+
+def shard_name(term):
+    """search/<cc>.json shard of a term; characters outside [a-z0-9] are written "_" """
+    return "".join(c if 'a' <= c <= 'z' or '0' <= c <= '9' else '_' for c in term[:2])
+
+def index_terms(name):
+    """(prefixes, trigrams) of every word of a name"""
+    prefixes, trigrams = set(), set()
+    for w in words(name):
+        if len(w) >= 2:
+            prefixes.add(w[:2])
+        trigrams.update(w[i:i + 3] for i in range(len(w) - 2))
+    return prefixes, trigrams
+
+def featured_match(site, matches):
+    """The next match of a list in kickoff order, else the latest one"""
+    now_ts = site.now.timestamp()
+    return next((m for m in matches if m.kickoff >= now_ts), matches[-1])
+
+def day_path(site, day):
+    fname = site.day_filename(day)
+    return "/" if fname == "index.html" else f"/{fname}"
+
+def search_documents(site):
+    """[(key, rank, name, kind, path, detail, kickoff)] of every team, league and channel.
+
+    Read from the name and channel indexes built with the day index; key is
+    "<kind>/<slug>", from which the doc id is derived.
+    """
+    def rank(matches):
+        return len(matches) + TOP_LEAGUE_WEIGHT * any(m.league_id in TOP_LEAGUE_IDS for m in matches)
+
+    docs = []
+    for slug, team in site.name_index['t'].items():
+        m = featured_match(site, team['matches'])
+        docs.append((f"t/{slug}", rank(team['matches']), team['name'], 't',
+                     f"/match/{m.slug}/{m.folder}/", m.fixture, m.kickoff))
+    for slug, league in site.name_index['l'].items():
+        m = featured_match(site, league['matches'])
+        docs.append((f"l/{slug}", rank(league['matches']), league['name'], 'l',
+                     day_path(site, m.dt.date()), m.fixture, m.kickoff))
+    for c_slug, channel in site.channel_index.items():
+        upcoming = channel_upcoming(channel, site.now.timestamp())
+        m = upcoming[0] if upcoming else None
+        docs.append((f"c/{c_slug}", len(channel['matches']), channel['name'], 'c', f"/channel/{c_slug}/",
+                     m.fixture if m else "", m.kickoff if m else 0))
+    return docs
+
+def doc_ids(keys):
+    """{key: doc id}: the key's hash in SEARCH_ID_BITS bits, or the next free id on a collision"""
+    space = 1 << SEARCH_ID_BITS
+    ids, taken = {}, set()
+    for key in sorted(keys):
+        doc_id = int(content_hash(key), 16) % space
+        while doc_id in taken:
+            doc_id = (doc_id + 1) % space
+        taken.add(doc_id)
+        ids[key] = doc_id
+    return ids
+
+def search_shards(docs):
+    """{file name: shard} of search documents: term shards, then doc shards.
+
+    Postings list doc ids in id order. Prefixes keep the SEARCH_POSTINGS_MAX
+    best ranked ids: "an" matches hundreds of names, of which only the best
+    ranked are shown.
+    """
+    ids = doc_ids(key for key, *_ in docs)
+    shards, prefixed = {}, {}
+    for key, rank, name, kind, path, detail, kickoff in docs:
+        doc_id = ids[key]
+        prefixes, trigrams = index_terms(name)
+        for term in prefixes:
+            prefixed.setdefault(term, []).append((-rank, name, doc_id))
+        for term in trigrams:
+            shard = shards.setdefault(f"search/{shard_name(term)}.json", {'p': {}, 't': {}})
+            shard['t'].setdefault(term, []).append(doc_id)
+        shard = shards.setdefault(f"search/docs/{doc_id % SEARCH_DOC_SHARDS}.json", {'d': {}})
+        shard['d'][doc_id] = [name, kind, path, detail, kickoff, rank]
+    for term, ranked in prefixed.items():
+        shard = shards.setdefault(f"search/{shard_name(term)}.json", {'p': {}, 't': {}})
+        shard['p'][term] = sorted(doc_id for *_, doc_id in sorted(ranked)[:SEARCH_POSTINGS_MAX])
+    for shard in shards.values():
+        for postings in shard.get('t', {}).values():
+            postings.sort()
+    return dict(sorted(shards.items()))
+
+def render_search_shard(site, shard):
+    return json.dumps(shard, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
@@ -0,0 +1,72 @@
+"""Sharded sitemap: monthly match shards, pages and channels under one index.
+
+<lastmod> is when a page's output last changed (the manifest's 'mod'), so a
+rescrape that changes nothing, or a kickoff passing, leaves it alone while a
+new score or channel moves it. Pages with no known change time get none.
+"""
+from datetime import datetime, timezone
+from itertools import chain
+
+from .config import SITEMAP_MAX_URLS
+
+
+def page_lastmod(site, rel_path):
+    """When the page at rel_path last changed, from this build's manifest entries, or None"""
+    entry = site.page_entries.get(rel_path)
+    return entry.get('mod') if entry else None
+
+def latest(stamps):
+    return max((t for t in stamps if t), default=None)
+
+def w3c_datetime(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+def sitemap_groups(site):
+    """{group: {url: lastmod}} for every page of the site.
+
+    A later match on the same URL wins, as its page does.
+    """
+    groups = {'pages': {}, 'channels': {}}
+    for m in site.matches:
+        groups.setdefault(f"matches-{m.dt.strftime('%Y-%m')}", {})[m.url] = page_lastmod(
+            site, f"match/{m.slug}/{m.folder}/index.html")
+    for day in site.day_index:
+        fname = site.day_filename(day)
+        url = f"{site.domain}/" if fname == "index.html" else f"{site.domain}/{fname}"
+        groups['pages'][url] = page_lastmod(site, fname)
+    groups['pages'].setdefault(f"{site.domain}/", page_lastmod(site, "index.html"))
+    for c_slug in site.channel_index:
+        groups['channels'][f"{site.domain}/channel/{c_slug}/"] = page_lastmod(site, f"channel/{c_slug}/index.html")
+    return groups
+
+def sitemap_shards(entries_by_group):
+    """Split {group: {url: lastmod}} into {file name: sorted [(url, lastmod)]} shards.
+
+    Groups over SITEMAP_MAX_URLS are split into group-2, group-3, ... files.
+    """
+    shards = {}
+    for group in sorted(entries_by_group):
+        entries = sorted(entries_by_group[group].items())
+        for n, i in enumerate(range(0, len(entries), SITEMAP_MAX_URLS), 1):
+            name = group if n == 1 else f"{group}-{n}"
+            shards[f"sitemaps/{name}.xml"] = entries[i:i + SITEMAP_MAX_URLS]
+    return shards
+
+def render_sitemap(site, entries):
+    """One <urlset> shard; joined from a generator rather than grown by +="""
+    return "".join(chain(
+        ['<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'],
+        (f'<url><loc>{url}</loc><lastmod>{w3c_datetime(ts)}</lastmod></url>' if ts else f'<url><loc>{url}</loc></url>'
+         for url, ts in entries),
+        ['</urlset>'],
+    ))
+
+def render_sitemap_index(site, shards):
+    """<sitemapindex> over (file name, latest lastmod) pairs"""
+    return "".join(chain(
+        ['<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'],
+        (f'<sitemap><loc>{site.domain}/{name}</loc><lastmod>{w3c_datetime(ts)}</lastmod></sitemap>' if ts
+         else f'<sitemap><loc>{site.domain}/{name}</loc></sitemap>'
+         for name, ts in shards),
+        ['</sitemapindex>'],
+    ))
@@ -0,0 +1,49 @@
+import os
+import re
+
+PLACEHOLDER_RE = re.compile(r'\{\{([A-Z_]+)\}\}')
+TEMPLATE_NAMES = ['home', 'match', 'channel']
+
+
+class Template:
+    """A template parsed once into literal chunks and {{PLACEHOLDER}} slots.
+
+    render() fills every slot from a dict and joins the pieces in one pass,
+    instead of copying the whole page once per chained str.replace().
+    Problems (missing or unused values) are collected in .problems and
+    reported once at the end of the build.
+    """
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        # re.split with one group alternates literal, placeholder, literal, ...
+        self.parts = PLACEHOLDER_RE.split(source)
+        self.slots = [(i, self.parts[i]) for i in range(1, len(self.parts), 2)]
+        self.fields = frozenset(field for _, field in self.slots)
+        self.problems = set()
+
+    def render(self, values):
+        parts = self.parts[:]
+        for i, field in self.slots:
+            value = values.get(field)
+            if value is None:
+                self.problems.add(f"{self.name}: {{{{{field}}}}} has no value and was left empty")
+                value = ""
+            parts[i] = value
+        if not self.fields.issuperset(values):
+            for field in values.keys() - self.fields:
+                self.problems.add(f"{self.name}: value for {{{{{field}}}}} given but not used by the template")
+        return "".join(parts)
+
+
+def load_templates(directory="."):
+    """{name: Template} for every <name>_template.html found in directory"""
+    templates = {}
+    for name in TEMPLATE_NAMES:
+        try:
+            with open(os.path.join(directory, f'{name}_template.html'), 'r', encoding='utf-8') as f:
+                templates[name] = Template(name, f.read())
+        except FileNotFoundError:
+            print(f"CRITICAL ERROR: {name}_template.html not found.")
+    return templates
@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+
+def slugify(t):
+    return re.sub(r'[^a-z0-9]+', '-', str(t).lower()).strip('-')
+
+def atomic_write(path, content):
+    """Write file atomically to prevent serving partial content; content is str or bytes"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Write to temp file first
+    binary = isinstance(content, bytes)
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, text=not binary)
+    try:
+        with os.fdopen(temp_fd, 'wb') if binary else os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # Atomic rename
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def content_hash(*parts):
+    """Short stable hash over strings/bytes, used as manifest keys"""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def record_hash(m):
+    """Hash of a single match record as loaded from date/*.json"""
+    return content_hash(json.dumps(m, sort_keys=True, separators=(',', ':')))
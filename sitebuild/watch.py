@@ -0,0 +1,287 @@
+"""Long-running build that keeps the site in memory and updates the live output in place.
+
+    python -m sitebuild watch [--interval 2] [--refresh 300] [--out DIR] [--compress]
+
+The parsed match records are kept per input file, so a change to one date
+file (or archive month) re-reads only that file. A file that cannot be read
+or parsed, as when it is caught half written, keeps its previous records and
+is read again on the next poll. When only date files changed, only the
+indexes and pages of the dates (and channels) their records are on are
+planned again; other updates recompute the whole plan from memory. Either
+way only pages whose source key changed are rendered; each is written next to its live copy and renamed over it, so a
+page is never served half written. Pages that no longer exist are removed,
+except listing shards, which stay for LISTING_SHARD_GRACE as in a build.
+
+Inputs are polled (stat of date/*.json, the archive months and the data/
+index, whose updates bring new scores and odds) rather than
+watched with inotify, which keeps the daemon stdlib-only and portable. Local
+midnight moves "today" and the weekly menu, and every --refresh seconds the
+channel windows and sitemap are brought up to date even without new data.
+Template or code changes need a restart. Do not point a scheduled build and
+a watcher at the same --out: the watcher owns its output and its manifest.
+"""
+import glob
+import json
+import os
+import re
+import signal
+import time
+from datetime import date, datetime, timedelta
+from itertools import chain
+
+import archive
+from run_report import RunReport
+
+from .builder import (COMPRESSORS, PAGE_FAMILIES, RENDERERS, build_key, channel_pages, day_pages,
+                      match_pages, page_entry, read_manifest, retired_shards)
+from .config import CACHE_DIR, LISTING_SHARD_DIR
+from .data import Site, last_seen, load_archive_matches, load_date_file
+from .templates import load_templates
+from .util import atomic_write, content_hash
+
+POLL_INTERVAL = 2.0
+REFRESH_INTERVAL = 300
+
+
+def scan(config):
+    """{path: (mtime_ns, size)} of every input: archive months then date files, each sorted, then the data index"""
+    paths = archive.month_files(config.archive_dir) + sorted(glob.glob(os.path.join(config.date_dir, "*.json")))
+    if config.data_index:
+        paths.append(config.data_index)
+    stamps = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        stamps[path] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+def seconds_to_midnight(now):
+    """Seconds until the next local midnight of an aware datetime"""
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+    return (midnight - now).total_seconds()
+
+def page_scope(rel_path, today):
+    """('day', date) or ('channel', slug) of a match, day or channel page or listing shard; None for the rest"""
+    parts = rel_path.split('/')
+    if parts[0] == 'match' and len(parts) == 4:
+        return 'day', datetime.strptime(parts[2], '%Y%m%d').date()
+    if parts[0] == 'channel' and len(parts) == 3:
+        return 'channel', parts[1]
+    if parts[0] == LISTING_SHARD_DIR and len(parts) == 3:
+        name = parts[2].split('.')[0]
+        return ('day', date.fromisoformat(name)) if parts[1] == 'day' else ('channel', name)
+    if rel_path == "index.html":
+        return 'day', today
+    if re.fullmatch(r'\d{4}-\d{2}-\d{2}\.html', rel_path):
+        return 'day', date.fromisoformat(rel_path[:10])
+    return None
+
+def stop(signum, frame):
+    """SIGTERM handler: stop like Ctrl-C; every page write is atomic, so any point is safe"""
+    raise KeyboardInterrupt
+
+
+class Watcher:
+    """The site of one output directory, kept in memory between updates."""
+
+    def __init__(self, config):
+        self.config = config
+        self.templates = load_templates(config.template_dir)
+        self.key = build_key(config, self.templates)
+        self.manifest = read_manifest(config.manifest_path)
+        self.stamps = {}
+        # path -> compact Match records read from that file alone
+        self.records = {}
+        self.site = None
+        self.problems = set()
+
+    def reload(self, stamps, report):
+        """Re-read the inputs whose stamp changed and forget removed ones.
+
+        Returns (paths changed, records dropped or read). An input that cannot
+        be read or parsed keeps its previous records, and its old stamp so the
+        next poll tries it again.
+        """
+        inputs = self.manifest['inputs']
+        stamps = dict(stamps)
+        changed = []
+        touched = []
+        for path in [path for path in stamps if self.stamps.get(path) != stamps[path]]:
+            if path == self.config.data_index:
+                # Not match records: every Site loads the current index itself
+                changed.append(path)
+                continue
+            digest = inputs.get(path)
+            try:
+                if path.endswith('.json.gz'):
+                    records = load_archive_matches([path], inputs, report)
+                else:
+                    records = load_date_file(path, inputs, report)
+            except (OSError, EOFError, ValueError) as e:
+                report.error('unreadable_input', f"{path}: {e} (previous records kept)")
+                if path in self.stamps:
+                    stamps[path] = self.stamps[path]
+                    inputs[path] = digest
+                else:
+                    del stamps[path]
+                    inputs.pop(path, None)
+                continue
+            changed.append(path)
+            touched.extend(self.records.get(path, ()))
+            touched.extend(records)
+            self.records[path] = records
+        for path in self.stamps.keys() - stamps.keys():
+            changed.append(path)
+            touched.extend(self.records.pop(path, ()))
+            inputs.pop(path, None)
+        self.stamps = stamps
+        return changed, touched
+
+    def write_page(self, rel_path, content):
+        """Atomically replace one live page (and its precompressed siblings); returns bytes written"""
+        path = os.path.join(self.config.out_dir, rel_path)
+        data = content.encode('utf-8')
+        atomic_write(path, data)
+        written = len(data)
+        for ext, compress in sorted(COMPRESSORS.items()):
+            if self.config.compress:
+                packed = compress(data)
+                atomic_write(f"{path}.{ext}", packed)
+                written += len(packed)
+            elif os.path.exists(f"{path}.{ext}"):
+                # A sibling from a --compress run would no longer match the page
+                os.unlink(f"{path}.{ext}")
+        return written
+
+    def remove_page(self, rel_path):
+        """Delete a page that no longer exists, its siblings and any directories left empty"""
+        path = os.path.join(self.config.out_dir, rel_path)
+        for target in [path] + [f"{path}.{ext}" for ext in COMPRESSORS]:
+            if os.path.exists(target):
+                os.unlink(target)
+        directory = os.path.dirname(path)
+        while os.path.abspath(directory) != os.path.abspath(self.config.out_dir) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def update(self, now, stamps=None, full=True):
+        """Bring the live output up to date with the inputs and clock; returns the RunReport.
+
+        With full=False, an update where only date files changed (on the same
+        day) re-indexes and plans just the pages of the dates and channels of
+        their records, keeping the clock; the sitemap and search index are
+        planned in full, their shards reused by source key as always.
+        """
+        config = self.config
+        report = RunReport("watch")
+        with report.stage('load'):
+            changed, touched = self.reload(scan(config) if stamps is None else stamps, report)
+            report.count('inputs_changed', len(changed))
+            matches = last_seen(chain.from_iterable(self.records.get(path, ()) for path in self.stamps))
+        report.count('matches', len(matches))
+        partial = (not full and self.site is not None and now.date() == self.site.today
+                   and not any(path == config.data_index or path.endswith('.json.gz') for path in changed))
+
+        with report.stage('index'):
+            if partial:
+                days, channels = self.site.reindex(matches, touched)
+                scopes = {match_pages: {'days': days}, day_pages: {'days': days},
+                          channel_pages: {'channels': channels}}
+            else:
+                config.now = now
+                self.site = Site(config, self.templates, matches)
+                scopes = {}
+            site = self.site
+
+        with report.stage('render'):
+            old_pages = self.manifest['pages']
+            new_pages = site.page_entries
+            encodings = sorted(COMPRESSORS) if config.compress else None
+            if partial:
+                # Pages of other dates and channels are carried over as they are
+                replanned = {('day', day) for day in days} | {('channel', c_slug) for c_slug in channels}
+                for rel_path, entry in old_pages.items():
+                    scope = page_scope(rel_path, site.today)
+                    if scope and scope not in replanned and 'retired' not in entry:
+                        new_pages[rel_path] = entry
+                report.count('pages_carried_over', len(new_pages))
+            # Each family is planned once the ones before it are written, as in a build,
+            # so the sitemap sees when this update changed the pages it lists
+            for _, planner in PAGE_FAMILIES:
+                for rel_path, (source_key, kind, key, _) in planner(site, self.key, **scopes.get(planner, {})).items():
+                    prev = old_pages.get(rel_path)
+                    if (prev and prev.get('src') == source_key and prev.get('z') == encodings
+                            and os.path.isfile(os.path.join(config.out_dir, rel_path))):
+                        new_pages[rel_path] = prev
+                        continue
+                    content = RENDERERS[kind](site, key)
+                    report.count('pages_rendered')
+                    out_hash = content_hash(content.encode('utf-8'))
+                    entry = page_entry(prev, source_key, out_hash, now)
+                    if encodings:
+                        entry['z'] = encodings
+                    # Identical output (a new source key with the same content) is not rewritten
+                    if not (prev and prev.get('out') == out_hash and prev.get('z') == encodings):
+                        report.wrote_bytes(self.write_page(rel_path, content))
+                        report.count('pages_written')
+                    new_pages[rel_path] = entry
+            retained = retired_shards(old_pages, new_pages, now)
+            new_pages.update(retained)
+            report.count('shards_retained', len(retained))
+            for rel_path in old_pages.keys() - new_pages.keys():
+                self.remove_page(rel_path)
+                report.count('pages_removed')
+            report.count('pages_unchanged', len(new_pages) - len(retained) - report.counters['pages_written'])
+            report.read_bytes(site.take_bytes_read())
+
+        self.manifest['pages'] = new_pages
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        atomic_write(config.manifest_path, json.dumps(self.manifest, separators=(',', ':')))
+
+        problems = set().union(*(t.problems for t in self.templates.values()))
+        report.count('template_problems', len(problems))
+        for problem in sorted(problems - self.problems):
+            print(f"Template warning: {problem}")
+        self.problems = problems
+        return report
+
+    def run(self, interval=POLL_INTERVAL, refresh=REFRESH_INTERVAL):
+        """Update once, then poll the inputs until interrupted (Ctrl-C or SIGTERM)"""
+        config = self.config
+        signal.signal(signal.SIGTERM, stop)
+        os.makedirs(config.out_dir, exist_ok=True)
+        self.log(self.update(datetime.now(config.tz)), "Initial update")
+        last_update = time.monotonic()
+        try:
+            while True:
+                now = datetime.now(config.tz)
+                time.sleep(max(0.0, min(interval, seconds_to_midnight(now))))
+                now = datetime.now(config.tz)
+                stamps = scan(config)
+                if now.date() != self.site.today:
+                    reason = f"Rolled over to {now.date()}"
+                elif stamps != self.stamps:
+                    reason = "Inputs changed"
+                elif time.monotonic() - last_update >= refresh:
+                    reason = "Refresh"
+                else:
+                    continue
+                self.log(self.update(now, stamps, full=reason != "Inputs changed"), reason)
+                last_update = time.monotonic()
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+    def log(self, report, reason):
+        counters = report.counters
+        seconds = sum(report.to_dict()['stages_s'].values())
+        print(f"{reason}: {counters['inputs_changed']} input(s) changed, "
+              f"{counters['pages_written']} page(s) written, {counters['pages_removed']} removed "
+              f"in {seconds:.2f}s")
+        report.write(self.config.report_path)
+
+
+def watch(config, interval=POLL_INTERVAL, refresh=REFRESH_INTERVAL):
+    """Run a Watcher on config until interrupted"""
+    Watcher(config).run(interval, refresh)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import random
+import time
+
+# Statuses worth retrying; 403/429 also mean SofaScore wants us to slow down
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {403, 429}
+
+# Replaces https://<host>/api/v1 in every scraper URL when set, e.g. to run them
+# against the replay server in benchmarks/sofa_replay.py
+API_BASE = os.environ.get("SOFASCORE_API_BASE", "").rstrip("/")
+
+
+def api_url(path, host="api.sofascore.com"):
+    """URL of a SofaScore API path such as "event/123/lineups" """
+    return f"{API_BASE or 'https://' + host + '/api/v1'}/{path}"
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RequestScheduler:
+    """Shared request gate for the SofaScore scrapers.
+
+    Every request goes through one global concurrency cap and one token
+    bucket. A 403/429 pauses all requests (honouring Retry-After), halves the
+    request rate and lets it creep back up with each success; further
+    403/429s during that pause belong to the same throttle. Failed requests
+    are retried with exponential backoff and full jitter. When a RunReport
+    is given, every attempt is recorded in it.
+    """
+
+    def __init__(self, session, concurrency=8, rate=5.0, burst=None, retries=3,
+                 backoff=1.0, max_backoff=60.0, impersonate="chrome120", report=None):
+        self.session = session
+        self.report = report
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.bucket = TokenBucket(rate, burst or max(1, int(rate)))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.impersonate = impersonate
+        self.pause_until = 0.0
+        self.throttle_streak = 0
+
+    async def _wait_if_paused(self):
+        while True:
+            delay = self.pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def _on_throttled(self, res):
+        if self.report:
+            self.report.count("throttled")
+        # The other requests in flight when the pause began answer 429 too; the
+        # rate is halved and the streak counted once per throttle window
+        if time.monotonic() < self.pause_until:
+            return
+        self.throttle_streak += 1
+        try:
+            delay = float(res.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            delay = min(self.max_backoff, self.backoff * 2 ** self.throttle_streak)
+        self.pause_until = max(self.pause_until, time.monotonic() + delay)
+        self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+        print(f"[THROTTLE] HTTP {res.status_code}, pausing {delay:.1f}s, "
+              f"rate now {self.bucket.rate:.2f} req/s")
+
+    def _on_success(self):
+        self.throttle_streak = 0
+        if self.bucket.rate < self.max_rate:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate / 20)
+
+    async def request(self, url, timeout=15):
+        """GET url under the global limits; returns the final response or None."""
+        res, error = None, None
+        for attempt in range(self.retries + 1):
+            await self._wait_if_paused()
+            await self.bucket.acquire()
+            async with self.semaphore:
+                started = time.perf_counter()
+                try:
+                    res, error = await self.session.get(url, impersonate=self.impersonate, timeout=timeout), None
+                except Exception as e:
+                    res, error = None, e
+                if self.report:
+                    self.report.request(url, res.status_code if res is not None else None,
+                                        time.perf_counter() - started,
+                                        len(getattr(res, "content", None) or b""), error)
+
+            if res is not None and res.status_code not in RETRY_STATUSES:
+                self._on_success()
+                return res
+            if res is not None and res.status_code in THROTTLE_STATUSES:
+                self._on_throttled(res)
+            if attempt < self.retries:
+                if self.report:
+                    self.report.count("retries")
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+        print("[ERROR]", url, error if error is not None else f"HTTP {res.status_code}")
+        if self.report:
+            self.report.count("requests_failed")
+        return res
+
+    async def get_json(self, url, timeout=15):
+        """Parsed JSON body of a 200 response, else None."""
+        res = await self.request(url, timeout=timeout)
+        if res is None or res.status_code != 200:
+            return None
+        try:
+            return res.json()
+        except ValueError as e:
+            if self.report:
+                self.report.error("invalid_json", f"{url} {e}")
+            else:
+                print("[ERROR]", url, e)
+            return None
@@ -0,0 +1,45 @@
+"""Helpers shared by the test modules: a scraped tree as date/, data/ and data/index.json."""
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from data_index import DataIndex, encode_day  # noqa: E402
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def write_scrape(days, matches_per_day):
+    """date/ files plus incidents/odds/form day files and their index, as the scrapers leave them"""
+    os.makedirs("date")
+    index = DataIndex.load()
+    match_id = 1000
+    for d in range(days):
+        day = (NOW - timedelta(days=days - 1 - d)).replace(hour=15, minute=0)
+        name = f"{day:%Y%m%d}.json"
+        records, data = [], {"incidents": {}, "odds": {}, "form": {}}
+        for i in range(matches_per_day):
+            match_id += 1
+            records.append({"match_id": match_id, "kickoff": int(day.timestamp()) + i * 3600,
+                            "fixture": f"Home {match_id} vs Away {match_id}", "league_id": 17,
+                            "league": "Premier League", "venue": "Stadium",
+                            "tv_channels": [{"country": "Andorra", "channels": ["Sports 1"]}]})
+            data["incidents"][str(match_id)] = {"match_id": match_id, "home_score": 1, "away_score": 0,
+                                                "home_scorers": [{"name": "Scorer", "time": "45'"}],
+                                                "away_scorers": []}
+            data["odds"][str(match_id)] = {"home": {"fractionalValue": "6/5"}, "away": {"fractionalValue": "9/4"}}
+            data["form"][str(match_id)] = {"homeTeam": {"form": ["W", "D"], "position": 3},
+                                           "awayTeam": {"form": ["L"], "position": 11}}
+        with open(os.path.join("date", name), "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        for endpoint, entries in data.items():
+            path = os.path.join("data", endpoint, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            text, spans = encode_day(entries)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            index.update(path, endpoint, text, spans)
+    index.save()
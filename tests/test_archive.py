@@ -0,0 +1,92 @@
+"""archive.py prune keeps archived matches' data/ records on their match pages."""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+import archive  # noqa: E402
+from conftest import NOW, write_scrape  # noqa: E402
+from data_index import DataIndex  # noqa: E402
+from sitebuild import BuildConfig, build  # noqa: E402
+
+DAYS = 45
+MATCHES_PER_DAY = 3
+
+
+def match_pages(out_dir):
+    pages = {}
+    for path in glob.glob(os.path.join(out_dir, "match", "*", "*", "index.html")):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.relpath(path, out_dir)] = f.read()
+    return pages
+
+
+class PruneKeepsMatchDataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="archive_test_")
+        os.chdir(self.tmp)
+        write_scrape(DAYS, MATCHES_PER_DAY)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def build(self, out_dir):
+        build(BuildConfig(out_dir=out_dir, template_dir=REPO, now=NOW, tz=timezone.utc))
+        return match_pages(out_dir)
+
+    def test_match_pages_unchanged_by_prune(self):
+        before = self.build("before")
+        self.assertEqual(len(before), DAYS * MATCHES_PER_DAY)
+        self.assertTrue(all("Match Centre" in page for page in before.values()))
+
+        archived = archive.prune(keep_days=30, today=NOW.date())
+        self.assertGreater(archived, 0)
+        self.assertTrue(glob.glob(os.path.join("archive", "data", "odds", "*.json.gz")))
+
+        after = self.build("after")
+        self.assertEqual(sorted(after), sorted(before))
+        for path, page in before.items():
+            self.assertEqual(after[path], page, path)
+
+    def test_unchanged_months_not_parsed_again(self):
+        archive.prune(keep_days=30, today=NOW.date())
+        months = len(archive.month_files("archive"))
+        self.assertGreater(months, 0)
+        full = self.build("full")
+        first = build(BuildConfig(out_dir="inc", template_dir=REPO, now=NOW, tz=timezone.utc, incremental=True))
+        self.assertEqual(first.counters["archive_months_cached"], 0)
+        second = build(BuildConfig(out_dir="inc", template_dir=REPO, now=NOW, tz=timezone.utc, incremental=True))
+        self.assertEqual(second.counters["archive_months_cached"], months)
+        self.assertEqual(second.counters["pages_rendered"], 0)
+        self.assertEqual(match_pages("inc"), full)
+        # A month rewritten with the same bytes is hashed, not parsed again
+        for path in archive.month_files("archive"):
+            os.utime(path, ns=(0, 0))
+        third = build(BuildConfig(out_dir="inc", template_dir=REPO, now=NOW, tz=timezone.utc, incremental=True))
+        self.assertEqual(third.counters["archive_months_cached"], months)
+        self.assertEqual(third.counters["pages_rendered"], 0)
+
+    def test_rebuild_indexes_archive_months(self):
+        archive.prune(keep_days=30, today=NOW.date())
+        pruned = DataIndex.load()
+        rebuilt = DataIndex()
+        rebuilt.rebuild()
+        for mid in pruned.matches:
+            for endpoint in ("incidents", "odds", "form"):
+                self.assertIsNotNone(pruned.read(mid, endpoint))
+                self.assertEqual(rebuilt.read(mid, endpoint), pruned.read(mid, endpoint))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""A build with --jobs N or from the match store writes the same site as a serial JSON build,
+and --compress adds siblings that decompress to every page."""
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+import archive  # noqa: E402
+from conftest import NOW, write_scrape  # noqa: E402
+from match_store import convert  # noqa: E402
+from sitebuild import BuildConfig, build  # noqa: E402
+from sitebuild.builder import COMPRESSORS  # noqa: E402
+
+DAYS = 40
+MATCHES_PER_DAY = 4
+
+
+def site_files(out_dir):
+    files = {}
+    for root, _, names in os.walk(out_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, out_dir)] = f.read()
+    return files
+
+
+class BuildOutputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="build_test_")
+        os.chdir(self.tmp)
+        write_scrape(DAYS, MATCHES_PER_DAY)
+        # Older days move to archive/, so archived match pages are built too
+        archive.prune(keep_days=30, today=NOW.date())
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def build(self, out_dir, **options):
+        build(BuildConfig(out_dir=out_dir, template_dir=REPO, now=NOW, tz=timezone.utc, **options))
+        return site_files(out_dir)
+
+    def assertSameSite(self, site, expected):
+        self.assertEqual(sorted(site), sorted(expected))
+        for path, data in expected.items():
+            self.assertEqual(site[path], data, path)
+
+    def test_parallel_build_matches_serial(self):
+        serial = self.build("serial")
+        self.assertGreater(sum(1 for path in serial if path.startswith("match" + os.sep)), 30 * MATCHES_PER_DAY)
+        self.assertSameSite(self.build("parallel", jobs=3), serial)
+
+    def test_store_build_matches_json(self):
+        serial = self.build("serial")
+        convert(sorted(os.path.join("date", name) for name in os.listdir("date")), "matches.bin")
+        self.assertSameSite(self.build("stored", store="matches.bin", jobs=2), serial)
+
+    def test_compressed_siblings(self):
+        site = self.build("compressed", compress=True, jobs=2)
+        pages = {path: data for path, data in site.items() if not path.endswith((".gz", ".br"))}
+        self.assertEqual(len(site), len(pages) * (1 + len(COMPRESSORS)))
+        for path, data in pages.items():
+            self.assertEqual(gzip.decompress(site[f"{path}.gz"]), data, path)
+        # Unchanged output keeps its siblings on an incremental rebuild
+        self.assertSameSite(self.build("compressed", compress=True, incremental=True), site)
+
+
+if __name__ == "__main__":
+    unittest.main()
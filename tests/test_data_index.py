@@ -0,0 +1,103 @@
+"""encode_day() spans read back through DataIndex, and rewrites that drop records."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from data_index import DataIndex, encode_day  # noqa: E402
+
+ENTRIES = {
+    "101": {"home": {"fractionalValue": "6/5"}, "away": {"fractionalValue": "9/4"}},
+    "102": {"homeTeam": {"name": "Deportivo Alavés", "form": ["W", "D"]}, "nested": [[1, 2], {"a": None}]},
+    "103": [],
+    "104": {},
+}
+
+
+class EncodeDayTest(unittest.TestCase):
+
+    def test_text_is_indented_json(self):
+        text, _ = encode_day(ENTRIES)
+        self.assertEqual(text, json.dumps(ENTRIES, indent=2))
+        self.assertEqual(encode_day({}), ("{}", {}))
+
+    def test_spans_are_the_records(self):
+        text, spans = encode_day(ENTRIES)
+        data = text.encode("utf-8")
+        self.assertEqual(spans.keys(), ENTRIES.keys())
+        for key, (offset, length) in spans.items():
+            self.assertEqual(json.loads(data[offset:offset + length]), ENTRIES[key])
+
+
+class DataIndexReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="data_index_test_")
+        os.chdir(self.tmp)
+        os.makedirs(os.path.join("data", "odds"))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def write(self, index, name, entries):
+        path = os.path.join("data", "odds", name)
+        text, spans = encode_day(entries)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        index.update(path, "odds", text, spans)
+        return path
+
+    def test_round_trip_through_saved_index(self):
+        index = DataIndex.load()
+        self.write(index, "20260301.json", ENTRIES)
+        self.assertTrue(index.save())
+        index = DataIndex.load()
+        for key, record in ENTRIES.items():
+            self.assertEqual(index.read(key, "odds"), record)
+        self.assertIsNone(index.read("999", "odds"))
+        self.assertIsNone(index.read("101", "form"))
+        index.close()
+
+    def test_rewrite_drops_records_that_left_the_file(self):
+        index = DataIndex.load()
+        self.write(index, "20260301.json", ENTRIES)
+        index.read("101", "odds")  # maps the old file
+        self.write(index, "20260301.json", {"102": {"changed": True}})
+        self.assertIsNone(index.read("101", "odds"))
+        self.assertEqual(index.read("102", "odds"), {"changed": True})
+        index.close()
+
+    def test_later_day_wins(self):
+        index = DataIndex.load()
+        self.write(index, "20260301.json", {"101": {"day": 1}})
+        self.write(index, "20260302.json", {"101": {"day": 2}})
+        self.assertEqual(index.read("101", "odds"), {"day": 2})
+        index.close()
+
+    def test_file_changed_behind_the_index_reads_none(self):
+        index = DataIndex.load()
+        path = self.write(index, "20260301.json", {"101": {"home": 1}})
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"101": {"home": 2}}, indent=2))
+        self.assertIsNone(index.read("101", "odds"))
+        index.close()
+
+    def test_rebuild_matches_incremental_updates(self):
+        index = DataIndex.load()
+        self.write(index, "20260301.json", ENTRIES)
+        self.write(index, "20260302.json", {"101": {"day": 2}})
+        index.save()
+        rebuilt = DataIndex("rebuilt.json")
+        rebuilt.rebuild()
+        self.assertEqual(rebuilt.matches, DataIndex.load().matches)
+
+
+if __name__ == "__main__":
+    unittest.main()
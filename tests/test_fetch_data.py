@@ -0,0 +1,137 @@
+"""MatchLifecycle: what is requested per phase, and when a finished match is frozen.
+DayStore: unreadable data/ files are left alone."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+try:
+    import fetch_data  # noqa: E402
+    from fetch_data import (FINAL_ATTEMPTS, IN_PLAY_ENDPOINTS, PRE_MATCH_ENDPOINTS,  # noqa: E402
+                            LINEUPS_LEAD, PRE_MATCH_REFRESH, DayStore, MatchLifecycle)
+except ImportError:  # the scrapers need curl_cffi
+    fetch_data = None
+from data_index import DataIndex, encode_day  # noqa: E402
+
+NOW = 1_770_000_000
+
+
+def event(status, kickoff=NOW - 3 * 3600, match_id=1):
+    return {"id": match_id, "startTimestamp": kickoff, "status": {"type": status}}
+
+
+@unittest.skipIf(fetch_data is None, "fetch_data needs curl_cffi")
+class MatchLifecycleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.lifecycle = MatchLifecycle(path=os.devnull)
+
+    def test_scheduled_refetched_only_after_refresh(self):
+        ev = event("notstarted", kickoff=NOW + 86400)
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW), PRE_MATCH_ENDPOINTS)
+        self.lifecycle.record(ev, PRE_MATCH_ENDPOINTS, {}, NOW)
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + 60), ())
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + PRE_MATCH_REFRESH), PRE_MATCH_ENDPOINTS)
+
+    def test_lineups_fetch_keeps_pre_match_refresh_clock(self):
+        ev = event("notstarted", kickoff=NOW + PRE_MATCH_REFRESH + LINEUPS_LEAD - 1200)
+        self.lifecycle.record(ev, self.lifecycle.plan(ev, {}, NOW), {}, NOW)
+        # Inside the lineups lead, before the pre-match records are due again
+        later = NOW + PRE_MATCH_REFRESH - 600
+        self.assertEqual(self.lifecycle.plan(ev, {}, later), ("lineups",))
+        self.lifecycle.record(ev, ("lineups",), {}, later)
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + PRE_MATCH_REFRESH), PRE_MATCH_ENDPOINTS + ("lineups",))
+
+    def test_frozen_once_every_in_play_record_is_found(self):
+        ev = event("finished")
+        self.lifecycle.record(ev, IN_PLAY_ENDPOINTS, dict.fromkeys(IN_PLAY_ENDPOINTS, {}), NOW)
+        self.assertTrue(self.lifecycle.entries["1"].get("frozen"))
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + 600), ())
+
+    def test_failed_final_fetch_does_not_freeze(self):
+        live, finished = event("inprogress"), event("finished")
+        self.lifecycle.record(live, IN_PLAY_ENDPOINTS, dict.fromkeys(IN_PLAY_ENDPOINTS, {}), NOW)
+        # Records stored while live are on disk, but every final request failed
+        stored = dict.fromkeys(IN_PLAY_ENDPOINTS + PRE_MATCH_ENDPOINTS, [0, 0, 1, 0])
+        self.lifecycle.record(finished, self.lifecycle.plan(finished, stored, NOW + 600), {}, NOW + 600)
+        self.assertFalse(self.lifecycle.entries["1"].get("frozen"))
+        self.assertEqual(self.lifecycle.plan(finished, stored, NOW + 1200), IN_PLAY_ENDPOINTS)
+
+    def test_final_records_across_fetches_freeze(self):
+        ev = event("finished")
+        self.lifecycle.record(ev, IN_PLAY_ENDPOINTS, {"lineups": {}, "statistics": {}}, NOW)
+        self.assertFalse(self.lifecycle.entries["1"].get("frozen"))
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + 600), ("incidents",) + PRE_MATCH_ENDPOINTS)
+        self.lifecycle.record(ev, ("incidents",), {"incidents": {}}, NOW + 600)
+        self.assertTrue(self.lifecycle.entries["1"].get("frozen"))
+
+    def test_missing_in_play_record_kept_until_final_attempts(self):
+        ev = event("finished")
+        found = {"statistics": {}, "incidents": {}}  # lineups never answered
+        for attempt in range(1, FINAL_ATTEMPTS + 1):
+            self.assertIn("lineups", self.lifecycle.plan(ev, {}, NOW + attempt))
+            self.lifecycle.record(ev, IN_PLAY_ENDPOINTS, found, NOW + attempt)
+            self.assertEqual(bool(self.lifecycle.entries["1"].get("frozen")), attempt == FINAL_ATTEMPTS)
+        self.assertEqual(self.lifecycle.plan(ev, {}, NOW + 600), ())
+
+    def test_match_on_two_days_recorded_once_per_run(self):
+        ev = event("finished")
+        self.lifecycle.record(ev, IN_PLAY_ENDPOINTS, {}, NOW)
+        self.lifecycle.record(ev, IN_PLAY_ENDPOINTS, {}, NOW)
+        self.assertEqual(self.lifecycle.entries["1"]["final"], 1)
+
+    def test_live_match_refetches_in_play_and_missing_pre_match(self):
+        ev = event("inprogress")
+        keys = self.lifecycle.plan(ev, {"h2h": [0, 0, 1, 0]}, NOW)
+        self.assertEqual(set(keys), set(IN_PLAY_ENDPOINTS) | {"odds", "form"})
+
+
+@unittest.skipIf(fetch_data is None, "fetch_data needs curl_cffi")
+class DayStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data_dir, fetch_data.DATA_DIR = fetch_data.DATA_DIR, self.tmp
+        self.index = DataIndex(os.path.join(self.tmp, "index.json"))
+
+    def tearDown(self):
+        fetch_data.DATA_DIR = self.data_dir
+        shutil.rmtree(self.tmp)
+
+    def write(self, key, text):
+        os.makedirs(os.path.join(self.tmp, key), exist_ok=True)
+        with open(os.path.join(self.tmp, key, "20260120.json"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self, key):
+        with open(os.path.join(self.tmp, key, "20260120.json"), encoding="utf-8") as f:
+            return f.read()
+
+    def test_unreadable_file_left_in_place(self):
+        broken = '{"1": {"home_score": 1}, "2": {'
+        self.write("incidents", broken)
+        self.write("odds", "{}")
+        store = DayStore("20260120", self.index)
+        store.add("incidents", 3, {"home_score": 0})
+        store.add("odds", 3, {"home": {}})
+        self.assertEqual(store.flush(), 1)
+        self.assertEqual(self.read("incidents"), broken)
+        self.assertEqual(self.read("odds"), encode_day({"3": {"home": {}}})[0])
+        self.assertEqual(store.skipped, {"incidents"})
+        self.assertEqual(set(self.index.entries(3)), {"odds"})
+
+    def test_merges_into_readable_file(self):
+        self.write("incidents", encode_day({"1": {"home_score": 1}})[0])
+        store = DayStore("20260120", self.index)
+        store.add("incidents", 3, {"home_score": 0})
+        store.flush()
+        self.assertEqual(self.read("incidents"), encode_day({"1": {"home_score": 1}, "3": {"home_score": 0}})[0])
+        self.assertEqual(store.skipped, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Listing refreshes: which fixtures are re-fetched, and unchanged records left byte-identical."""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+try:
+    import future_scraper  # noqa: E402
+    from future_scraper import RefreshTimes, refresh_listing, refresh_reason, save_day  # noqa: E402
+except ImportError:  # the scrapers need curl_cffi and pycountry
+    future_scraper = None
+
+NOW = int(time.time())
+MAX_AGE = 24 * 3600
+
+
+def event(match_id, kickoff=NOW + 86400, home="Home", away="Away"):
+    return {"id": match_id, "startTimestamp": kickoff, "homeTeam": {"name": home}, "awayTeam": {"name": away}}
+
+def record(match_id, fetched_at, kickoff=NOW + 86400, channels=("Sports 1",)):
+    return {"match_id": match_id, "kickoff": kickoff, "fixture": "Home vs Away", "league": "Premier League",
+            "tv_channels": [{"country": "Andorra", "channels": list(channels)}], "fetched_at": fetched_at}
+
+
+@unittest.skipIf(future_scraper is None, "future_scraper needs curl_cffi and pycountry")
+class RefreshReasonTest(unittest.TestCase):
+
+    def test_reasons(self):
+        fresh = record(1, NOW - 60)
+        self.assertEqual(refresh_reason(None, event(1), MAX_AGE, NOW), "new")
+        self.assertIsNone(refresh_reason(fresh, event(1), MAX_AGE, NOW))
+        self.assertEqual(refresh_reason(fresh, event(1, kickoff=NOW + 90000), MAX_AGE, NOW), "changed")
+        self.assertEqual(refresh_reason(fresh, event(1, home="Other"), MAX_AGE, NOW), "changed")
+        self.assertEqual(refresh_reason(record(1, NOW - MAX_AGE - 1), event(1), MAX_AGE, NOW), "stale")
+
+    def test_refetch_time_outside_the_record_counts(self):
+        old = record(1, NOW - 3 * MAX_AGE)
+        self.assertIsNone(refresh_reason(old, event(1), MAX_AGE, NOW, refreshed=NOW - 60))
+
+
+@unittest.skipIf(future_scraper is None, "future_scraper needs curl_cffi and pycountry")
+class SaveDayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="future_scraper_test_")
+        self.path = os.path.join(self.tmp, "20260210.json")
+        self.records = [record(1, NOW - 2 * MAX_AGE), record(2, NOW - 60)]
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=4)
+        with open(self.path, "rb") as f:
+            self.original = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def existing(self):
+        return {m["match_id"]: m for m in self.records}, self.original.decode("utf-8")
+
+    def test_refetch_that_only_moves_fetched_at_leaves_file_alone(self):
+        fetched = {1: record(1, NOW)}
+        self.assertFalse(save_day(self.path, [event(1), event(2)], fetched, *self.existing()))
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.original)
+
+    def test_failed_fetch_keeps_previous_record(self):
+        self.assertFalse(save_day(self.path, [event(1), event(2)], {1: None}, *self.existing()))
+
+    def test_changed_record_is_written(self):
+        fetched = {1: record(1, NOW, channels=("Sports 1", "Sports 2"))}
+        self.assertTrue(save_day(self.path, [event(1), event(2)], fetched, *self.existing()))
+        with open(self.path, "r", encoding="utf-8") as f:
+            written = json.load(f)
+        self.assertEqual(written[0], fetched[1])
+        self.assertEqual(written[1], self.records[1])
+
+    def test_refresh_listing_remembers_unchanged_refetch(self):
+        refresh_times = RefreshTimes(os.path.join(self.tmp, "refreshed.json"), 8 * 86400)
+        calls = []
+
+        async def fetch(match_id):
+            calls.append(match_id)
+            return record(match_id, NOW)
+
+        counts, fetched, written = asyncio.run(
+            refresh_listing(self.path, [event(1), event(2)], fetch, False, MAX_AGE, refresh_times))
+        self.assertEqual((calls, fetched, written), ([1], 1, False))
+        self.assertEqual(counts, {"stale": 1, None: 1})
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.original)
+        # The refetch is remembered outside the file, so the next run leaves the fixture alone
+        calls.clear()
+        asyncio.run(refresh_listing(self.path, [event(1), event(2)], fetch, False, MAX_AGE, refresh_times))
+        self.assertEqual(calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
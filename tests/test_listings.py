@@ -0,0 +1,130 @@
+"""Day and channel listings past the first screen go to content-hashed JSON shards, and a build
+keeps a shard it no longer links to for LISTING_SHARD_GRACE."""
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import timedelta, timezone
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+from conftest import NOW, write_scrape  # noqa: E402
+from sitebuild import BuildConfig, build, listings  # noqa: E402
+from sitebuild.builder import read_manifest  # noqa: E402
+from sitebuild.config import LISTING_FIRST_SCREEN, LISTING_SHARD_GRACE  # noqa: E402
+from sitebuild.listings import day_shard, split_day  # noqa: E402
+
+MATCHES_PER_DAY = LISTING_FIRST_SCREEN + 5
+
+
+def league(name, n):
+    return name, [SimpleNamespace(slug=f"{name}-{i}", folder="20260310", kickoff=i, fixture=f"{name} {i}")
+                  for i in range(n)]
+
+
+class SplitDayTest(unittest.TestCase):
+
+    def site(self, *leagues):
+        return SimpleNamespace(day_index={NOW.date(): {'leagues': list(leagues)}})
+
+    def test_leagues_are_never_split(self):
+        site = self.site(league("A", 2), league("B", 2), league("C", 1))
+        with mock.patch.object(listings, "LISTING_FIRST_SCREEN", 3):
+            first, rest = split_day(site, NOW.date())
+        # B crosses the first screen, so it is shown whole and C is loaded later
+        self.assertEqual([name for name, _ in first], ["A", "B"])
+        self.assertEqual([name for name, _ in rest], ["C"])
+
+    def test_shard_only_for_a_listing_past_the_first_screen(self):
+        with mock.patch.object(listings, "LISTING_FIRST_SCREEN", 3):
+            self.assertIsNone(day_shard(self.site(league("A", 3)), NOW.date()))
+            path, text = day_shard(self.site(league("A", 3), league("B", 1)), NOW.date())
+            again, _ = day_shard(self.site(league("A", 3), league("B", 1)), NOW.date())
+            changed, _ = day_shard(self.site(league("A", 3), league("B", 2)), NOW.date())
+        self.assertRegex(path, r"^shards/day/2026-03-10\.[0-9a-f]{12}\.json$")
+        self.assertEqual(json.loads(text), {"start": 1, "leagues": [["B", [["B-0", "20260310", 0, "B 0"]]]]})
+        # The name follows the content: the same listing keeps its URL, a new one gets another
+        self.assertEqual(again, path)
+        self.assertNotEqual(changed, path)
+
+
+class ShardGraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="listings_test_")
+        os.chdir(self.tmp)
+        write_scrape(2, MATCHES_PER_DAY)
+        # Leagues of five matches a minute apart, so each day's last league starts past the first screen
+        for path in glob.glob(os.path.join("date", "*.json")):
+            with open(path, encoding="utf-8") as f:
+                records = json.load(f)
+            for i, m in enumerate(records):
+                m["league"] = f"League {i // 5}"
+                m["kickoff"] = records[0]["kickoff"] + i * 60
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=4)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def build(self, now):
+        config = BuildConfig(out_dir="dist", template_dir=REPO, now=now, tz=timezone.utc, incremental=True)
+        with redirect_stdout(StringIO()):
+            build(config)
+        return read_manifest(config.manifest_path)['pages']
+
+    def day_shards(self):
+        return sorted(os.path.relpath(p, "dist") for p in glob.glob(os.path.join("dist", "shards", "day", "*.json")))
+
+    def test_retired_shard_kept_for_grace_period(self):
+        self.build(NOW)
+        old = self.day_shards()
+        self.assertEqual(len(old), 2)
+        with open(os.path.join("dist", "index.html"), encoding="utf-8") as f:
+            self.assertIn(f"/{old[-1]}", f.read())
+        with open(os.path.join("dist", old[-1]), encoding="utf-8") as f:
+            self.assertEqual(sum(len(matches) for _, matches in json.load(f)["leagues"]),
+                             MATCHES_PER_DAY - LISTING_FIRST_SCREEN)
+        # Both days are inside the channel's window
+        channel, = glob.glob(os.path.join("dist", "shards", "channel", "sports-1.*.json"))
+        with open(channel, encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)["rows"]), 2 * MATCHES_PER_DAY - LISTING_FIRST_SCREEN)
+
+        # A renamed fixture changes today's shard
+        path = os.path.join("date", f"{NOW:%Y%m%d}.json")
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        records[-1]["fixture"] = "Renamed vs Away"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        later = NOW + timedelta(seconds=60)
+        pages = self.build(later)
+        new = self.day_shards()
+        self.assertEqual(len(new), 3)
+        self.assertIn(old[-1], new)
+        self.assertEqual(pages[old[-1]]['retired'], int(later.timestamp()))
+
+        # Still inside the grace period: kept, and still retired since the first build without it
+        pages = self.build(later + timedelta(seconds=LISTING_SHARD_GRACE - 1))
+        self.assertEqual(self.day_shards(), new)
+        self.assertEqual(pages[old[-1]]['retired'], int(later.timestamp()))
+
+        self.build(later + timedelta(seconds=LISTING_SHARD_GRACE))
+        self.assertEqual(len(self.day_shards()), 2)
+        self.assertNotIn(old[-1], self.day_shards())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""match_store.convert() keeps every renderable record, and is_stale() notices changed date files."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import match_store  # noqa: E402
+from match_store import MatchStore, convert  # noqa: E402
+from sitebuild.data import Match  # noqa: E402
+
+DAYS = {
+    "20260301.json": [
+        {"match_id": 1, "kickoff": 1772380800, "fixture": "Deportivo Alavés vs Cúcuta", "league_id": 8,
+         "league": "LaLiga", "venue": "Mendizorroza",
+         "tv_channels": [{"country": "Spain", "channels": ["DAZN 1", "M+ LaLiga"]},
+                         {"country": "Andorra", "channels": []}],
+         "fetched_at": 1772300000},
+        {"match_id": 2, "kickoff": 1772384400, "fixture": "Home vs Away"},
+        {"match_id": 3, "fixture": "No kickoff"},
+    ],
+    "20260302.json": [
+        {"match_id": 4, "kickoff": 1772470800, "fixture": "Rangers vs Celtic", "league": None,
+         "stadium": "Ibrox", "tv_channels": [{"country": "UK", "channels": ["Sky Sports"]}]},
+    ],
+}
+
+
+class MatchStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="match_store_test_")
+        os.chdir(self.tmp)
+        os.makedirs("date")
+        self.paths = []
+        for name, records in DAYS.items():
+            path = os.path.join("date", name)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=4)
+            self.paths.append(path)
+        self.stats = convert(self.paths, "matches.bin")
+        self.store = MatchStore("matches.bin", use_mmap=False)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def expected(self):
+        """The records as the builder sees them: no kickoff is skipped, None-valued keys are absent"""
+        return [{k: v for k, v in m.items() if v is not None}
+                for records in DAYS.values() for m in records if "kickoff" in m]
+
+    def test_records_round_trip(self):
+        self.assertEqual(self.stats["skipped"], 1)
+        self.assertEqual([self.store.record(i) for i in range(len(self.store))], self.expected())
+
+    def test_export_writes_one_file_per_source(self):
+        self.assertEqual(self.store.export_json("exported"), 2)
+        with open(os.path.join("exported", "20260302.json"), "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), self.expected()[2:])
+
+    def test_store_records_show_the_json_venue(self):
+        stored = [Match.from_store(self.store, i, self.store.row(i)).venue for i in range(len(self.store))]
+        self.assertEqual(stored, [Match(m, None).venue for m in self.expected()])
+        self.assertEqual(stored[-1], "Ibrox")
+
+    def test_fresh_store_not_stale_without_reading(self):
+        digests = []
+        real = match_store.file_digest
+        match_store.file_digest = lambda raw: digests.append(raw) or real(raw)
+        try:
+            self.assertFalse(self.store.is_stale(self.paths))
+        finally:
+            match_store.file_digest = real
+        self.assertEqual(digests, [])
+
+    def test_touched_but_unchanged_file_not_stale(self):
+        st = os.stat(self.paths[0])
+        os.utime(self.paths[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertFalse(self.store.is_stale(self.paths))
+
+    def test_same_size_edit_is_stale(self):
+        with open(self.paths[1], "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(self.paths[1], "w", encoding="utf-8") as f:
+            f.write(text.replace("Celtic", "Hearts"))
+        st = os.stat(self.paths[1])
+        os.utime(self.paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))  # even on coarse clocks
+        self.assertEqual(os.path.getsize(self.paths[1]), len(text.encode("utf-8")))
+        self.assertTrue(self.store.is_stale(self.paths))
+
+    def test_added_or_removed_file_is_stale(self):
+        self.assertTrue(self.store.is_stale(self.paths[:1]))
+        extra = os.path.join("date", "20260303.json")
+        with open(extra, "w", encoding="utf-8") as f:
+            f.write("[]")
+        self.assertTrue(self.store.is_stale(self.paths + [extra]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""RunReport.merge() folds a worker's report into the run's, and write() leaves one JSON document."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from run_report import RunReport, endpoint_of  # noqa: E402
+
+
+class RunReportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="run_report_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def worker(self):
+        report = RunReport("worker")
+        report.stages["day 20260301"] = 1.5
+        report.count("matches", 3)
+        report.read_bytes(100)
+        with redirect_stdout(StringIO()):
+            report.error("invalid_json", "event/1")
+        report.request("https://api.sofascore.com/api/v1/event/1/odds", 200, 0.03)
+        return report
+
+    def test_endpoints_grouped_by_route(self):
+        self.assertEqual(endpoint_of("https://api.sofascore.com/api/v1/event/123/lineups?x=1"),
+                         "/api/v1/event/{id}/lineups")
+        self.assertEqual(endpoint_of("https://host/api/v1/sport/football/scheduled-events/2026-03-01"),
+                         "/api/v1/sport/football/scheduled-events/{date}")
+
+    def test_merge_adds_stages_counters_bytes_and_errors(self):
+        report = RunReport("run")
+        report.stages["day 20260301"] = 0.5
+        report.count("matches", 2)
+        report.merge(self.worker().to_dict())
+        report.merge(self.worker().to_dict())
+        self.assertEqual(report.stages, {"day 20260301": 3.5})
+        self.assertEqual(report.counters["matches"], 8)
+        self.assertEqual(report.bytes["read"], 200)
+        self.assertEqual(report.errors["invalid_json"], 2)
+        # Requests stay on the report the scheduler was given
+        self.assertEqual(report.counters["requests"], 2)
+        self.assertEqual(report.status_codes, {})
+        self.assertEqual(dict(report.latency), {})
+
+    def test_write_round_trips_as_json(self):
+        report = self.worker()
+        report.request("https://api.sofascore.com/api/v1/event/2/odds", None, 12.0, error=TimeoutError())
+        path = report.write(os.path.join(self.tmp, "reports", "worker.json"))
+        with open(path, encoding="utf-8") as f:
+            written = json.load(f)
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["worker.json"])
+        self.assertEqual(written["name"], "worker")
+        self.assertEqual(written["stages_s"], {"day 20260301": 1.5})
+        self.assertEqual(written["counters"], {"matches": 3, "requests": 2})
+        self.assertEqual(written["status_codes"], {"200": 1, "no_response": 1})
+        self.assertEqual(written["errors"], {"invalid_json": 1, "request:TimeoutError": 1})
+        latency = written["latency"]["/api/v1/event/{id}/odds"]
+        self.assertEqual(latency["count"], 2)
+        self.assertEqual(latency["max_ms"], 12000.0)
+        self.assertEqual(latency["buckets_ms"]["le_25"], 0)
+        self.assertEqual(latency["buckets_ms"]["le_50"], 1)
+        self.assertEqual(latency["buckets_ms"]["inf"], 1)
+        # A worker's written report merges like its to_dict()
+        merged = RunReport("run")
+        merged.merge(written)
+        self.assertEqual(merged.errors, report.errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""search_shards postings find every name a query matches, and doc ids stay put across builds."""
+import os
+import sys
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from sitebuild.config import SEARCH_DOC_SHARDS, SEARCH_POSTINGS_MAX  # noqa: E402
+from sitebuild.search import doc_ids, normalize, search_shards, shard_name, words  # noqa: E402
+
+# More names sharing every term than a two-letter posting keeps, ranked below busier ones
+FILLER = [f"Arena Club {i}" for i in range(SEARCH_POSTINGS_MAX * 2)]
+NAMES = FILLER + [f"Arena Sport {i} SRB" for i in range(40)] + [
+    "Deportivo Alavés", "Club Deportivo Toluca", "Cúcuta Deportivo", "Sport TV", "FC Barcelona",
+    "Rangers", "Angers"]
+
+
+def search(shards, query):
+    """Every doc name the home page's searchSite would show for query, best ranked first"""
+    def lookup(term, field):
+        return shards.get(f"search/{shard_name(term)}.json", {}).get(field, {}).get(term, [])
+
+    def intersect(lists):
+        ids = lists[0]
+        for other in lists[1:]:
+            ids = [i for i in ids if i in set(other)]
+        return ids
+
+    def word_ids(word):
+        if len(word) < 3:
+            return lookup(word, 'p')
+        return intersect([lookup(word[i:i + 3], 't') for i in range(len(word) - 2)])
+
+    query_words = [w for w in words(query) if len(w) >= 2]
+    looked = [w for w in query_words if len(w) > 2] or query_words
+    found = []
+    for doc_id in intersect([word_ids(w) for w in looked]):
+        name, *_, rank = shards[f"search/docs/{doc_id % SEARCH_DOC_SHARDS}.json"]['d'][doc_id]
+        if all(w in normalize(name) for w in query_words):
+            found.append((-rank, name))
+    return [name for _, name in sorted(found)]
+
+
+class SearchRecallTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # search_documents' shape: (key, rank, name, kind, path, detail, kickoff)
+        cls.docs = [(f"t/{i}", len(NAMES) - i, name, 't', f"/team/{i}/", "", 0) for i, name in enumerate(NAMES)]
+        cls.shards = search_shards(cls.docs)
+
+    def test_multi_word_prefixes(self):
+        self.assertEqual(search(self.shards, "aren spor"), [f"Arena Sport {i} SRB" for i in range(40)])
+        self.assertEqual(search(self.shards, "arena sport 39"), ["Arena Sport 39 SRB"])
+        self.assertEqual(search(self.shards, "sport arena 39 srb"), ["Arena Sport 39 SRB"])
+
+    def test_mid_word(self):
+        self.assertEqual(search(self.shards, "eportivo"),
+                         ["Deportivo Alavés", "Club Deportivo Toluca", "Cúcuta Deportivo"])
+        self.assertEqual(search(self.shards, "ucuta"), ["Cúcuta Deportivo"])
+        # Also the start of another name, which must not hide the names it is inside of
+        self.assertEqual(search(self.shards, "angers"), ["Rangers", "Angers"])
+
+    def test_short_words_filter_longer_ones(self):
+        self.assertEqual(search(self.shards, "fc barc"), ["FC Barcelona"])
+        self.assertEqual(search(self.shards, "tv sport"), ["Sport TV"])
+
+    def test_two_letter_postings_are_capped(self):
+        self.assertEqual(len(self.shards["search/ar.json"]['p']['ar']), SEARCH_POSTINGS_MAX)
+        self.assertEqual(len(self.shards["search/ar.json"]['t']['are']), len(FILLER) + 40)
+
+    def test_every_doc_in_its_doc_shard(self):
+        doc_shards = {name: shard for name, shard in self.shards.items() if name.startswith("search/docs/")}
+        self.assertEqual(sum(len(shard['d']) for shard in doc_shards.values()), len(NAMES))
+
+    def test_new_and_busier_docs_leave_other_shards_alone(self):
+        # A new name ranked above every other, and one more match for the busiest name
+        docs = [("t/new", len(NAMES) + 1, "Zulia FC", 't', "/team/new/", "", 0),
+                (*self.docs[0][:1], self.docs[0][1] + 1, *self.docs[0][2:])] + self.docs[1:]
+        shards = search_shards(docs)
+        changed = {name for name in shards if shards[name] != self.shards.get(name)}
+        touched = {f"search/{shard_name(term)}.json" for term in ("zu", "fc", "zul", "uli", "lia")}
+        self.assertLessEqual(changed - touched, {f"search/docs/{doc_id % SEARCH_DOC_SHARDS}.json"
+                                                for doc_id in doc_ids(["t/new", "t/0"]).values()})
+        self.assertEqual(search(shards, "zulia"), ["Zulia FC"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""sitemap_shards splits large groups, and <lastmod> only moves when a page's output changes."""
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+from conftest import NOW, write_scrape  # noqa: E402
+from sitebuild import BuildConfig, build, sitemap  # noqa: E402
+from sitebuild.builder import page_entry  # noqa: E402
+from sitebuild.sitemap import sitemap_shards, w3c_datetime  # noqa: E402
+
+
+def lastmods(path):
+    """{loc: lastmod or None} of a sitemap or sitemap index file"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return {loc: mod or None for loc, mod in
+            re.findall(r"<loc>([^<]+)</loc>(?:<lastmod>([^<]+)</lastmod>)?", text)}
+
+
+class SitemapShardsTest(unittest.TestCase):
+
+    def test_large_groups_split_in_url_order(self):
+        groups = {"pages": {"https://x/b": 2, "https://x/a": 1},
+                  "matches-2026-03": {f"https://x/m{i}": i for i in range(5)}}
+        with mock.patch.object(sitemap, "SITEMAP_MAX_URLS", 2):
+            shards = sitemap_shards(groups)
+        self.assertEqual(list(shards), ["sitemaps/matches-2026-03.xml", "sitemaps/matches-2026-03-2.xml",
+                                        "sitemaps/matches-2026-03-3.xml", "sitemaps/pages.xml"])
+        self.assertEqual(shards["sitemaps/matches-2026-03-3.xml"], [("https://x/m4", 4)])
+        self.assertEqual(shards["sitemaps/pages.xml"], [("https://x/a", 1), ("https://x/b", 2)])
+
+    def test_page_entry_keeps_mod_of_unchanged_output(self):
+        later = NOW + timedelta(hours=1)
+        prev = {'src': "a", 'out': "x", 'mod': int(NOW.timestamp())}
+        self.assertEqual(page_entry(prev, "b", "x", later)['mod'], int(NOW.timestamp()))
+        self.assertEqual(page_entry(prev, "b", "y", later)['mod'], int(later.timestamp()))
+        # Unchanged since a manifest that had no 'mod': no known change time
+        self.assertNotIn('mod', page_entry({'src': "a", 'out': "x"}, "b", "x", later))
+
+
+class SitemapLastmodTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="sitemap_test_")
+        os.chdir(self.tmp)
+        write_scrape(5, 2)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def build(self, now):
+        with redirect_stdout(StringIO()):
+            build(BuildConfig(out_dir="dist", template_dir=REPO, now=now, tz=timezone.utc, incremental=True))
+
+    def test_lastmod_carried_over_until_output_changes(self):
+        self.build(NOW)
+        later = NOW + timedelta(hours=1)
+        path = os.path.join("date", f"{NOW - timedelta(days=2):%Y%m%d}.json")
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        records[0]["venue"] = "New Ground"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        self.build(later)
+
+        mods = lastmods(os.path.join("dist", "sitemaps", "matches-2026-03.xml"))
+        changed = [loc for loc in mods if f"home-{records[0]['match_id']}-vs-" in loc]
+        self.assertEqual(len(changed), 1)
+        self.assertEqual(mods.pop(changed[0]), w3c_datetime(later.timestamp()))
+        self.assertEqual(set(mods.values()), {w3c_datetime(NOW.timestamp())})
+        # The index gives each shard the latest lastmod of its URLs
+        index = lastmods(os.path.join("dist", "sitemap_index.xml"))
+        self.assertEqual([mod for loc, mod in index.items() if loc.endswith("/sitemaps/matches-2026-03.xml")],
+                         [w3c_datetime(later.timestamp())])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""The token bucket paces requests after a burst, and a 403/429 pauses and slows every request once."""
+import asyncio
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import sofa_scheduler  # noqa: E402
+from run_report import RunReport  # noqa: E402
+from sofa_scheduler import RequestScheduler, TokenBucket  # noqa: E402
+
+URL = "https://api.sofascore.com/api/v1/event/1/lineups"
+
+
+class FakeClock:
+    """monotonic()/perf_counter() and asyncio.sleep() for sofa_scheduler; a sleep moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.real_sleep = asyncio.sleep
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += max(0.0, delay)
+        await self.real_sleep(0)
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b"{}"
+
+
+class Session:
+    """Answers each get() with the next status (or (status, headers)) of a script"""
+
+    def __init__(self, clock, script):
+        self.clock = clock
+        self.script = list(script)
+        self.times = []
+
+    async def get(self, url, impersonate=None, timeout=None):
+        self.times.append(self.clock.now)
+        # In flight: other requests may start before this one is answered
+        await self.clock.real_sleep(0)
+        answer = self.script.pop(0)
+        status, headers = answer if isinstance(answer, tuple) else (answer, None)
+        return Response(status, headers)
+
+
+class SchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patches = [
+            mock.patch.object(sofa_scheduler, "time", SimpleNamespace(
+                monotonic=self.clock.monotonic, perf_counter=self.clock.monotonic)),
+            mock.patch.object(sofa_scheduler, "asyncio", SimpleNamespace(
+                sleep=self.clock.sleep, Lock=asyncio.Lock, Semaphore=asyncio.Semaphore)),
+            # The longest backoff full jitter allows, so waits are predictable
+            mock.patch.object(sofa_scheduler, "random", SimpleNamespace(uniform=lambda low, high: high)),
+            mock.patch("builtins.print"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+
+class TokenBucketTest(SchedulerTestCase):
+
+    def acquire(self, bucket, n):
+        async def run():
+            for _ in range(n):
+                await bucket.acquire()
+        asyncio.run(run())
+
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        self.acquire(bucket, 3)
+        self.assertEqual(self.clock.sleeps, [])
+        self.acquire(bucket, 2)
+        # Two more tokens at 2 per second
+        self.assertAlmostEqual(self.clock.now - 1000.0, 1.0)
+
+    def test_idle_refill_capped_at_capacity(self):
+        bucket = TokenBucket(rate=2.0, capacity=3)
+        self.acquire(bucket, 3)
+        self.clock.now += 60
+        self.acquire(bucket, 3)
+        self.assertEqual(self.clock.sleeps, [])
+        self.acquire(bucket, 1)
+        self.assertAlmostEqual(sum(self.clock.sleeps), 0.5)
+
+
+class RequestSchedulerTest(SchedulerTestCase):
+
+    def scheduler(self, script, **options):
+        self.session = Session(self.clock, script)
+        self.report = RunReport("test")
+        return RequestScheduler(self.session, rate=4.0, burst=100, report=self.report, **options)
+
+    def test_retry_after_pauses_and_halves_rate(self):
+        scheduler = self.scheduler([(429, {"Retry-After": "7"}), 200])
+        res = asyncio.run(scheduler.request(URL))
+        self.assertEqual(res.status_code, 200)
+        # The retry waits out Retry-After, not just its own backoff
+        self.assertGreaterEqual(self.session.times[1] - self.session.times[0], 7.0)
+        # Halved to 2 req/s, then one success adds max_rate / 20 back
+        self.assertAlmostEqual(scheduler.bucket.rate, 2.0 + 4.0 / 20)
+        self.assertEqual(scheduler.throttle_streak, 0)
+        self.assertEqual(self.report.counters["throttled"], 1)
+        self.assertEqual(self.report.counters["retries"], 1)
+        self.assertEqual(self.report.status_codes, {"429": 1, "200": 1})
+
+    def test_throttles_inside_one_pause_halve_rate_once(self):
+        scheduler = self.scheduler([429, 429, 200, 200])
+
+        async def run():
+            return await asyncio.gather(scheduler.request(URL), scheduler.request(URL))
+        self.assertEqual([res.status_code for res in asyncio.run(run())], [200, 200])
+        self.assertEqual(self.report.counters["throttled"], 2)
+        # Rate halved once for the window (4 -> 2), then two successes
+        self.assertAlmostEqual(scheduler.bucket.rate, 2.0 + 2 * 4.0 / 20)
+
+    def test_throttle_streak_doubles_pause(self):
+        scheduler = self.scheduler([403, 403, 403, 200], backoff=1.0)
+        asyncio.run(scheduler.request(URL))
+        # Pauses of 2, 4 and 8 seconds as the streak grows, and the rate halves each time (4 -> 0.5)
+        gaps = [b - a for a, b in zip(self.session.times, self.session.times[1:])]
+        self.assertEqual([round(g) for g in gaps], [2, 4, 8])
+        self.assertAlmostEqual(scheduler.bucket.rate, 0.5 + 4.0 / 20)
+
+    def test_gives_up_after_retries(self):
+        scheduler = self.scheduler([503] * 4, retries=3, backoff=1.0)
+        res = asyncio.run(scheduler.request(URL))
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(len(self.session.times), 4)
+        self.assertEqual(self.report.counters["retries"], 3)
+        self.assertEqual(self.report.counters["requests_failed"], 1)
+        # Exponential backoff between attempts, and the rate is left alone
+        self.assertEqual([s for s in self.clock.sleeps if s >= 1], [1.0, 2.0, 4.0])
+        self.assertEqual(scheduler.bucket.rate, 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
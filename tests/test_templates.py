@@ -0,0 +1,46 @@
+"""Template.render() fills every slot and reports missing or unused values."""
+import os
+import sys
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from sitebuild.templates import Template  # noqa: E402
+
+
+class TemplateProblemsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.template = Template("match", "<title>{{TITLE}}</title><h1>{{TITLE}}</h1><p>{{BODY}}</p>")
+
+    def test_every_slot_filled(self):
+        html = self.template.render({"TITLE": "A vs B", "BODY": "On TV"})
+        self.assertEqual(html, "<title>A vs B</title><h1>A vs B</h1><p>On TV</p>")
+        self.assertEqual(self.template.problems, set())
+
+    def test_missing_value_left_empty(self):
+        html = self.template.render({"TITLE": "A vs B", "BODY": None})
+        self.assertEqual(html, "<title>A vs B</title><h1>A vs B</h1><p></p>")
+        self.assertEqual(self.template.problems, {"match: {{BODY}} has no value and was left empty"})
+
+    def test_unused_value_reported(self):
+        self.template.render({"TITLE": "A vs B", "BODY": "", "FOOTER": "x"})
+        self.assertEqual(self.template.problems,
+                         {"match: value for {{FOOTER}} given but not used by the template"})
+
+    def test_missing_and_unused_together(self):
+        self.template.render({"TITLE": "A vs B", "FOOTER": "x"})
+        self.assertEqual(self.template.problems, {
+            "match: {{BODY}} has no value and was left empty",
+            "match: value for {{FOOTER}} given but not used by the template",
+        })
+
+    def test_problems_reported_once_per_build(self):
+        for _ in range(3):
+            self.template.render({"TITLE": "A vs B"})
+        self.assertEqual(len(self.template.problems), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""A watcher update after one date file changed writes the same site as a full build,
+and a date file caught half written keeps its pages until it can be read."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import timedelta, timezone
+from io import StringIO
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+from conftest import NOW, write_scrape  # noqa: E402
+from sitebuild import BuildConfig, build  # noqa: E402
+from sitebuild.watch import Watcher  # noqa: E402
+from test_build import site_files  # noqa: E402
+
+DAYS = 8
+MATCHES_PER_DAY = 3
+
+
+class WatchUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp(prefix="watch_test_")
+        os.chdir(self.tmp)
+        write_scrape(DAYS, MATCHES_PER_DAY)
+        self.watcher = Watcher(self.config("live"))
+        self.update()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def config(self, out_dir):
+        return BuildConfig(out_dir=out_dir, template_dir=REPO, now=NOW, tz=timezone.utc)
+
+    def update(self, full=True):
+        with redirect_stdout(StringIO()):
+            return self.watcher.update(NOW, full=full)
+
+    def edit(self, day, change):
+        """Rewrite date/<day>.json with change(records) under a new mtime"""
+        path = os.path.join("date", f"{day:%Y%m%d}.json")
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+        change(records)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=4)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        return path
+
+    def live_pages(self):
+        """Files of the live output, less the listing shards kept only for their grace period"""
+        retired = {path for path, entry in self.watcher.manifest['pages'].items() if 'retired' in entry}
+        return {path: data for path, data in site_files("live").items() if path not in retired}
+
+    def test_partial_update_matches_full_build(self):
+        yesterday = (NOW - timedelta(days=1)).date()
+
+        def change(records):
+            records[0]["fixture"] = "Renamed FC vs Away 1"
+            # A new channel, and a match moved to the day before
+            records[1]["tv_channels"] = [{"country": "Andorra", "channels": ["Sports 9"]}]
+            records[2]["kickoff"] -= 86400
+        self.edit(yesterday, change)
+
+        report = self.update(full=False)
+        self.assertEqual(report.counters['inputs_changed'], 1)
+        # The match and day pages of the six other days are not planned again
+        self.assertEqual(report.counters['pages_carried_over'], (DAYS - 2) * (MATCHES_PER_DAY + 1))
+        with redirect_stdout(StringIO()):
+            build(self.config("full"))
+        full = site_files("full")
+        live = self.live_pages()
+        self.assertEqual(sorted(live), sorted(full))
+        for path, data in full.items():
+            self.assertEqual(live[path], data, path)
+
+    def test_unreadable_date_file_keeps_pages(self):
+        day = (NOW - timedelta(days=2)).date()
+        path = os.path.join("date", f"{day:%Y%m%d}.json")
+        stamp = self.watcher.stamps[path]
+        before = self.live_pages()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('[{"match_id": ')
+
+        report = self.update(full=False)
+        self.assertEqual(report.errors['unreadable_input'], 1)
+        self.assertEqual(report.counters['pages_removed'], 0)
+        self.assertEqual(self.live_pages(), before)
+        # The old stamp stays, so the next poll reads the file again
+        self.assertEqual(self.watcher.stamps[path], stamp)
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([], f)
+        # Once readable, its matches (and their day page) go
+        report = self.update(full=False)
+        self.assertEqual(report.errors['unreadable_input'], 0)
+        self.assertEqual(report.counters['pages_removed'], MATCHES_PER_DAY + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()